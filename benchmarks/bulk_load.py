@@ -0,0 +1,58 @@
+"""
+Bulk ingestion benchmark.
+
+Loads `n` random "is" facts between `n // 10` concepts, once with one
+`create_cell` / `link` call per fact and once with a single `bulk_load`.
+
+    python -m benchmarks.bulk_load 100000 1000000
+"""
+import sys
+import time
+
+import numpy as np
+
+from cwdb import CompactCWComplex, CWComplex
+
+
+def random_facts(n: int, seed: int = 0):
+    n_concepts = max(2, n // 10)
+    rng = np.random.default_rng(seed)
+    subjects = rng.integers(0, n_concepts, size=n)
+    objects = (subjects + rng.integers(1, n_concepts, size=n)) % n_concepts
+    return n_concepts, subjects, objects
+
+
+def load_one_by_one(c, n_concepts, subjects, objects):
+    concepts = [c.create_cell(str(i)) for i in range(n_concepts)]
+    for s, o in zip(subjects.tolist(), objects.tolist()):
+        c.create_cell("is", [concepts[s], concepts[o]])
+
+
+def load_bulk(c, n_concepts, subjects, objects):
+    n = len(subjects)
+    labels = [str(i) for i in range(n_concepts)] + ["is"] * n
+    offsets = np.concatenate(
+        [np.zeros(n_concepts, dtype=np.int64), 2 * np.arange(n + 1)]
+    )
+    indices = np.stack([subjects, objects], axis=1).ravel()
+    c.bulk_load(labels, offsets, indices)
+
+
+def run(n: int):
+    facts = random_facts(n)
+    for cls in (CWComplex, CompactCWComplex):
+        timings = []
+        for load in (load_one_by_one, load_bulk):
+            start = time.perf_counter()
+            load(cls(), *facts)
+            timings.append(time.perf_counter() - start)
+        print(
+            f"{cls.__name__:>16} facts={n:>9} "
+            f"one_by_one={timings[0]:7.2f}s bulk_load={timings[1]:7.2f}s "
+            f"speedup=x{timings[0] / timings[1]:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:] or ["100000"]:
+        run(int(arg))
@@ -0,0 +1,68 @@
+"""
+Coboundary lookup benchmark.
+
+Builds a complex of `n` 0-cells chained by "is" links and compares
+`get_coboundary_of` against the full-rebuild lookup it replaced.
+
+    python -m benchmarks.coboundary 100000 1000000
+"""
+import sys
+import time
+from collections import defaultdict
+
+from cwdb import CWComplex
+
+
+def build_chain(n: int) -> CWComplex:
+    c = CWComplex()
+    previous = c.create_cell("0")
+    for i in range(1, n):
+        cell = c.create_cell(str(i))
+        c.create_cell("is", [previous, cell])
+        previous = cell
+    return c
+
+
+def full_rebuild_lookup(c: CWComplex, cell):
+    """The lookup as it was before the index: rebuild everything on each call"""
+    coboundary_of = defaultdict(set)
+    for layer in c._layers[1:]:
+        for x in layer:
+            if x.data.deleted:
+                continue
+            for b in x.boundary:
+                if b.data.deleted:
+                    continue
+                coboundary_of[b.id].add(x)
+    return coboundary_of[cell.id]
+
+
+def run(n: int, lookups: int = 1000, rebuild_lookups: int = 3):
+    start = time.perf_counter()
+    c = build_chain(n)
+    build_time = time.perf_counter() - start
+
+    cells = list(c.get_layer_cells(0))[:lookups]
+    n_cells = sum(len(c.get_layer_cells(d)) for d in range(2))
+
+    start = time.perf_counter()
+    for cell in cells:
+        c.get_coboundary_of(cell)
+    indexed = (time.perf_counter() - start) / len(cells)
+
+    start = time.perf_counter()
+    for cell in cells[:rebuild_lookups]:
+        full_rebuild_lookup(c, cell)
+    rebuild = (time.perf_counter() - start) / rebuild_lookups
+
+    print(
+        f"cells={n_cells:>9} build={build_time:7.2f}s "
+        f"indexed={indexed * 1e6:8.2f}us/lookup "
+        f"full_rebuild={rebuild * 1e3:9.2f}ms/lookup "
+        f"speedup=x{rebuild / indexed:,.0f}"
+    )
+
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:] or ["100000"]:
+        run(int(arg))
@@ -0,0 +1,48 @@
+"""
+Journal benchmark.
+
+Records `n` random "is" facts between `n // 10` concepts in a journal, then
+recovers the complex by replaying it, and by loading a checkpoint instead.
+
+    python -m benchmarks.journal 100000 1000000
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from cwdb import CompactCWComplex, CWComplex
+from cwdb.journal import checkpoint, recover
+
+from .bulk_load import load_one_by_one, random_facts
+
+
+def run(n: int):
+    facts = random_facts(n)
+    for cls in (CWComplex, CompactCWComplex):
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot, journal_path = Path(directory, "kb.cwdb"), Path(directory, "kb.j")
+            start = time.perf_counter()
+            c, journal = recover(snapshot, journal_path, cls)
+            load_one_by_one(c, *facts)
+            journal.commit()
+            record = time.perf_counter() - start
+
+            start = time.perf_counter()
+            c, journal = recover(snapshot, journal_path, cls)
+            replay = time.perf_counter() - start
+
+            checkpoint(c, snapshot, journal)
+            journal.close()
+            start = time.perf_counter()
+            recover(snapshot, journal_path, cls)
+            load = time.perf_counter() - start
+        print(
+            f"{cls.__name__:>16} facts={n:>9} record={record:7.2f}s "
+            f"replay={replay:7.2f}s checkpoint_load={load:7.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:] or ["100000"]:
+        run(int(arg))
@@ -0,0 +1,47 @@
+"""
+Memory-mapped open benchmark.
+
+Saves complexes of `n` random "is" facts and compares the time to open
+them with `MappedCWComplex` against `CompactCWComplex.load`.
+
+    python -m benchmarks.mapped 100000 1000000
+"""
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bulk_load import load_bulk, random_facts
+from cwdb import CompactCWComplex, MappedCWComplex
+
+
+def run(n: int, lookups: int = 1000):
+    c = CompactCWComplex(embedding_size=2)
+    load_bulk(c, *random_facts(n))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "kb.cwdb")
+        c.save(path)
+
+        start = time.perf_counter()
+        CompactCWComplex.load(path)
+        load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        mapped = MappedCWComplex(path)
+        open_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(lookups):
+            mapped.get_coboundary_of(mapped.cell(i))
+            mapped.get_cell_by_label(str(i))
+        query = (time.perf_counter() - start) / lookups
+
+    print(
+        f"cells={len(c):>9} load={load * 1e3:8.1f}ms open={open_time * 1e3:6.2f}ms "
+        f"coboundary+label={query * 1e6:6.1f}us"
+    )
+
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:] or ["100000"]:
+        run(int(arg))
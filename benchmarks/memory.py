@@ -0,0 +1,51 @@
+"""
+Memory footprint of `CWComplex` vs `CompactCWComplex`.
+
+Builds the same "is" chain (`n` 0-cells, `n - 1` 1-cells) in both
+implementations and reports traced allocations per cell.
+
+    python -m benchmarks.memory 100000
+"""
+import sys
+import time
+import tracemalloc
+
+from cwdb import CompactCWComplex, CWComplex
+
+
+def build_chain(c, n: int):
+    previous = c.create_cell("0")
+    for i in range(1, n):
+        cell = c.create_cell(str(i))
+        c.create_cell("is", [previous, cell])
+        previous = cell
+    return c
+
+
+def measure(cls, n: int):
+    start = time.perf_counter()
+    build_chain(cls(), n)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    c = build_chain(cls(), n)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del c
+    return current, elapsed
+
+
+def run(n: int):
+    n_cells = 2 * n - 1
+    for cls in (CWComplex, CompactCWComplex):
+        current, elapsed = measure(cls, n)
+        print(
+            f"{cls.__name__:>16} cells={n_cells:>8} "
+            f"memory={current / 2**20:8.1f}MiB "
+            f"({current / n_cells:6.0f}B/cell) build={elapsed:6.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:] or ["100000"]:
+        run(int(arg))
@@ -0,0 +1,120 @@
+"""
+Rule benchmark.
+
+Loads `n` random "is" facts between `n // 10` concepts, finds every match of
+the transitivity rule, and applies the rule to each match, one by one and
+with `apply_rule_many` on a fresh copy. Then saturates a
+chain of `n // 100` concepts under transitivity. Finally builds a Rete network
+over the random facts and measures the mean latency of inserting a fact, and
+times `deduction` over all chains of facts with random truth values.
+
+    python -m benchmarks.rules 10000 20000
+"""
+import sys
+import time
+
+import numpy as np
+
+from cwdb import CompactCWComplex, CWComplex
+from cwdb.rete import ReteNetwork
+from cwdb.rules import (
+    apply_rule,
+    apply_rule_many,
+    apply_truth_function,
+    deduction,
+    match_rule,
+    saturate,
+)
+
+from .bulk_load import load_bulk, random_facts
+
+
+def define_transitivity(c):
+    rule = c.create_cell("transitivity")
+    p1, p2, p3 = (c.create_cell("Any") for _ in range(3))
+    is_1, is_2 = c.create_cell("is", [p1, p2]), c.create_cell("is", [p2, p3])
+    r_p1, r_p2, r_p3 = (c.create_cell("Any") for _ in range(3))
+    r_is_1, r_is_2 = c.create_cell("is", [r_p1, r_p2]), c.create_cell(
+        "is", [r_p2, r_p3]
+    )
+    r_is_3 = c.create_cell("is", [r_p1, r_p3])
+    b_1 = c.create_cell("bind", [p1, r_p1])
+    b_2 = c.create_cell("bind", [p2, r_p2])
+    b_3 = c.create_cell("bind", [p3, r_p3])
+    c.create_cell("bind", [is_1, b_2, r_is_1, b_1])
+    c.create_cell("bind", [is_2, b_3, r_is_2, b_2])
+    scaffolds = [c.create_cell("pattern_scaffold", [rule, p]) for p in (p1, p2, p3)]
+    c.create_cell("pattern", scaffolds + [is_1, is_2])
+    scaffolds = [
+        c.create_cell("product_scaffold", [rule, p]) for p in (r_p1, r_p2, r_p3)
+    ]
+    c.create_cell("product", scaffolds + [r_is_3])
+    return rule
+
+
+def run(n: int):
+    facts = random_facts(n)
+    for cls in (CWComplex, CompactCWComplex):
+        c = cls()
+        load_bulk(c, *facts)
+        rule = define_transitivity(c)
+
+        start = time.perf_counter()
+        matches = list(match_rule(c, rule))
+        match = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for m in matches:
+            apply_rule(c, rule, m)
+        apply = time.perf_counter() - start
+
+        c = cls()
+        load_bulk(c, *facts)
+        rule = define_transitivity(c)
+        matches = list(match_rule(c, rule))
+        start = time.perf_counter()
+        apply_rule_many(c, rule, matches)
+        apply_many = time.perf_counter() - start
+
+        c = cls()
+        chain = [c.create_cell(str(i)) for i in range(max(2, n // 100))]
+        for a, b in zip(chain, chain[1:]):
+            c.create_cell("is", [a, b])
+        rule = define_transitivity(c)
+        start = time.perf_counter()
+        result = saturate(c, [rule])
+        closure = time.perf_counter() - start
+
+        c = cls()
+        load_bulk(c, *facts)
+        start = time.perf_counter()
+        network = ReteNetwork(c, [define_transitivity(c)])
+        build = time.perf_counter() - start
+        n_concepts, subjects, objects = random_facts(1000, seed=1)
+        concepts = [c.cell(i) for i in range(facts[0])]
+        start = time.perf_counter()
+        for s, o in zip(subjects.tolist(), objects.tolist()):
+            c.create_cell("is", [concepts[s], concepts[o]])
+        insert = (time.perf_counter() - start) / len(subjects)
+        network.detach()
+
+        c = cls(embedding_size=2)
+        load_bulk(c, *facts)
+        edges = c.get_layer_cells(1)
+        rng = np.random.default_rng(0)
+        c.set_embeddings(edges, rng.uniform(0.1, 0.9, size=(len(edges), 2)))
+        start = time.perf_counter()
+        derived = apply_truth_function(c, deduction)
+        truth = time.perf_counter() - start
+        print(
+            f"{cls.__name__:>16} facts={n:>9} matches={len(matches):>9} "
+            f"match={match:7.2f}s apply={apply:7.2f}s apply_many={apply_many:7.2f}s "
+            f"saturate={closure:7.2f}s rounds={result.rounds} "
+            f"rete_build={build:7.2f}s rete_insert={insert * 1e6:7.1f}us "
+            f"deduction={truth:7.2f}s derived={len(derived)}"
+        )
+
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:] or ["10000"]:
+        run(int(arg))
@@ -0,0 +1,44 @@
+"""
+Snapshot benchmark.
+
+Builds a complex of `n` random "is" facts with `bulk_load`, then times
+`save` and `load` of a binary snapshot against building it again.
+
+    python -m benchmarks.snapshot 100000 1000000
+"""
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bulk_load import load_bulk, random_facts
+from cwdb import CompactCWComplex, CWComplex
+
+
+def run(n: int):
+    facts = random_facts(n)
+    for cls in (CWComplex, CompactCWComplex):
+        start = time.perf_counter()
+        c = cls(embedding_size=2)
+        load_bulk(c, *facts)
+        build = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "kb.cwdb")
+            start = time.perf_counter()
+            c.save(path)
+            save = time.perf_counter() - start
+            start = time.perf_counter()
+            cls.load(path)
+            load = time.perf_counter() - start
+            size = os.path.getsize(path)
+
+        print(
+            f"{cls.__name__:>16} facts={n:>9} build={build:7.2f}s "
+            f"save={save:6.2f}s load={load:6.2f}s size={size / 2**20:7.1f}MiB"
+        )
+
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:] or ["100000"]:
+        run(int(arg))
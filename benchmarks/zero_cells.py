@@ -0,0 +1,56 @@
+"""
+Memory taken by `zero_cells` on wide and deep complexes.
+
+"wide": `n` set-like 2-cells, each spanning `k` links to a shared type cell.
+"deep": a tower of `n` cells, each wrapping the previous one, over a single
+2-cell spanning `k` links.
+
+For each shape the benchmark reports traced memory right after
+construction and after reading `zero_cells` of every cell, which is what
+eager construction used to cost.
+
+    python -m benchmarks.zero_cells 2000 100
+"""
+import sys
+import tracemalloc
+
+from cwdb import CWComplex
+
+
+def build_wide(c: CWComplex, n: int, k: int):
+    type_ = c.create_cell("Type")
+    elements = [c.create_cell(str(i)) for i in range(k)]
+    links = [c.link(x, type_, oriented=True) for x in elements]
+    for i in range(n):
+        c.create_cell(f"instance {i}", links)
+
+
+def build_deep(c: CWComplex, n: int, k: int):
+    type_ = c.create_cell("Type")
+    elements = [c.create_cell(str(i)) for i in range(k)]
+    cell = c.create_cell("base", [c.link(x, type_, oriented=True) for x in elements])
+    for i in range(n):
+        cell = c.create_cell(f"wrapper {i}", [cell])
+
+
+def run(n: int, k: int):
+    for name, build in (("wide", build_wide), ("deep", build_deep)):
+        tracemalloc.start()
+        c = CWComplex()
+        build(c, n, k)
+        lazy, _ = tracemalloc.get_traced_memory()
+        for dimension in range(n + 3):
+            for cell in c.get_layer_cells(dimension):
+                _ = cell.zero_cells
+        materialized, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"{name:>5} n={n} k={k} "
+            f"lazy={lazy / 2**20:7.1f}MiB "
+            f"materialized={materialized / 2**20:7.1f}MiB"
+        )
+
+
+if __name__ == "__main__":
+    n, k = (int(x) for x in (sys.argv[1:] or ["2000", "100"]))
+    run(n, k)
@@ -1,2 +1,8 @@
-from .auxilary import to_lang_representation  # noqa: F401
+from .auxilary import (  # noqa: F401
+    from_lang_representation,
+    to_lang_representation,
+    write_lang_representation,
+)
+from .compact import CompactCell, CompactCWComplex  # noqa: F401
 from .core import Cell, CWComplex  # noqa: F401
+from .mapped import MappedCWComplex  # noqa: F401
@@ -1,54 +1,189 @@
+import itertools
 import re
 from collections import defaultdict
-from typing import Dict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, TextIO
 
-from .core import Cell
+from .bulk import BatchBuilder
+from .core import CWComplex
+from .interfaces import ICell
 
-CellID = int
+_NOT_NAME = re.compile(r"[^0-9A-Za-z_ ]")
+_TO_ESCAPE = re.compile(r"([\\\'])")
 
 
-def to_lang_representation(cplx) -> str:
-    cell2name: Dict[CellID, str] = {}
-    name2count: Dict[str, int] = defaultdict(int)
+def _escape_label(label: str) -> str:
+    if "\\" in label or "'" in label:
+        return _TO_ESCAPE.sub(r"\\\1", label)
+    return label
 
-    def escape_label(label):
-        return re.sub(r"([\\\'])", r"\\\1", label)
 
-    def get_name(c: Cell) -> str:
-        if id(c) in cell2name:
-            return cell2name[id(c)]
-        if c.dimension == 1 and c.label == "":
-            prefix = "one_cell"
+def _cells_to_dump(cplx, cells: Optional[Iterable[ICell]]) -> List[List[ICell]]:
+    """
+    Live cells grouped by dimension, in creation order where the complex
+    tracks it. A subset is extended with the cells its lines refer to.
+    """
+    if cells is None:
+        layers = []
+        layer = cplx.get_layer_cells(0)
+        while layer:
+            layers.append(list(layer))
+            layer = cplx.get_layer_cells(len(layers))
+    else:
+        dump: Set[ICell] = set()
+        stack = [x for x in cells if x in cplx]
+        while stack:
+            x = stack.pop()
+            if x not in dump:
+                dump.add(x)
+                stack.extend(x.boundary)
+                if x.dimension >= 1:
+                    stack.extend(cplx.get_atoms_of(x))
+        layers = [[] for _ in range(max((x.dimension for x in dump), default=-1) + 1)]
+        for x in dump:
+            layers[x.dimension].append(x)
+    position_of = getattr(cplx, "position_of", None)
+    if position_of is not None:
+        for layer in layers:
+            layer.sort(key=position_of)
+    return layers
+
+
+def _names(layers: List[List[ICell]]) -> Dict[ICell, str]:
+    """Unique name of every cell, derived from its label"""
+    names: Dict[ICell, str] = {}
+    taken: Set[str] = set()
+    suffixes: Dict[str, int] = defaultdict(int)
+    for dimension, layer in enumerate(layers):
+        for x in layer:
+            label = x.label
+            base = _NOT_NAME.sub("", label).replace(" ", "_")
+            if label == "" and dimension == 1:
+                base = "one_cell"
+            name = base or "cell"
+            while name in taken:
+                suffixes[base] += 1
+                name = f"{base}_{suffixes[base]}"
+            taken.add(name)
+            names[x] = name
+    return names
+
+
+def iter_lang_representation(
+    cplx, cells: Optional[Iterable[ICell]] = None
+) -> Iterator[str]:
+    """
+    Lines of the lang representation of `cplx`, or of `cells` and the cells
+    they refer to, see `from_lang_representation` for reading them back
+    """
+    layers = _cells_to_dump(cplx, cells)
+    names = _names(layers)
+    for x in layers[0] if layers else ():
+        yield f"{names[x]}: '{_escape_label(x.label)}'\n"
+    for dimension, layer in enumerate(layers[1:], 1):
+        for x in layer:
+            label, boundary = x.label, x.boundary
+            if dimension == 1 and len(boundary) == 2:
+                arrow = "-" if label == "" else "->"
+                a, b = names[boundary[0]], names[boundary[1]]
+                yield f"{names[x]}: {a}{arrow}{b}: '{_escape_label(label)}'\n"
+            else:
+                listed = ", ".join(names[b] for b in boundary)
+                yield f"{names[x]}: [{listed}]: '{_escape_label(label)}'\n"
+    for layer in layers[1:]:
+        for x in layer:
+            atoms = [names[atom] for atom in cplx.get_atoms_of(x) if atom in names]
+            if atoms:
+                atoms_list = ", ".join(f"'{atom}'" for atom in sorted(atoms))
+                yield f"{names[x]} ~> [{atoms_list}]\n"
+
+
+def write_lang_representation(
+    cplx, f: TextIO, cells: Optional[Iterable[ICell]] = None, chunk_size: int = 1 << 12
+):
+    """Writes `iter_lang_representation` to `f` in chunks of `chunk_size` lines"""
+    lines = iter_lang_representation(cplx, cells)
+    while True:
+        chunk = "".join(itertools.islice(lines, chunk_size))
+        if not chunk:
+            return
+        f.write(chunk)
+
+
+def to_lang_representation(cplx, cells: Optional[Iterable[ICell]] = None) -> str:
+    return "".join(iter_lang_representation(cplx, cells))
+
+
+_CELL = re.compile(
+    r"(?P<name>\w*): "
+    r"(?:(?P<tail>\w*)->?(?P<head>\w*): |\[(?P<boundary>[^\]]*)\]: )?"
+    r"'(?P<label>(?:[^'\\]|\\.)*)'\s*\Z",
+    re.ASCII | re.DOTALL,
+)
+# a cell whose label goes on in the next line
+_OPEN_CELL = re.compile(
+    r"\w*: (?:\w*->?\w*: |\[[^\]]*\]: )?'(?:[^'\\]|\\.)*\Z",
+    re.ASCII | re.DOTALL,
+)
+_ATOMS = re.compile(r"(?P<name>\w*) ~> \[(?P<atoms>[^\]]*)\]\s*\Z", re.ASCII)
+_ATOM = re.compile(r"'(\w*)'", re.ASCII)
+_ESCAPE = re.compile(r"\\(.)", re.DOTALL)
+
+
+def from_lang_representation(lines: Iterable[str], cplx=None, batch_size=1 << 16):
+    """
+    Reads the output of `to_lang_representation` back, from a file object or
+    any other iterable of lines, into `cplx` or a new `CWComplex`.
+
+    Cells are inserted with one `bulk_load` per `batch_size` of them, so only
+    the names read so far are kept in memory. A name must be defined before
+    it is used.
+    """
+    if cplx is None:
+        cplx = CWComplex()
+    batch = BatchBuilder(cplx, batch_size)
+    positions: Dict[str, int] = {}
+
+    def position_of(name: str, line_no: int) -> int:
+        try:
+            return positions[name]
+        except KeyError:
+            raise ValueError(f"Line {line_no}: '{name}' is not defined") from None
+
+    record: List[str] = []
+    for line_no, line in enumerate(lines, 1):
+        if not record and not line.strip():
+            continue
+        record.append(line)
+        text = line if len(record) == 1 else "".join(record)
+        match = _CELL.match(text)
+        if match is None:
+            if _OPEN_CELL.match(text):
+                continue
+            atoms = _ATOMS.match(text)
+            if atoms is None:
+                raise ValueError(f"Line {line_no}: cannot parse {text!r}")
+            expansion = position_of(atoms["name"], line_no)
+            for atom in _ATOM.findall(atoms["atoms"]):
+                batch.add_atom_link(expansion, position_of(atom, line_no))
+            record.clear()
+            continue
+        record.clear()
+
+        if match["tail"] is not None:
+            boundary = [match["tail"], match["head"]]
+        elif match["boundary"] is not None:
+            boundary = [x.strip() for x in match["boundary"].split(",")]
         else:
-            prefix = ""
-
-        name = prefix + re.sub(r"\s", "_", re.sub("[^0-9A-Za-z_ ]", "", c.label))
-        if name in name2count:
-            name2count[name] += 1
-            name += "_" + str(name2count[name])
-        cell2name[id(c)] = name
-        return name
-
-    result = ""
-    for cell in cplx.layers[0]:
-        result += get_name(cell) + ": '" + escape_label(cell.label) + "'\n"
-
-    for cell in cplx.layers[1]:
-        result += get_name(cell) + ": " + get_name(cell.boundary[0])
-        result += "-" if cell.label == "" else "->"
-        result += get_name(cell.boundary[1]) + ": '" + escape_label(cell.label) + "'\n"
-
-    for layer in cplx.layers[2:]:
-        for cell in layer:
-            result += get_name(cell) + ": ["
-            for b in cell.boundary:
-                result += get_name(b) + ", "
-            result = result.rstrip(", ")
-            result += "]: '" + escape_label(cell.label) + "'\n"
-
-    for a in cplx.atomisations:
-        result += (
-            f"{get_name(a.closure_of)} ~> {[get_name(atom) for atom in a.atoms]}\n"
+            boundary = []
+        if match["name"] in positions:
+            raise ValueError(f"Line {line_no}: '{match['name']}' is defined twice")
+        label = match["label"]
+        if "\\" in label:
+            label = _ESCAPE.sub(r"\1", label)
+        positions[match["name"]] = batch.add(
+            label, [position_of(x, line_no) for x in boundary]
         )
-
-    return result
+    if record:
+        raise ValueError(f"Line {line_no}: unterminated label")
+    batch.flush()
+    return cplx
@@ -0,0 +1,159 @@
+"""
+Columnar input for `ICWComplex.bulk_load`.
+
+A batch of `n` cells is described by `n` labels and a CSR boundary:
+the boundary of the i-th cell is
+`boundary_indices[boundary_offsets[i]:boundary_offsets[i + 1]]`.
+An index `j >= 0` refers to the j-th cell of the batch, which must come
+before the cell it bounds, and `j < 0` refers to `existing[-j - 1]`.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+
+@dataclass
+class Batch:
+    labels: Sequence[str]
+    offsets: np.ndarray
+    indices: np.ndarray
+    dimensions: np.ndarray
+    atom_links: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def boundary(self, i: int) -> np.ndarray:
+        return self.indices[self.offsets[i] : self.offsets[i + 1]]
+
+
+def prepare_batch(
+    labels: Sequence[str],
+    boundary_offsets=None,
+    boundary_indices=None,
+    existing_dimensions=(),
+    dimensions=None,
+    atom_links=None,
+) -> Batch:
+    """Normalizes the input arrays, infers and validates dimensions"""
+    n = len(labels)
+    if boundary_offsets is None:
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        indices = np.empty(0, dtype=np.int64)
+    else:
+        offsets = np.asarray(boundary_offsets, dtype=np.int64)
+        indices = np.asarray(boundary_indices, dtype=np.int64)
+    if len(offsets) != n + 1 or offsets[0] != 0 or offsets[-1] != len(indices):
+        raise ValueError("boundary_offsets do not match labels and boundary_indices")
+    existing_dimensions = np.asarray(existing_dimensions, dtype=np.int64)
+
+    counts = np.diff(offsets)
+    owners = np.repeat(np.arange(n, dtype=np.int64), counts)
+    if (indices >= owners).any():
+        raise ValueError("Boundary refers to a cell that is not before it in the batch")
+    if (indices < -len(existing_dimensions)).any():
+        raise ValueError("Boundary refers to a missing existing cell")
+
+    inferred = _infer_dimensions(offsets, indices, existing_dimensions)
+    if dimensions is not None and not np.array_equal(inferred, dimensions):
+        raise ValueError("dimensions do not match the boundaries")
+    if ((inferred == 1) & (counts > 2)).any():
+        raise RuntimeError("1-cell cannot be connected with 3 or more 0-cells")
+
+    if atom_links is None:
+        atom_links = np.empty((0, 2), dtype=np.int64)
+    atom_links = np.asarray(atom_links, dtype=np.int64).reshape(-1, 2)
+    if ((atom_links >= n) | (atom_links < -len(existing_dimensions))).any():
+        raise ValueError("Atom link refers to a missing cell")
+
+    return Batch(labels, offsets, indices, inferred, atom_links)
+
+
+def _infer_dimensions(
+    offsets: np.ndarray, indices: np.ndarray, existing_dimensions: np.ndarray
+) -> np.ndarray:
+    """One vectorized pass per level of nesting inside the batch"""
+    n = len(offsets) - 1
+    dimensions = np.zeros(n, dtype=np.int64)
+    has_boundary = np.diff(offsets) > 0
+    starts = offsets[:-1][has_boundary]
+    if len(starts) == 0:
+        return dimensions
+
+    in_batch = indices >= 0
+    boundary_dimensions = np.full(len(indices), -1, dtype=np.int64)
+    boundary_dimensions[~in_batch] = existing_dimensions[-indices[~in_batch] - 1]
+    dimensions[has_boundary] = -1
+    while True:
+        boundary_dimensions[in_batch] = dimensions[indices[in_batch]]
+        resolved = np.minimum.reduceat(boundary_dimensions, starts) >= 0
+        highest = np.maximum.reduceat(boundary_dimensions, starts)
+        dimensions[has_boundary] = np.where(resolved, highest + 1, -1)
+        if resolved.all():
+            return dimensions
+
+
+def resolve(batch_cells: Sequence, existing: Sequence, index: int):
+    """Cell referred to by `index`, see the module docstring"""
+    return batch_cells[index] if index >= 0 else existing[-index - 1]
+
+
+class BatchBuilder:
+    """
+    Collects cells and atom links given by position, see
+    `CWComplex.position_of`, and inserts them into `complex_` with one
+    `bulk_load` per `size` cells. Positions of cells that are not inserted yet
+    are the ones they will get.
+    """
+
+    def __init__(self, complex_, size: int = 1 << 16):
+        self._complex = complex_
+        self._size = size
+        self._reset()
+
+    def _reset(self):
+        self._first = len(self._complex)
+        self._labels: List[str] = []
+        self._offsets = [0]
+        self._indices: List[int] = []
+        self._atom_links: List[int] = []
+        self._existing: Dict[int, int] = {}
+
+    def _start(self):
+        # the complex may have changed since the last flush
+        if not self._labels and not self._atom_links:
+            self._first = len(self._complex)
+
+    def _ref(self, position: int) -> int:
+        if position >= self._first:
+            return position - self._first
+        return -self._existing.setdefault(position, len(self._existing)) - 1
+
+    def add(self, label: str, boundary: Iterable[int] = ()) -> int:
+        """Position of the new cell"""
+        self._start()
+        position = self._first + len(self._labels)
+        self._indices.extend(self._ref(x) for x in boundary)
+        self._labels.append(label)
+        self._offsets.append(len(self._indices))
+        if len(self._labels) >= self._size:
+            self.flush()
+        return position
+
+    def add_atom_link(self, expansion: int, atom: int):
+        self._start()
+        self._atom_links += (self._ref(expansion), self._ref(atom))
+
+    def flush(self):
+        if self._labels or self._atom_links:
+            self._complex.bulk_load(
+                self._labels,
+                np.array(self._offsets, dtype=np.int64),
+                np.array(self._indices, dtype=np.int64),
+                existing=[self._complex.cell(p) for p in self._existing],
+                atom_links=np.array(self._atom_links, dtype=np.int64),
+            )
+        self._reset()
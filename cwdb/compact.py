@@ -0,0 +1,1013 @@
+"""
+Array-backed CW complex.
+
+Cells are identified by dense integer ids. Dimensions, labels and boundaries
+live in flat NumPy arrays (boundaries in CSR form: `offsets` + `indices`),
+and callers get lightweight `CompactCell` views instead of `Cell` objects.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import (
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+import numpy as np
+
+from .bulk import prepare_batch
+from .core import Cell
+from .embeddings import EmbeddingStore
+from .interfaces import CellId, ICell, IComplexListener, ICWComplex
+from .snapshot import (
+    Snapshot,
+    check_embedding,
+    encode_labels,
+    group,
+    read_snapshot,
+    write_snapshot,
+)
+
+
+def _checked_id(view) -> CellId:
+    """Id of a cell view, unless its complex was compacted since it was made"""
+    if view._generation != view._complex._generation:
+        raise ValueError(
+            f"view of id={view._raw_id} was made before the complex was compacted"
+        )
+    return view._raw_id
+
+
+class CompactCellData:
+    """`Data`-like view over a single cell of a `CompactCWComplex`"""
+
+    __slots__ = ("_complex", "_raw_id", "_generation")
+
+    def __init__(self, complex_: CompactCWComplex, id_: CellId):
+        self._complex = complex_
+        self._raw_id = id_
+        self._generation = complex_._generation
+
+    @property
+    def _id(self) -> CellId:
+        return _checked_id(self)
+
+    @property
+    def label(self) -> str:
+        return self._complex._label_of(self._id)
+
+    @label.setter
+    def label(self, value: str):
+        self._complex._set_label(self._id, value)
+
+    @property
+    def deleted(self) -> bool:
+        return bool(self._complex._deleted[self._id])
+
+    @deleted.setter
+    def deleted(self, value: bool):
+        self._complex._set_deleted(self._id, value)
+
+    @property
+    def embedding(self) -> np.ndarray:
+        return self._complex._get_embedding(self._id)
+
+    @embedding.setter
+    def embedding(self, value: np.ndarray):
+        self._complex._set_embedding(self._id, value)
+
+    @property
+    def task_implementation(self) -> Optional[Callable]:
+        return self._complex._task_implementations.get(self._id)
+
+    @task_implementation.setter
+    def task_implementation(self, value: Optional[Callable]):
+        self._complex._set_task_implementation(self._id, value)
+
+    @property
+    def zero_cells(self) -> Set[ICell]:
+        return set(self._complex._cells(self._complex._zero_cell_ids(self._id)))
+
+
+class CompactCell(ICell):
+    """View of a cell stored in a `CompactCWComplex`"""
+
+    __slots__ = ("_complex", "_raw_id", "_generation")
+
+    def __init__(self, complex_: CompactCWComplex, id_: CellId):
+        self._complex = complex_
+        self._raw_id = id_
+        self._generation = complex_._generation
+
+    @property
+    def _id(self) -> CellId:
+        return _checked_id(self)
+
+    @property
+    def dimension(self) -> int:
+        return int(self._complex._dimensions[self._id])
+
+    @property
+    def boundary(self) -> Tuple[ICell, ...]:
+        return tuple(self._complex._cells(self._complex._boundary_ids(self._id)))
+
+    @boundary.setter
+    def boundary(self, value: Iterable[ICell]):
+        raise NotImplementedError("Boundary of a compact cell cannot be reassigned")
+
+    @property
+    def data(self) -> CompactCellData:
+        return CompactCellData(self._complex, self._id)
+
+    @property
+    def embedding(self) -> np.ndarray:
+        return self._complex._get_embedding(self._id)
+
+    @embedding.setter
+    def embedding(self, value: np.ndarray):
+        self._complex._set_embedding(self._id, value)
+
+    @property
+    def label(self) -> str:
+        result = self._complex._label_of(self._id)
+        if self._complex._deleted[self._id]:
+            result = "[DELETED] " + result
+        return result
+
+    @label.setter
+    def label(self, value: str):
+        self._complex._set_label(self._id, value)
+
+    @property
+    def zero_cells(self) -> Set[ICell]:
+        return self.data.zero_cells
+
+    @property
+    def id(self) -> CellId:
+        return self._id
+
+    def __eq__(self, other):
+        if isinstance(other, CompactCell):
+            return (
+                self._raw_id == other._raw_id
+                and self._complex is other._complex
+                and self._generation == other._generation
+            )
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._raw_id)
+
+    def __repr__(self):
+        if self._generation != self._complex._generation:
+            return f"CompactCell(id={self._raw_id}, stale)"
+        if self.dimension == 0:
+            return f'CompactCell("{self.label}", id={self._id})'
+        return (
+            f'CompactCell("{self.label}", id={self._id}'
+            f", dimension={self.dimension}"
+            ", boundary=[" + ", ".join(f'"{b.label}"' for b in self.boundary) + "]"
+            ")"
+        )
+
+
+class _GroupIndex:
+    """
+    Integer values grouped by integer keys.
+
+    The bulk of the index is a CSR array built in one vectorized pass;
+    values added since the last rebuild are kept in a small side table, and
+    values moved out of a CSR group since then in another one. Values of a
+    group come out in insertion order.
+    """
+
+    MIN_PENDING = 4096
+
+    def __init__(self):
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._values = np.empty(0, dtype=np.int64)
+        # dicts as insertion-ordered sets, so a value moves out in O(1)
+        self._pending: Dict[int, Dict[int, None]] = defaultdict(dict)
+        self._removed: Dict[int, Set[int]] = {}
+        self.n_pending = 0
+
+    def rebuild(self, keys: np.ndarray, values: np.ndarray, n_keys: int):
+        self._offsets, self._values = group(keys, values, n_keys)
+        self._pending = defaultdict(dict)
+        self._removed = {}
+        self.n_pending = 0
+
+    def add(self, key: int, value: int):
+        self._pending[key][value] = None
+        self.n_pending += 1
+
+    def move(self, value: int, old_key: int, new_key: int):
+        """Moves `value` from the group of `old_key` to the one of `new_key`"""
+        pending = self._pending.get(old_key)
+        if pending and value in pending:
+            del pending[value]
+        else:
+            self._removed.setdefault(old_key, set()).add(value)
+        removed = self._removed.get(new_key)
+        if removed and value in removed:
+            removed.discard(value)
+        else:
+            self._pending[new_key][value] = None
+        self.n_pending += 1
+
+    def is_due(self) -> bool:
+        """Whether the side table has grown enough to be folded into the CSR"""
+        return self.n_pending > max(self.MIN_PENDING, len(self._values) // 4)
+
+    def count(self, key: int) -> int:
+        result = len(self._pending.get(key, ())) - len(self._removed.get(key, ()))
+        if key + 1 < len(self._offsets):
+            result += int(self._offsets[key + 1] - self._offsets[key])
+        return result
+
+    def get(self, key: int) -> np.ndarray:
+        if key + 1 < len(self._offsets):
+            result = self._values[self._offsets[key] : self._offsets[key + 1]]
+        else:
+            result = self._values[:0]
+        removed = self._removed.get(key)
+        if removed:
+            result = result[~np.isin(result, list(removed))]
+        pending = self._pending.get(key)
+        if pending:
+            added = np.fromiter(pending, dtype=np.int64, count=len(pending))
+            result = np.concatenate([result, added])
+        return result
+
+
+class _EdgeIndex:
+    """
+    1-cells grouped by endpoint, one CSR per direction: by tail for "out",
+    by head for "in". The group of an endpoint is sorted by label id, so the
+    edges with one label are a range found by binary search. Edges added or
+    relabelled since the index was built are kept in a small side table.
+    """
+
+    def __init__(
+        self,
+        tails: np.ndarray,
+        heads: np.ndarray,
+        edges: np.ndarray,
+        labels: np.ndarray,
+        n_keys: int,
+    ):
+        self._groups = [
+            self._group(keys, edges, labels, n_keys) for keys in (tails, heads)
+        ]
+        # edge -> label id, per (direction, endpoint)
+        self._pending: Dict[Tuple[int, int], Dict[int, int]] = defaultdict(dict)
+        # relabelled edges, left out of their CSR range
+        self._moved: Dict[Tuple[int, int], Set[int]] = {}
+        self.n_pending = 0
+
+    @staticmethod
+    def _group(keys: np.ndarray, edges: np.ndarray, labels: np.ndarray, n_keys: int):
+        order = np.lexsort((labels, keys))
+        offsets = np.zeros(n_keys + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=n_keys), out=offsets[1:])
+        return offsets, edges[order], labels[order]
+
+    def add(self, tail: int, head: int, edge: int, label: int):
+        self._pending[0, tail][edge] = label
+        self._pending[1, head][edge] = label
+        self.n_pending += 1
+
+    def relabel(self, tail: int, head: int, edge: int, label: int):
+        for key in ((0, tail), (1, head)):
+            pending = self._pending[key]
+            if edge not in pending:
+                self._moved.setdefault(key, set()).add(edge)
+            pending[edge] = label
+        self.n_pending += 1
+
+    def is_due(self) -> bool:
+        return self.n_pending > max(
+            _GroupIndex.MIN_PENDING, len(self._groups[0][1]) // 4
+        )
+
+    def get(self, direction: int, key: int, label: Optional[int]) -> np.ndarray:
+        """Edges of `key` in `direction`, 0 for "out", with `label` unless None"""
+        offsets, edges, labels = self._groups[direction]
+        if key + 1 < len(offsets):
+            start, end = int(offsets[key]), int(offsets[key + 1])
+            if label is not None:
+                found = np.searchsorted(labels[start:end], [label, label + 1])
+                start, end = start + int(found[0]), start + int(found[1])
+            result = edges[start:end]
+        else:
+            result = edges[:0]
+        moved = self._moved.get((direction, key))
+        if moved:
+            result = result[~np.isin(result, list(moved))]
+        pending = self._pending.get((direction, key))
+        if pending:
+            added = [e for e, e_label in pending.items() if label in (None, e_label)]
+            result = np.concatenate([result, np.array(added, dtype=np.int64)])
+        return result
+
+
+class CompactCWComplex(ICWComplex):
+    """
+    Drop-in `ICWComplex` that keeps cells in flat arrays.
+
+    Memory per cell is a handful of array slots instead of a `Cell`, a `Data`,
+    a `zero_cells` set and an embedding array. Cells handed out by the complex
+    are `CompactCell` views that are created on demand.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1024,
+        embedding_size: Optional[int] = None,
+        embedding_dtype=np.float64,
+    ):
+        """
+        With `embedding_size` set, embeddings of the cells of each dimension are
+        kept as rows of a single `embedding_dtype` matrix
+        """
+        self._size = 0
+        self._n_boundary = 0
+        self._dimensions = np.zeros(capacity, dtype=np.int8)
+        self._label_ids = np.zeros(capacity, dtype=np.int32)
+        self._deleted = np.zeros(capacity, dtype=bool)
+        # ids flagged with `data.deleted` only, reported as deleted by `compact`
+        self._flagged: Set[CellId] = set()
+        self._boundary_offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self._boundary_indices = np.zeros(2 * capacity, dtype=np.int64)
+
+        self._labels: List[str] = []
+        self._label_table: Dict[str, int] = {}
+        self._embeddings: Dict[CellId, np.ndarray] = {}
+        self._embedding_store: Optional[EmbeddingStore] = None
+        self._embedding_rows = np.zeros(capacity, dtype=np.int64)
+        if embedding_size is not None:
+            self._embedding_store = EmbeddingStore(embedding_size, embedding_dtype)
+        self._task_implementations: Dict[CellId, Callable] = {}
+        self._atoms_of: Dict[CellId, Set[CellId]] = defaultdict(set)
+        self._extensions_of: Dict[CellId, Set[CellId]] = defaultdict(set)
+
+        self._coboundary_index = _GroupIndex()
+        self._label_index = _GroupIndex()
+        # built on first use, dropped when labels change or cells are renumbered
+        self._edge_index: Optional[_EdgeIndex] = None
+        self._listeners: List[IComplexListener] = []
+        # bumped by `compact`, views of older generations refer to old ids
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    # Cell views
+
+    def cell(self, id_: CellId) -> CompactCell:
+        if not 0 <= id_ < self._size:
+            raise KeyError(f"id={id_}")
+        return CompactCell(self, id_)
+
+    def _cells(self, ids: Iterable[int]) -> List[ICell]:
+        return [CompactCell(self, int(i)) for i in ids]
+
+    def _id_of(self, cell: ICell) -> CellId:
+        if not isinstance(cell, CompactCell) or cell._complex is not self:
+            raise ValueError(f"{cell!r} does not belong to this complex")
+        return cell._id
+
+    def position_of(self, cell: ICell) -> CellId:
+        """Id of `cell`, named as in `CWComplex.position_of`"""
+        return self._id_of(cell)
+
+    def subscribe(self, listener: IComplexListener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: IComplexListener):
+        self._listeners.remove(listener)
+
+    # Raw storage
+
+    def _boundary_ids(self, id_: CellId) -> np.ndarray:
+        start, end = self._boundary_offsets[id_ : id_ + 2]
+        return self._boundary_indices[start:end]
+
+    def _label_of(self, id_: CellId) -> str:
+        return self._labels[self._label_ids[id_]]
+
+    def _label_id(self, label: str) -> int:
+        label_id = self._label_table.get(label)
+        if label_id is None:
+            label_id = self._label_table[label] = len(self._labels)
+            self._labels.append(label)
+        return label_id
+
+    def _find_label_id(self, label: str) -> Optional[int]:
+        return self._label_table.get(label)
+
+    def _set_label(self, id_: CellId, label: str):
+        old_label = self._label_of(id_)
+        old_id, label_id = int(self._label_ids[id_]), self._label_id(label)
+        self._label_ids[id_] = label_id
+        self._label_index.move(id_, old_id, label_id)
+        if self._label_index.is_due():
+            self._rebuild_label_index()
+        boundary = self._boundary_ids(id_).tolist()
+        if self._edge_index is not None and len(boundary) == 2:
+            if self._dimensions[id_] == 1:
+                self._edge_index.relabel(boundary[0], boundary[1], id_, label_id)
+                if self._edge_index.is_due():
+                    self._edge_index = None
+        for listener in self._listeners:
+            listener.label_changed(CompactCell(self, id_), old_label)
+
+    def _set_deleted(self, id_: CellId, value: bool):
+        if value and not self._deleted[id_]:
+            self._flagged.add(id_)
+        elif not value:
+            self._flagged.discard(id_)
+        self._deleted[id_] = value
+
+    def _set_task_implementation(self, id_: CellId, value: Optional[Callable]):
+        if value is None:
+            self._task_implementations.pop(id_, None)
+        else:
+            self._task_implementations[id_] = value
+
+    def _get_embedding(self, id_: CellId) -> np.ndarray:
+        if self._embedding_store is not None:
+            matrix = self._embedding_store.matrix(int(self._dimensions[id_]))
+            return matrix.row(self._embedding_rows[id_])
+        embedding = self._embeddings.get(id_)
+        if embedding is None:
+            return np.empty(shape=(0,))
+        return embedding
+
+    def _set_embedding(self, id_: CellId, value: np.ndarray):
+        if self._embedding_store is not None:
+            self._get_embedding(id_)[:] = value
+        else:
+            self._embeddings[id_] = value
+        for listener in self._listeners:
+            listener.embeddings_changed([CompactCell(self, id_)])
+
+    def _zero_cell_ids(self, id_: CellId) -> np.ndarray:
+        if self._dimensions[id_] == 0:
+            return np.array([id_], dtype=np.int64)
+        frontier = self._boundary_ids(id_)
+        zero_cells = []
+        while len(frontier):
+            frontier = np.unique(frontier)
+            is_zero = self._dimensions[frontier] == 0
+            zero_cells.append(frontier[is_zero])
+            frontier = np.concatenate(
+                [self._boundary_ids(i) for i in frontier[~is_zero]] or [frontier[:0]]
+            )
+        return np.unique(np.concatenate(zero_cells))
+
+    def _reserve(self, n_cells: int, n_boundary: int):
+        capacity = len(self._dimensions)
+        if self._size + n_cells > capacity:
+            capacity = max(2 * capacity, self._size + n_cells)
+            for name in ("_dimensions", "_label_ids", "_deleted", "_embedding_rows"):
+                old = getattr(self, name)
+                new = np.zeros(capacity, dtype=old.dtype)
+                new[: self._size] = old[: self._size]
+                setattr(self, name, new)
+            offsets = np.zeros(capacity + 1, dtype=np.int64)
+            offsets[: self._size + 1] = self._boundary_offsets[: self._size + 1]
+            self._boundary_offsets = offsets
+        if self._n_boundary + n_boundary > len(self._boundary_indices):
+            size = max(2 * len(self._boundary_indices), self._n_boundary + n_boundary)
+            indices = np.zeros(size, dtype=np.int64)
+            indices[: self._n_boundary] = self._boundary_indices[: self._n_boundary]
+            self._boundary_indices = indices
+
+    def _append(self, label: str, dimension: int, boundary: List[CellId]) -> CellId:
+        self._reserve(1, len(boundary))
+        id_ = self._size
+        self._dimensions[id_] = dimension
+        self._label_ids[id_] = label_id = self._label_id(label)
+        end = self._n_boundary + len(boundary)
+        self._boundary_indices[self._n_boundary : end] = boundary
+        self._boundary_offsets[id_ + 1] = end
+        self._n_boundary = end
+        self._size += 1
+        if self._embedding_store is not None:
+            matrix = self._embedding_store.matrix(dimension)
+            self._embedding_rows[id_] = matrix.append()
+
+        for b in boundary:
+            self._coboundary_index.add(b, id_)
+        if self._coboundary_index.is_due():
+            self._rebuild_coboundary_index()
+        self._label_index.add(label_id, id_)
+        if self._label_index.is_due():
+            self._rebuild_label_index()
+        if self._edge_index is not None and dimension == 1 and len(boundary) == 2:
+            self._edge_index.add(boundary[0], boundary[1], id_, label_id)
+            if self._edge_index.is_due():
+                self._edge_index = None
+        for listener in self._listeners:
+            listener.cell_created(CompactCell(self, id_))
+        return id_
+
+    def _refute_use_of_deleted(self, ids):
+        ids = np.asarray(ids, dtype=np.int64)
+        for id_ in ids[self._deleted[ids]].tolist():
+            raise RuntimeError(f"Cell '{self._label_of(id_)}' is deleted")
+
+    # Indexes
+
+    def _rebuild_coboundary_index(self):
+        n = self._n_boundary
+        counts = np.diff(self._boundary_offsets[: self._size + 1])
+        owners = np.repeat(np.arange(self._size, dtype=np.int64), counts)
+        self._coboundary_index.rebuild(
+            self._boundary_indices[:n], owners, n_keys=self._size
+        )
+
+    def _rebuild_label_index(self):
+        self._label_index.rebuild(
+            self._label_ids[: self._size],
+            np.arange(self._size, dtype=np.int64),
+            n_keys=len(self._labels),
+        )
+
+    def _edges(self) -> _EdgeIndex:
+        if self._edge_index is None:
+            n = self._size
+            counts = np.diff(self._boundary_offsets[: n + 1])
+            edges = np.flatnonzero((self._dimensions[:n] == 1) & (counts == 2))
+            starts = self._boundary_offsets[edges]
+            self._edge_index = _EdgeIndex(
+                self._boundary_indices[starts],
+                self._boundary_indices[starts + 1],
+                edges,
+                self._label_ids[edges].astype(np.int64),
+                n,
+            )
+        return self._edge_index
+
+    def _edges_of(self, cell: ICell, direction: int, label) -> Set[ICell]:
+        label_id = None
+        if label is not None:
+            label_id = self._find_label_id(label)
+            if label_id is None:
+                return set()
+        ids = self._edges().get(direction, self._id_of(cell), label_id)
+        return set(self._cells(ids[~self._deleted[ids]]))
+
+    def _coboundary_ids(self, id_: CellId) -> np.ndarray:
+        return self._coboundary_index.get(id_)
+
+    def _label_ids_of(self, label: str) -> np.ndarray:
+        label_id = self._find_label_id(label)
+        if label_id is None:
+            return np.empty(0, dtype=np.int64)
+        return self._label_index.get(label_id)
+
+    # ICWComplex
+
+    def get_layer_cells(self, layer: int) -> Set[ICell]:
+        n = self._size
+        live = (self._dimensions[:n] == layer) & ~self._deleted[:n]
+        return set(self._cells(np.flatnonzero(live)))
+
+    def find_link(
+        self, a: ICell, b: ICell, label="", oriented=False
+    ) -> Optional[ICell]:
+        a_id, b_id = self._id_of(a), self._id_of(b)
+        label_id = self._find_label_id(label)
+        if label_id is None:
+            return None
+        # scan the cofaces of the endpoint with the smaller degree
+        index = self._coboundary_index
+        if index.count(a_id) <= index.count(b_id):
+            candidates = index.get(a_id)
+        else:
+            candidates = index.get(b_id)
+        candidates = candidates[
+            (self._dimensions[candidates] == 1)
+            & (self._label_ids[candidates] == label_id)
+            & ~self._deleted[candidates]
+        ]
+        for c in candidates:
+            boundary = self._boundary_ids(c)
+            if len(boundary) != 2:
+                continue
+            if (boundary[0] == a_id and boundary[1] == b_id) or (
+                not oriented and boundary[0] == b_id and boundary[1] == a_id
+            ):
+                return CompactCell(self, int(c))
+        return None
+
+    def link(self, a: ICell, b: ICell, label="", oriented=False) -> ICell:
+        assert a.dimension == 0
+        assert b.dimension == 0
+
+        existing = self.find_link(a, b, label, oriented)
+        if existing is not None:
+            return existing
+        return self.create_cell(label, [a, b])
+
+    def create_atom_link(self, expansion: ICell, atom: ICell):
+        assert expansion.dimension >= 1
+        assert atom.dimension == 0
+        expansion_id, atom_id = self._id_of(expansion), self._id_of(atom)
+        assert atom_id not in self._atoms_of[expansion_id]
+        self._atoms_of[expansion_id].add(atom_id)
+        self._extensions_of[atom_id].add(expansion_id)
+        for listener in self._listeners:
+            listener.atom_link_created(expansion, atom)
+
+    def delete_atom_link(self, expansion: ICell, atom: ICell):
+        expansion_id, atom_id = self._id_of(expansion), self._id_of(atom)
+        self._atoms_of[expansion_id].remove(atom_id)
+        self._extensions_of[atom_id].remove(expansion_id)
+        for listener in self._listeners:
+            listener.atom_link_deleted(expansion, atom)
+
+    def get_atoms_of(self, expansion: ICell) -> Set[ICell]:
+        return set(self._cells(self._atoms_of.get(self._id_of(expansion), ())))
+
+    def get_expansions_of(self, atom: ICell) -> Set[ICell]:
+        return set(self._cells(self._extensions_of.get(self._id_of(atom), ())))
+
+    def create_cell(self, label: str, boundary=None) -> ICell:
+        if not boundary:
+            return CompactCell(self, self._append(label, 0, []))
+
+        boundary_ids = [self._id_of(b) for b in boundary]
+        self._refute_use_of_deleted(boundary_ids)
+        dimension = int(self._dimensions[boundary_ids].max()) + 1
+        if dimension == 1:
+            if len(boundary) > 2:
+                raise RuntimeError("1-cell cannot be connected with 3 or more 0-cells")
+        else:
+            Cell.check_boundary_connectedness(boundary)
+            Cell.check_boundary_is_minimal(boundary)
+        return CompactCell(self, self._append(label, dimension, boundary_ids))
+
+    def bulk_load(
+        self,
+        labels: Sequence[str],
+        boundary_offsets=None,
+        boundary_indices=None,
+        existing: Sequence[ICell] = (),
+        dimensions=None,
+        atom_links=None,
+    ) -> List[ICell]:
+        existing_ids = np.array([self._id_of(x) for x in existing], dtype=np.int64)
+        self._refute_use_of_deleted(existing_ids)
+        batch = prepare_batch(
+            labels,
+            boundary_offsets,
+            boundary_indices,
+            self._dimensions[existing_ids],
+            dimensions,
+            atom_links,
+        )
+        n, first, first_boundary = len(batch), self._size, self._n_boundary
+
+        def to_ids(refs: np.ndarray) -> np.ndarray:
+            ids = refs + first
+            outside = refs < 0
+            ids[outside] = existing_ids[-refs[outside] - 1]
+            return ids
+
+        self._reserve(n, len(batch.indices))
+        new = slice(first, first + n)
+        self._dimensions[new] = batch.dimensions
+        self._label_ids[new] = [self._label_id(label) for label in batch.labels]
+        self._deleted[new] = False
+        end = first_boundary + len(batch.indices)
+        self._boundary_indices[first_boundary:end] = to_ids(batch.indices)
+        self._boundary_offsets[first + 1 : first + n + 1] = (
+            first_boundary + batch.offsets[1:]
+        )
+        self._size, self._n_boundary = first + n, end
+
+        closures: Dict[CellId, FrozenSet[CellId]] = {}
+        try:
+            for i in np.flatnonzero(batch.dimensions >= 2).tolist():
+                boundary = list(CompactCell(self, first + i).boundary)
+                Cell.check_boundary_connectedness(boundary)
+                Cell.check_boundary_is_minimal(boundary, closures)
+        except RuntimeError:
+            self._size, self._n_boundary = first, first_boundary
+            raise
+
+        if self._embedding_store is not None:
+            for dimension in np.unique(batch.dimensions):
+                mask = batch.dimensions == dimension
+                rows = self._embedding_store.matrix(int(dimension)).append(
+                    int(mask.sum())
+                )
+                self._embedding_rows[new][mask] = rows + np.arange(mask.sum())
+        if n < _GroupIndex.MIN_PENDING:
+            counts = np.diff(batch.offsets)
+            owners = np.repeat(np.arange(first, first + n), counts)
+            for b, id_ in zip(to_ids(batch.indices).tolist(), owners.tolist()):
+                self._coboundary_index.add(b, id_)
+            for id_ in range(first, first + n):
+                self._label_index.add(int(self._label_ids[id_]), id_)
+        if n >= _GroupIndex.MIN_PENDING or self._coboundary_index.is_due():
+            self._rebuild_coboundary_index()
+        if n >= _GroupIndex.MIN_PENDING or self._label_index.is_due():
+            self._rebuild_label_index()
+
+        if self._edge_index is not None and n < _GroupIndex.MIN_PENDING:
+            edges = (batch.dimensions == 1) & (np.diff(batch.offsets) == 2)
+            for id_ in (first + np.flatnonzero(edges)).tolist():
+                tail, head = self._boundary_ids(id_).tolist()
+                self._edge_index.add(tail, head, id_, int(self._label_ids[id_]))
+        if n >= _GroupIndex.MIN_PENDING or (
+            self._edge_index is not None and self._edge_index.is_due()
+        ):
+            self._edge_index = None
+        for listener in self._listeners:
+            for id_ in range(first, first + n):
+                listener.cell_created(CompactCell(self, id_))
+        for expansion, atom in to_ids(batch.atom_links).tolist():
+            self.create_atom_link(CompactCell(self, expansion), CompactCell(self, atom))
+        return self._cells(range(first, first + n))
+
+    def delete_cell(self, cell: ICell):
+        self._delete_ids(np.array([self._id_of(cell)], dtype=np.int64))
+
+    def delete_cells(self, cells: Iterable[ICell]):
+        ids = [self._id_of(cell) for cell in cells]
+        self._delete_ids(np.array(ids, dtype=np.int64))
+
+    def _delete_ids(self, ids: np.ndarray):
+        """Flags `ids` and all their cofaces as deleted, drops their atom links"""
+        frontier = ids
+        while len(frontier):
+            frontier = np.unique(frontier)
+            newly_deleted = frontier[self._unreported(frontier)].tolist()
+            self._flagged.difference_update(newly_deleted)
+            self._deleted[frontier] = True
+            for listener in self._listeners:
+                for id_ in newly_deleted:
+                    listener.cell_deleted(CompactCell(self, id_))
+            for id_ in frontier.tolist():
+                for atom in self._atoms_of.pop(id_, ()):
+                    self._extensions_of[atom].discard(id_)
+                for expansion in self._extensions_of.pop(id_, ()):
+                    self._atoms_of[expansion].discard(id_)
+            cofaces = [self._coboundary_ids(i) for i in frontier.tolist()]
+            frontier = np.concatenate(cofaces)
+            frontier = frontier[self._unreported(frontier)]
+
+    def _unreported(self, ids: np.ndarray) -> np.ndarray:
+        """Mask of the `ids` whose deletion listeners have not been told of"""
+        mask = ~self._deleted[ids]
+        if self._flagged:
+            mask |= np.isin(ids, np.fromiter(self._flagged, np.int64))
+        return mask
+
+    def compact(self) -> np.ndarray:
+        """
+        Removes deleted cells from storage and renumbers the live ones.
+
+        Returns the new id of every old id, -1 for removed cells. Views handed
+        out before the call refer to old ids: using them raises `ValueError`,
+        and they are no longer in the complex.
+        """
+        n = self._size
+        # cofaces of cells that were only flagged with `data.deleted`
+        self._delete_ids(np.flatnonzero(self._deleted[:n]))
+        keep = np.flatnonzero(~self._deleted[:n])
+        new_ids = np.full(n, -1, dtype=np.int64)
+        new_ids[keep] = np.arange(len(keep))
+
+        counts = np.diff(self._boundary_offsets[: n + 1])
+        kept_boundary = np.repeat(~self._deleted[:n], counts)
+        indices = new_ids[self._boundary_indices[: self._n_boundary][kept_boundary]]
+        self._boundary_indices = np.zeros(max(len(indices), 2), dtype=np.int64)
+        self._boundary_indices[: len(indices)] = indices
+        self._n_boundary = len(indices)
+
+        capacity = max(len(keep), 1)
+        offsets = np.zeros(capacity + 1, dtype=np.int64)
+        np.cumsum(counts[keep], out=offsets[1 : len(keep) + 1])
+        self._boundary_offsets = offsets
+        for name in ("_dimensions", "_label_ids", "_deleted", "_embedding_rows"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[: len(keep)] = old[keep]
+            setattr(self, name, new)
+        self._size = len(keep)
+
+        if self._embedding_store is not None:
+            self._embedding_rows[: self._size] = self._embedding_store.keep(
+                self._dimensions[: self._size].astype(np.int64),
+                self._embedding_rows[: self._size],
+            )
+        self._embeddings = {
+            int(new_ids[i]): value
+            for i, value in self._embeddings.items()
+            if new_ids[i] >= 0
+        }
+        self._task_implementations = {
+            int(new_ids[i]): value
+            for i, value in self._task_implementations.items()
+            if new_ids[i] >= 0
+        }
+        for name in ("_atoms_of", "_extensions_of"):
+            links: Dict[CellId, Set[CellId]] = defaultdict(set)
+            for i, others in getattr(self, name).items():
+                if others:
+                    links[int(new_ids[i])] = {int(new_ids[j]) for j in others}
+            setattr(self, name, links)
+        self._rebuild_coboundary_index()
+        self._rebuild_label_index()
+        self._edge_index = None
+        self._generation += 1
+        for listener in self._listeners:
+            listener.compacted(new_ids)
+        return new_ids
+
+    def save(self, path):
+        """Writes a binary snapshot, see `cwdb.snapshot`"""
+        write_snapshot(path, self._to_snapshot())
+
+    @classmethod
+    def load(cls, path) -> CompactCWComplex:
+        """Restores a complex saved by `save`, with the same cell ids"""
+        return cls._from_snapshot(read_snapshot(path))
+
+    def _to_snapshot(self) -> Snapshot:
+        n = self._size
+        label_offsets, label_bytes, label_ids = encode_labels(
+            self._labels, self._label_ids[:n]
+        )
+        atom_links = np.array(
+            [
+                (expansion, atom)
+                for expansion, atoms in sorted(self._atoms_of.items())
+                for atom in sorted(atoms)
+            ],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        snapshot = Snapshot(
+            dimensions=self._dimensions[:n],
+            label_ids=label_ids,
+            label_offsets=label_offsets,
+            label_bytes=label_bytes,
+            deleted=self._deleted[:n],
+            boundary_offsets=self._boundary_offsets[: n + 1],
+            boundary_indices=self._boundary_indices[: self._n_boundary],
+            atom_links=atom_links,
+        )
+        if self._embedding_store is not None:
+            snapshot.embedding_width = self._embedding_store.width
+            snapshot.embedding_dtype = self._embedding_store.dtype
+            snapshot.embedding_matrices = self._embedding_store.arrays()
+            snapshot.embedding_rows = self._embedding_rows[:n]
+        else:
+            embeddings = {
+                id_: check_embedding(embedding)
+                for id_, embedding in self._embeddings.items()
+            }
+            lengths = np.zeros(n, dtype=np.int64)
+            for id_, embedding in embeddings.items():
+                lengths[id_] = len(embedding)
+            snapshot.embedding_offsets = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(lengths, out=snapshot.embedding_offsets[1:])
+            values = np.empty(snapshot.embedding_offsets[-1], dtype=np.float64)
+            for id_, embedding in embeddings.items():
+                start, end = snapshot.embedding_offsets[id_ : id_ + 2]
+                values[start:end] = embedding
+            snapshot.embedding_values = values
+        return snapshot
+
+    @classmethod
+    def _from_snapshot(cls, snapshot: Snapshot) -> CompactCWComplex:
+        n = len(snapshot)
+        result = cls(
+            capacity=max(n, 1),
+            embedding_size=snapshot.embedding_width,
+            embedding_dtype=snapshot.embedding_dtype or np.float64,
+        )
+        result._reserve(0, len(snapshot.boundary_indices))
+        result._dimensions[:n] = snapshot.dimensions
+        result._label_ids[:n] = snapshot.label_ids
+        result._deleted[:n] = snapshot.deleted
+        result._boundary_offsets[: n + 1] = snapshot.boundary_offsets
+        result._n_boundary = len(snapshot.boundary_indices)
+        result._boundary_indices[: result._n_boundary] = snapshot.boundary_indices
+        result._size = n
+        result._labels = snapshot.labels
+        result._label_table = {label: i for i, label in enumerate(result._labels)}
+
+        if result._embedding_store is not None:
+            assert snapshot.embedding_matrices is not None
+            assert snapshot.embedding_rows is not None
+            for dimension, values in snapshot.embedding_matrices.items():
+                result._embedding_store.matrix(dimension).extend(values)
+            result._embedding_rows[:n] = snapshot.embedding_rows
+        elif snapshot.embedding_offsets is not None:
+            assert snapshot.embedding_values is not None
+            offsets = snapshot.embedding_offsets
+            for id_ in np.flatnonzero(np.diff(offsets)).tolist():
+                embedding = snapshot.embedding_values[offsets[id_] : offsets[id_ + 1]]
+                result._embeddings[id_] = embedding.copy()
+        for expansion, atom in snapshot.atom_links.tolist():
+            result._atoms_of[expansion].add(atom)
+            result._extensions_of[atom].add(expansion)
+        result._rebuild_coboundary_index()
+        result._rebuild_label_index()
+        return result
+
+    def get_cell_by_label(self, label: str) -> ICell:
+        ids = self._label_ids_of(label)
+        ids = ids[~self._deleted[ids]]
+        if len(ids) == 0:
+            raise KeyError(f"label={label}")
+        return CompactCell(self, int(ids[np.argmin(self._dimensions[ids])]))
+
+    def get_cells_by_label(self, label: str, dimension=None) -> Set[ICell]:
+        ids = self._label_ids_of(label)
+        mask = ~self._deleted[ids]
+        if dimension is not None:
+            mask &= self._dimensions[ids] == dimension
+        return set(self._cells(ids[mask]))
+
+    def has_label(self, label: str) -> bool:
+        ids = self._label_ids_of(label)
+        return bool((~self._deleted[ids]).any())
+
+    def get_coboundary_of(self, cell: ICell) -> Set[ICell]:
+        id_ = self._id_of(cell)
+        if self._deleted[id_]:
+            return set()
+        ids = self._coboundary_ids(id_)
+        return set(self._cells(ids[~self._deleted[ids]]))
+
+    def out_edges(self, cell: ICell, label=None) -> Set[ICell]:
+        return self._edges_of(cell, 0, label)
+
+    def in_edges(self, cell: ICell, label=None) -> Set[ICell]:
+        return self._edges_of(cell, 1, label)
+
+    def cofaces_containing(
+        self, cells: Iterable[ICell], dimension=None, label=None
+    ) -> Set[ICell]:
+        coboundaries = sorted(
+            (self._coboundary_ids(self._id_of(x)) for x in cells), key=len
+        )
+        if not coboundaries:
+            raise ValueError("cofaces_containing needs at least one cell")
+        # coface ids are sorted, so every step is a binary search of the ids
+        # left so far in the next list
+        ids = coboundaries[0]
+        for coboundary in coboundaries[1:]:
+            if not len(ids) or not len(coboundary):
+                ids = ids[:0]
+                break
+            found = np.searchsorted(coboundary, ids).clip(max=len(coboundary) - 1)
+            ids = ids[coboundary[found] == ids]
+        ids = ids[~self._deleted[ids]]
+        if dimension is not None:
+            ids = ids[self._dimensions[ids] == dimension]
+        if label is not None:
+            ids = ids[self._label_ids[ids] == self._find_label_id(label)]
+        return set(self._cells(ids))
+
+    def get_embeddings(self, cells: Iterable[ICell]) -> np.ndarray:
+        if self._embedding_store is None:
+            return super().get_embeddings(cells)
+        ids = np.array([self._id_of(x) for x in cells], dtype=np.int64)
+        return self._embedding_store.get(
+            self._dimensions[ids], self._embedding_rows[ids]
+        )
+
+    def set_embeddings(self, cells: Iterable[ICell], values: np.ndarray):
+        if self._embedding_store is None:
+            return super().set_embeddings(cells, values)
+        ids = np.array([self._id_of(x) for x in cells], dtype=np.int64)
+        self._embedding_store.set(
+            self._dimensions[ids], self._embedding_rows[ids], values
+        )
+        if self._listeners:
+            cells = self._cells(ids.tolist())
+            for listener in self._listeners:
+                listener.embeddings_changed(cells)
+
+    def __contains__(self, item: ICell) -> bool:
+        return (
+            isinstance(item, CompactCell)
+            and item._complex is self
+            and item._generation == self._generation
+            and not self._deleted[item._raw_id]
+        )
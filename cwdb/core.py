@@ -2,11 +2,38 @@ from __future__ import annotations
 
 from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import Callable, Dict, List, Optional, Set, Tuple
+from itertools import compress
+from typing import (
+    Callable,
+    Collection,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 import numpy as np
 
-from .interfaces import CellId, ICell, ICWComplex
+from .bulk import Batch, prepare_batch, resolve
+from .embeddings import EmbeddingStore
+from .interfaces import CellId, ICell, IComplexListener, ICWComplex
+from .snapshot import (
+    Snapshot,
+    check_embedding,
+    encode_labels,
+    read_snapshot,
+    write_snapshot,
+)
+from .utils import DSU, gc_paused
+
+# Shared by every cell without an embedding, nothing can be stored in it
+_NO_EMBEDDING = np.empty(shape=(0,))
+_NO_EMBEDDING.flags.writeable = False
 
 
 @dataclass
@@ -14,17 +41,70 @@ class Data:
     """Flexible mutable smth"""
 
     label: str
-    zero_cells: Set[ICell] = field(default_factory=set, repr=False)
+    # computed on first access of `Cell.zero_cells`
+    zero_cells: Optional[Set[ICell]] = field(default=None, repr=False)
     deleted: bool = False
-    embedding: np.ndarray = field(default_factory=lambda: np.empty(shape=(0,)))
+    embedding: np.ndarray = field(default_factory=lambda: _NO_EMBEDDING)
     task_implementation: Optional[Callable] = None
 
 
+def iter_closure(cell: ICell) -> Iterator[ICell]:
+    """Yields `cell` and every cell of its closure, each one once"""
+    visited = {cell.id}
+    stack = [cell]
+    while stack:
+        x = stack.pop()
+        yield x
+        for b in x.boundary:
+            if b.id not in visited:
+                visited.add(b.id)
+                stack.append(b)
+
+
+def _peek_zero_cells(cell: ICell) -> Collection[ICell]:
+    """0-cells of the closure of `cell`, without caching them on the cell"""
+    if not isinstance(cell, Cell):
+        return cell.zero_cells
+    if cell.data.zero_cells is not None:
+        return cell.data.zero_cells
+    return [x for x in iter_closure(cell) if x.dimension == 0]
+
+
+def _strict_closure(
+    cell: ICell, closures: Dict[CellId, FrozenSet[CellId]]
+) -> FrozenSet[CellId]:
+    """Ids of the closure of `cell` without `cell` itself, memoized in `closures`"""
+    stack = [cell]
+    while stack:
+        x = stack[-1]
+        if x.id in closures:
+            stack.pop()
+            continue
+        missing = [b for b in x.boundary if b.id not in closures]
+        if missing:
+            stack.extend(missing)
+            continue
+        stack.pop()
+        closure: Set[CellId] = set()
+        for b in x.boundary:
+            closure.add(b.id)
+            closure |= closures[b.id]
+        closures[x.id] = frozenset(closure)
+    return closures[cell.id]
+
+
 class Cell(ICell):
+    __slots__ = ("__boundary", "__dimension", "_data", "_owner", "_row", "_position")
+
     def __init__(self, *, dimension: int, data: Data, boundary: Tuple[ICell, ...] = ()):
         self.__boundary = tuple(boundary)
         self.__dimension = dimension
         self._data = data
+        self._owner: Optional[CWComplex] = None
+        # row of the embedding in the owner's embedding matrix
+        self._row = -1
+        # index in the owner's creation-ordered list of cells
+        self._position = -1
 
     @property
     def dimension(self) -> int:
@@ -39,6 +119,7 @@ class Cell(ICell):
         self.check_boundary_connectedness(value)
         self.check_boundary_is_minimal(value)
         self.__boundary = tuple(value)
+        self.data.zero_cells = None
 
     @property
     def data(self) -> Data:
@@ -46,11 +127,18 @@ class Cell(ICell):
 
     @property
     def embedding(self) -> np.ndarray:
+        if self._row >= 0:
+            return self._owner._embedding_row(self)  # type: ignore[union-attr]
         return self.data.embedding
 
     @embedding.setter
     def embedding(self, value: np.ndarray):
-        self.data.embedding = value
+        if self._row >= 0:
+            self._owner._embedding_row(self)[:] = value  # type: ignore[union-attr]
+        else:
+            self.data.embedding = value
+        if self._owner is not None:
+            self._owner._embeddings_changed((self,))
 
     @property
     def label(self) -> str:
@@ -61,27 +149,29 @@ class Cell(ICell):
 
     @label.setter
     def label(self, value: str):
+        old_label = self.data.label
         self.data.label = value
+        if self._owner is not None:
+            self._owner._relabel(self, old_label)
 
     @property
     def zero_cells(self) -> Set[ICell]:
+        if self.data.zero_cells is None:
+            self.data.zero_cells = {x for x in iter_closure(self) if x.dimension == 0}
         return self.data.zero_cells
 
     @classmethod
     def from_label(cls, label: str) -> Cell:
-        cell = cls(data=Data(label=label), dimension=0)
-        cell.data.zero_cells = {cell}
-        return cell
+        return cls(data=Data(label=label), dimension=0)
 
     @classmethod
-    def from_boundary(cls, label: str, boundary: List[ICell]) -> ICell:
+    def from_boundary(cls, label: str, boundary: List[ICell]) -> Cell:
         assert len(boundary) != 0
         cell = cls(
             data=Data(label=label),
             dimension=max((x.dimension for x in boundary), default=-1) + 1,
             boundary=tuple(boundary),
         )
-        cell.data.zero_cells = {c for x in boundary for c in x.zero_cells}
 
         if cell.dimension == 1:
             if len(boundary) > 2:
@@ -95,48 +185,73 @@ class Cell(ICell):
 
     @classmethod
     def check_boundary_connectedness(cls, boundary):
-        # check that closure is connected
-        from itertools import chain
-
-        from .utils import DSU
-
-        dsu = DSU(chain(*(b.zero_cells for b in boundary), boundary))
-        for b in boundary:
-            for z in b.zero_cells:
-                dsu.merge(b, z)
-        p1 = dsu.find(boundary[0])
-        for b in boundary[1:]:
-            if p1 != dsu.find(b):
+        # check that closure is connected: boundary elements are joined
+        # whenever their closures share a 0-cell
+        if len(boundary) == 1:
+            return
+        dsu = DSU(range(len(boundary)))
+        first_seen_in: Dict[CellId, int] = {}
+        for i, b in enumerate(boundary):
+            for z in _peek_zero_cells(b):
+                j = first_seen_in.setdefault(z.id, i)
+                if j != i:
+                    dsu.merge(i, j)
+        p1 = dsu.find(0)
+        for i, b in enumerate(boundary[1:], start=1):
+            if p1 != dsu.find(i):
                 raise RuntimeError(f"Closure is not connected '{b.label}'")
 
     @classmethod
-    def check_boundary_is_minimal(cls, boundary: List[ICell]):
-        # colors of complex cells by boundary
-        cell_colours: Dict[ICell, ICell] = {}
-
-        def paint(el: ICell, color: ICell):
-            if el in boundary and el in cell_colours:
-                existing_color = cell_colours[el]
-                if existing_color != color:
-                    small = existing_color
-                    big = color
-                    if big.dimension < small.dimension:
-                        big, small = small, big
-                    raise RuntimeError(
-                        f"Boundary is not minimal: '{small.label}'"
-                        f" is contained in '{big.label}'"
-                    )
-            cell_colours[el] = color
-            for b in el.boundary:
-                paint(b, color)
+    def check_boundary_is_minimal(
+        cls,
+        boundary: List[ICell],
+        closures: Optional[Dict[CellId, FrozenSet[CellId]]] = None,
+    ):
+        """
+        Checks that no element of `boundary` lies in the closure of another one.
+
+        `closures` memoizes closures between calls, so that cells built in bulk
+        over shared faces do not walk the same faces again.
+        """
+        members = {b.id: b for b in boundary}
+        if len(members) == 1:
+            return
+
+        def raise_not_minimal(small: ICell, big: ICell):
+            raise RuntimeError(
+                f"Boundary is not minimal: '{small.label}'"
+                f" is contained in '{big.label}'"
+            )
+
+        if closures is not None:
+            for b in boundary:
+                closure = _strict_closure(b, closures)
+                for other_id in members.keys() & closure:
+                    raise_not_minimal(members[other_id], b)
+            return
 
+        # Every face is visited once: reaching a boundary element from another
+        # one is an error, so faces seen from an earlier element need no revisit
+        visited: Set[CellId] = set()
         for b in boundary:
-            paint(b, b)
+            stack = list(b.boundary)
+            while stack:
+                x = stack.pop()
+                if x.id in members:
+                    raise_not_minimal(members[x.id], b)
+                if x.id in visited:
+                    continue
+                visited.add(x.id)
+                stack.extend(x.boundary)
 
     @property
     def id(self) -> CellId:
         return id(self)
 
+    # Equal cells are the same object, so the C-level identity hash is valid
+    # and saves a Python call per set and dict operation
+    __hash__ = object.__hash__
+
     def __repr__(self):
         if self.dimension == 0:
             return f'Cell("{self.label}", embedding={self.embedding})'
@@ -180,16 +295,64 @@ class CWComplex(ICWComplex):
     _atoms_of: Dict[CellId, Set[ICell]]
     _extensions_of: Dict[CellId, Set[ICell]]
     _coboundary_of: Dict[CellId, Set[ICell]]
-
-    def __init__(self):
+    _links: Dict[Tuple[CellId, CellId, str], List[ICell]]
+    # 1-cells by endpoint, "out" or "in", and label, None standing for any label
+    _edges: Dict[Tuple[CellId, str, Optional[str]], Set[ICell]]
+    _cells_by_label: Dict[Tuple[int, str], Set[ICell]]
+    _embeddings: Optional[EmbeddingStore]
+    _components: Optional[DSU[ICell]]
+    _cells: List[Cell]
+    _listeners: List[IComplexListener]
+
+    def __init__(
+        self, embedding_size: Optional[int] = None, embedding_dtype=np.float64
+    ):
+        """
+        With `embedding_size` set, embeddings of the cells of each dimension are
+        kept as rows of a single `embedding_dtype` matrix
+        """
         self._layers = []
         self._atoms_of = defaultdict(set)
         self._extensions_of = defaultdict(set)
         self._coboundary_of = defaultdict(set)
+        self._links = defaultdict(list)
+        self._edges = defaultdict(set)
+        self._cells_by_label = defaultdict(set)
+        self._embeddings = None
+        if embedding_size is not None:
+            self._embeddings = EmbeddingStore(embedding_size, embedding_dtype)
+        self._components = None
+        self._cells = []
+        self._listeners = []
+
+    def __len__(self) -> int:
+        """Number of cells, tombstones included"""
+        return len(self._cells)
+
+    def cell(self, position: int) -> Cell:
+        """Cell by its position in creation order"""
+        return self._cells[position]
+
+    def position_of(self, cell: ICell) -> int:
+        """Position of `cell` in creation order, see `cell`"""
+        if not isinstance(cell, Cell) or cell._owner is not self:
+            raise ValueError(f"{cell!r} does not belong to this complex")
+        return cell._position
+
+    def subscribe(self, listener: IComplexListener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: IComplexListener):
+        self._listeners.remove(listener)
+
+    def _embeddings_changed(self, cells: Sequence[ICell]):
+        for listener in self._listeners:
+            listener.embeddings_changed(cells)
 
     def get_layer_cells(self, layer: int) -> Set[ICell]:
         if len(self._layers) > layer:
-            return self._layers[layer]
+            # cells flagged with `data.deleted` stay stored until `compact`
+            return {x for x in self._layers[layer] if not x.data.deleted}
         return set()
 
     def get_atoms_of(self, expansion: ICell) -> Set[ICell]:
@@ -199,36 +362,163 @@ class CWComplex(ICWComplex):
         return self._extensions_of[atom.id]
 
     def delete_cell(self, cell: ICell):
-        raise NotImplementedError()
+        if not self._stores(cell):
+            if cell.data.deleted:
+                return
+            raise KeyError(f"{cell!r} does not belong to this complex")
+        stack = [cell]
+        while stack:
+            x = stack.pop()
+            if x not in self._layers[x.dimension]:
+                continue
+            self._layers[x.dimension].remove(x)
+            self._unindex_label(x, x.data.label)
+            for b in x.boundary:
+                self._coboundary_of[b.id].discard(x)
+            for atom in self._atoms_of.pop(x.id, ()):
+                self._extensions_of[atom.id].discard(x)
+            for expansion in self._extensions_of.pop(x.id, ()):
+                self._atoms_of[expansion.id].discard(x)
+            stack.extend(self._coboundary_of.pop(x.id, ()))
+            x.data.deleted = True
+            for listener in self._listeners:
+                listener.cell_deleted(x)
+        # deletion may split a component, the index is rebuilt on next use
+        self._components = None
 
     def delete_atom_link(self, expansion: ICell, atom: ICell):
-        raise NotImplementedError()
+        self._atoms_of[expansion.id].remove(atom)
+        self._extensions_of[atom.id].remove(expansion)
+        for listener in self._listeners:
+            listener.atom_link_deleted(expansion, atom)
+
+    def compact(self) -> np.ndarray:
+        """
+        Deletes cells that were only flagged with `data.deleted`, drops the
+        tombstones and empty index entries, and packs the embedding rows of
+        live cells. Tombstones keep a copy of their embedding.
+
+        Returns the new position of every old one, -1 for dropped tombstones.
+        """
+        for x in [x for x in self._cells if x.data.deleted]:
+            if self._stores(x):
+                self.delete_cell(x)
+                continue
+            # flagged in a snapshot, restored without its index entries
+            for y in list(self._coboundary_of.get(x.id, ())):
+                self.delete_cell(y)
+        new_positions = np.full(len(self._cells), -1, dtype=np.int64)
+        cells: List[Cell] = []
+        for x in self._cells:
+            if not x.data.deleted:
+                new_positions[x._position] = x._position = len(cells)
+                cells.append(x)
+                continue
+            if self._embeddings is not None:
+                x.data.embedding = self._embedding_row(x).copy()
+            x._owner, x._row, x._position = None, -1, -1
+        self._cells = cells
+        indexes: List[dict] = [
+            self._atoms_of,
+            self._extensions_of,
+            self._coboundary_of,
+            self._links,
+            self._edges,
+            self._cells_by_label,
+        ]
+        for index in indexes:
+            for key in [key for key, value in index.items() if not value]:
+                del index[key]
+
+        if self._embeddings is not None:
+            by_row = sorted(cells, key=lambda x: (x.dimension, x._row))
+            dimensions = np.fromiter((x.dimension for x in by_row), np.int64)
+            rows = np.fromiter((x._row for x in by_row), np.int64)
+            for x, row in zip(by_row, self._embeddings.keep(dimensions, rows).tolist()):
+                x._row = row
+        for listener in self._listeners:
+            listener.compacted(new_positions)
+        return new_positions
 
     def get_cell_by_label(self, label: str) -> ICell:
-        for layer in self._layers:
-            for cell in layer:
-                if cell.label == label:
+        for dimension in range(len(self._layers)):
+            for cell in self._cells_by_label.get((dimension, label), ()):
+                if not cell.data.deleted:
                     return cell
         raise KeyError(f"label={label}")
 
+    def get_cells_by_label(self, label: str, dimension=None) -> Set[ICell]:
+        if dimension is None:
+            dimensions = range(len(self._layers))
+        else:
+            dimensions = range(dimension, dimension + 1)
+        return {
+            cell
+            for d in dimensions
+            for cell in self._cells_by_label.get((d, label), ())
+            if not cell.data.deleted
+        }
+
+    def has_label(self, label: str) -> bool:
+        try:
+            self.get_cell_by_label(label)
+        except KeyError:
+            return False
+        return True
+
     def get_coboundary_of(self, cell: ICell) -> Set[ICell]:
-        # FIXME: avoid recalc
-        self._build_coboundary()
-        return self._coboundary_of[cell.id]
+        if cell.data.deleted:
+            return set()
+        return {x for x in self._coboundary_of.get(cell.id, ()) if not x.data.deleted}
+
+    def out_edges(self, cell: ICell, label=None) -> Set[ICell]:
+        edges = self._edges.get((cell.id, "out", label), ())
+        return {x for x in edges if not x.data.deleted}
+
+    def in_edges(self, cell: ICell, label=None) -> Set[ICell]:
+        edges = self._edges.get((cell.id, "in", label), ())
+        return {x for x in edges if not x.data.deleted}
+
+    def cofaces_containing(
+        self, cells: Iterable[ICell], dimension=None, label=None
+    ) -> Set[ICell]:
+        coboundaries = sorted(
+            (self._coboundary_of.get(x.id, set()) for x in cells), key=len
+        )
+        if not coboundaries:
+            raise ValueError("cofaces_containing needs at least one cell")
+        # `&` iterates over the smaller operand, so each step is bounded by
+        # the size of the intersection so far
+        result = coboundaries[0]
+        for coboundary in coboundaries[1:]:
+            result = result & coboundary
+        return {
+            x
+            for x in result
+            if not x.data.deleted
+            and (dimension is None or x.dimension == dimension)
+            and (label is None or x.data.label == label)
+        }
+
+    def find_link(
+        self, a: ICell, b: ICell, label="", oriented=False
+    ) -> Optional[ICell]:
+        keys = [(a.id, b.id, label)]
+        if not oriented:
+            keys.append((b.id, a.id, label))
+        for key in keys:
+            for c in self._links.get(key, ()):
+                if not c.data.deleted:
+                    return c
+        return None
 
     def link(self, a: ICell, b: ICell, label="", oriented=False) -> ICell:
         assert a.dimension == 0
         assert b.dimension == 0
 
-        self._ensure_level_exists(1)
-
-        for c in self._layers[1]:
-            if c.label == label and (
-                a == c.boundary[0]
-                and b == c.boundary[1]
-                or (not oriented and a == c.boundary[1] and b == c.boundary[0])
-            ):
-                return c
+        existing = self.find_link(a, b, label, oriented)
+        if existing is not None:
+            return existing
         return self.create_cell(label, [a, b])
 
     def create_atom_link(self, expansion: ICell, atom: ICell):
@@ -237,39 +527,359 @@ class CWComplex(ICWComplex):
         assert atom not in self._atoms_of[expansion.id]
         self._atoms_of[expansion.id].add(atom)
         self._extensions_of[atom.id].add(expansion)
+        for listener in self._listeners:
+            listener.atom_link_created(expansion, atom)
 
     def create_cell(self, label: str, boundary=None) -> ICell:
         if boundary:
+            self._refute_use_of_deleted(boundary)
+            self._refute_connectedness(boundary)
             cell = Cell.from_boundary(label, boundary=boundary)
         else:
             cell = Cell.from_label(label)
+        self._register(cell)
+        return cell
+
+    def bulk_load(
+        self,
+        labels: Sequence[str],
+        boundary_offsets=None,
+        boundary_indices=None,
+        existing: Sequence[ICell] = (),
+        dimensions=None,
+        atom_links=None,
+    ) -> List[ICell]:
+        self._refute_use_of_deleted(existing)
+        batch = prepare_batch(
+            labels,
+            boundary_offsets,
+            boundary_indices,
+            [x.dimension for x in existing],
+            dimensions,
+            atom_links,
+        )
+        with gc_paused():
+            cells = self._build_cells(batch, existing)
+            closures: Dict[CellId, FrozenSet[CellId]] = {}
+            for cell in cells:
+                if cell.dimension >= 2:
+                    Cell.check_boundary_connectedness(cell.boundary)
+                    Cell.check_boundary_is_minimal(list(cell.boundary), closures)
+            self._register_many(cells)
+        for expansion, atom in batch.atom_links.tolist():
+            self.create_atom_link(
+                resolve(cells, existing, expansion), resolve(cells, existing, atom)
+            )
+        return list(cells)
+
+    @staticmethod
+    def _build_cells(batch: Batch, existing: Sequence[ICell] = ()) -> List[Cell]:
+        """Unregistered cells of `batch`, boundaries are not validated"""
+        cells: List[Cell] = []
+        indices = batch.indices.tolist()
+        offsets = batch.offsets.tolist()
+        for i, (label, dimension) in enumerate(
+            zip(batch.labels, batch.dimensions.tolist())
+        ):
+            boundary = tuple(
+                cells[j] if j >= 0 else existing[-j - 1]
+                for j in indices[offsets[i] : offsets[i + 1]]
+            )
+            cells.append(Cell(dimension=dimension, data=Data(label), boundary=boundary))
+        return cells
 
+    def _register(self, cell: Cell):
+        cell._position = len(self._cells)
+        self._cells.append(cell)
         self._ensure_level_exists(cell.dimension)
         self._layers[cell.dimension].add(cell)
+        for b in cell.boundary:
+            self._coboundary_of[b.id].add(cell)
+        self._index_label(cell)
+        cell._owner = self
+        if self._embeddings is not None:
+            cell._row = self._embeddings.matrix(cell.dimension).append()
+        if self._components is not None:
+            self._add_to_components(cell)
+        for listener in self._listeners:
+            listener.cell_created(cell)
+
+    def _register_many(self, cells: List[Cell]):
+        """`_register` for a whole batch, with per-layer set and row updates"""
+        for position, cell in enumerate(cells, len(self._cells)):
+            cell._position = position
+        self._cells.extend(cells)
+        if self._embeddings is not None:
+            by_dimension: Dict[int, List[Cell]] = defaultdict(list)
+            for cell in cells:
+                by_dimension[cell.dimension].append(cell)
+            for dimension, group in by_dimension.items():
+                first = self._embeddings.matrix(dimension).append(len(group))
+                for row, cell in enumerate(group, first):
+                    cell._row = row
+        self._index_many(cells)
+        for listener in self._listeners:
+            for cell in cells:
+                listener.cell_created(cell)
+
+    def _index_many(self, cells: List[Cell]):
+        """Adds registered live `cells` to the layers and lookup indexes"""
+        by_dimension: Dict[int, List[Cell]] = defaultdict(list)
+        for cell in cells:
+            by_dimension[cell.dimension].append(cell)
+        for dimension, group in by_dimension.items():
+            self._ensure_level_exists(dimension)
+            self._layers[dimension].update(group)
+            for cell in group:
+                self._cells_by_label[dimension, cell.data.label].add(cell)
+
+        coboundary_of, links = self._coboundary_of, self._links
+        for cell in cells:
+            cell._owner = self
+            boundary = cell.boundary
+            for b in boundary:
+                coboundary_of[b.id].add(cell)
+            if len(boundary) == 2 and cell.dimension == 1:
+                a, b = boundary
+                links[a.id, b.id, cell.data.label].append(cell)
+                for key in self._edge_keys(a, b, cell.data.label):
+                    self._edges[key].add(cell)
+        if self._components is not None:
+            for cell in cells:
+                self._add_to_components(cell)
+
+    def same_component(self, a: ICell, b: ICell) -> bool:
+        return self._component_index().same(a, b)
+
+    def components(self) -> List[Set[ICell]]:
+        return [set(group) for group in self._component_index().groups()]
+
+    def _component_index(self) -> DSU[ICell]:
+        """
+        Connected components of the complex. Built on first use, then kept up
+        to date by `create_cell`.
+        """
+        if self._components is None:
+            self._components = DSU()
+            for layer in self._layers:
+                for cell in layer:
+                    self._add_to_components(cell)
+        return self._components
+
+    def _add_to_components(self, cell: ICell):
+        assert self._components is not None
+        self._components.add(cell)
+        for b in cell.boundary:
+            self._components.add(b)
+            self._components.merge(cell, b)
+
+    @staticmethod
+    def _refute_use_of_deleted(cells: Iterable[ICell]):
+        for x in cells:
+            if x.data.deleted:
+                raise RuntimeError(f"Cell '{x.data.label}' is deleted")
+
+    def _refute_connectedness(self, boundary: List[ICell]):
+        """
+        Cheap rejection of boundaries that span several components of the
+        complex, before the exact check of `Cell.from_boundary`
+        """
+        if self._components is None or len(boundary) < 2:
+            return
+        if all(b.dimension == 0 for b in boundary):
+            return  # a 1-cell, it may join two components
+        if not all(isinstance(b, Cell) and b._owner is self for b in boundary):
+            return
+        first = self._components.find(boundary[0])
+        for b in boundary[1:]:
+            if self._components.find(b) != first:
+                raise RuntimeError(f"Closure is not connected '{b.label}'")
 
-        return cell
+    def _index_label(self, cell: ICell):
+        self._cells_by_label[cell.dimension, cell.data.label].add(cell)
+        if cell.dimension == 1 and len(cell.boundary) == 2:
+            a, b = cell.boundary
+            self._links[a.id, b.id, cell.data.label].append(cell)
+            for key in self._edge_keys(a, b, cell.data.label):
+                self._edges[key].add(cell)
+
+    def _unindex_label(self, cell: ICell, label: str):
+        self._cells_by_label[cell.dimension, label].discard(cell)
+        if cell.dimension == 1 and len(cell.boundary) == 2:
+            a, b = cell.boundary
+            self._links[a.id, b.id, label].remove(cell)
+            for key in self._edge_keys(a, b, label):
+                self._edges[key].discard(cell)
+
+    @staticmethod
+    def _edge_keys(a: ICell, b: ICell, label: str):
+        """Keys of `_edges` that list the 1-cell from `a` to `b` with `label`"""
+        return (
+            (a.id, "out", label),
+            (a.id, "out", None),
+            (b.id, "in", label),
+            (b.id, "in", None),
+        )
+
+    def _relabel(self, cell: ICell, old_label: str):
+        # tombstones are not indexed, their new label is still journalled
+        if self._stores(cell):
+            self._unindex_label(cell, old_label)
+            self._index_label(cell)
+        for listener in self._listeners:
+            listener.label_changed(cell, old_label)
+
+    def _embedding_row(self, cell: Cell) -> np.ndarray:
+        assert self._embeddings is not None
+        return self._embeddings.matrix(cell.dimension).row(cell._row)
+
+    def _store_rows(
+        self, cells: List[ICell]
+    ) -> Optional[Tuple[EmbeddingStore, np.ndarray, np.ndarray]]:
+        """The store with dimensions and rows of `cells`, if all of them live in it"""
+        store = self._embeddings
+        if store is None:
+            return None
+        rows = []
+        for x in cells:
+            if not isinstance(x, Cell) or x._owner is not self:
+                return None
+            rows.append(x._row)
+        dimensions = np.fromiter((x.dimension for x in cells), np.int64, len(cells))
+        return store, dimensions, np.array(rows, dtype=np.int64)
+
+    def get_embeddings(self, cells: Iterable[ICell]) -> np.ndarray:
+        cells = list(cells)
+        located = self._store_rows(cells)
+        if located is None:
+            return super().get_embeddings(cells)
+        store, dimensions, rows = located
+        return store.get(dimensions, rows)
+
+    def set_embeddings(self, cells: Iterable[ICell], values: np.ndarray):
+        cells = list(cells)
+        located = self._store_rows(cells)
+        if located is None:
+            return super().set_embeddings(cells, values)
+        store, dimensions, rows = located
+        store.set(dimensions, rows, values)
+        self._embeddings_changed(cells)
+
+    def save(self, path):
+        """Writes a binary snapshot, see `cwdb.snapshot`"""
+        write_snapshot(path, self._to_snapshot())
+
+    @classmethod
+    def load(cls, path) -> CWComplex:
+        """
+        Restores a complex saved by `save`. Cells keep their positions, so
+        `cell(i)` of the result corresponds to `cell(i)` of the saved complex.
+        """
+        return cls._from_snapshot(read_snapshot(path))
+
+    def _to_snapshot(self) -> Snapshot:
+        cells = self._cells
+        n = len(cells)
+        label_table: Dict[str, int] = {}
+        label_ids = np.fromiter(
+            (label_table.setdefault(x.data.label, len(label_table)) for x in cells),
+            dtype=np.int32,
+            count=n,
+        )
+        boundary_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(x.boundary) for x in cells], out=boundary_offsets[1:])
+        boundary_indices = np.fromiter(
+            (self.position_of(b) for x in cells for b in x.boundary),
+            dtype=np.int64,
+            count=boundary_offsets[-1],
+        )
+        atom_links = np.array(
+            [
+                (x._position, self.position_of(atom))
+                for x in cells
+                for atom in self._atoms_of.get(x.id, ())
+            ],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        label_offsets, label_bytes, label_ids = encode_labels(
+            list(label_table), label_ids
+        )
+        snapshot = Snapshot(
+            dimensions=np.fromiter((x.dimension for x in cells), np.int8, n),
+            label_ids=label_ids,
+            label_offsets=label_offsets,
+            label_bytes=label_bytes,
+            deleted=np.fromiter((x.data.deleted for x in cells), bool, n),
+            boundary_offsets=boundary_offsets,
+            boundary_indices=boundary_indices,
+            atom_links=atom_links,
+        )
+        if self._embeddings is not None:
+            snapshot.embedding_width = self._embeddings.width
+            snapshot.embedding_dtype = self._embeddings.dtype
+            snapshot.embedding_matrices = self._embeddings.arrays()
+            snapshot.embedding_rows = np.fromiter((x._row for x in cells), np.int64, n)
+        else:
+            embeddings = [check_embedding(x.data.embedding) for x in cells]
+            snapshot.embedding_offsets = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum([len(e) for e in embeddings], out=snapshot.embedding_offsets[1:])
+            snapshot.embedding_values = np.concatenate(embeddings or [_NO_EMBEDDING])
+        return snapshot
+
+    @classmethod
+    def _from_snapshot(cls, snapshot: Snapshot) -> CWComplex:
+        result = cls(
+            embedding_size=snapshot.embedding_width,
+            embedding_dtype=snapshot.embedding_dtype or np.float64,
+        )
+        labels = snapshot.labels
+        batch = Batch(
+            labels=[labels[i] for i in snapshot.label_ids.tolist()],
+            offsets=snapshot.boundary_offsets,
+            indices=snapshot.boundary_indices,
+            dimensions=snapshot.dimensions,
+            atom_links=snapshot.atom_links,
+        )
+        with gc_paused():
+            cells = cls._build_cells(batch)
+            result._restore(cells, snapshot)
+        return result
+
+    def _restore(self, cells: List[Cell], snapshot: Snapshot):
+        """Takes ownership of the cells of `snapshot` built by `_build_cells`"""
+        for cell in compress(cells, snapshot.deleted.tolist()):
+            cell.data.deleted = True
+        for position, cell in enumerate(cells):
+            cell._position = position
+            cell._owner = self
+        self._cells = cells
+        if self._embeddings is not None:
+            assert snapshot.embedding_matrices is not None
+            assert snapshot.embedding_rows is not None
+            for dimension, values in snapshot.embedding_matrices.items():
+                self._embeddings.matrix(dimension).extend(values)
+            for cell, row in zip(cells, snapshot.embedding_rows.tolist()):
+                cell._row = row
+        elif snapshot.embedding_offsets is not None:
+            assert snapshot.embedding_values is not None
+            offsets = snapshot.embedding_offsets.tolist()
+            for i in np.flatnonzero(np.diff(snapshot.embedding_offsets)).tolist():
+                embedding = snapshot.embedding_values[offsets[i] : offsets[i + 1]]
+                cells[i].data.embedding = embedding.copy()
+        self._index_many([x for x in cells if not x.data.deleted])
+        for expansion, atom in snapshot.atom_links.tolist():
+            self._atoms_of[cells[expansion].id].add(cells[atom])
+            self._extensions_of[cells[atom].id].add(cells[expansion])
 
     def _ensure_level_exists(self, dimension):
         while dimension >= len(self._layers):
             self._layers.append(set())
 
-    def _build_coboundary(self):
-        self._clear_coboundary()
-        for cell in self._layers[0]:
-            self._coboundary_of[cell.id] = set()
-        for layer in self._layers[1:]:
-            for cell in layer:
-                if cell.data.deleted:  # skip deleted
-                    continue
-                for b in cell.boundary:
-                    if b.data.deleted:  # skip deleted
-                        continue
-                    self._coboundary_of[b.id].add(cell)
-
-    def _clear_coboundary(self):
-        self._coboundary_of = defaultdict(set)
+    def _stores(self, cell: ICell) -> bool:
+        """Whether `cell` is live or only flagged with `data.deleted`"""
+        if len(self._layers) > cell.dimension:
+            return cell in self._layers[cell.dimension]
+        return False
 
     def __contains__(self, item: ICell) -> bool:
-        if len(self._layers) > item.dimension:
-            return item in self._layers[item.dimension]
-        return False
+        return self._stores(item) and not item.data.deleted
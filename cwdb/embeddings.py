@@ -0,0 +1,129 @@
+"""
+Contiguous storage for cell embeddings.
+
+Instead of one small array per cell, embeddings of every cell of a given
+dimension live in the rows of a single growable 2-D matrix.
+"""
+from __future__ import annotations
+
+from typing import Dict
+
+import numpy as np
+
+
+class EmbeddingMatrix:
+    """Growable matrix with one embedding per row"""
+
+    def __init__(self, width: int, dtype=np.float64, capacity: int = 1024):
+        self._data = np.zeros((capacity, width), dtype=dtype)
+        self._size = 0
+
+    @classmethod
+    def wrap(cls, array: np.ndarray) -> EmbeddingMatrix:
+        """Matrix whose rows are the rows of `array`, without a copy"""
+        matrix = cls(array.shape[1], dtype=array.dtype, capacity=0)
+        matrix._data = array
+        matrix._size = len(array)
+        return matrix
+
+    @property
+    def width(self) -> int:
+        return self._data.shape[1]
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._data.dtype
+
+    @property
+    def array(self) -> np.ndarray:
+        """View of all allocated rows. Invalidated when the matrix grows."""
+        return self._data[: self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, n: int = 1) -> int:
+        """Allocates `n` zero rows and returns the index of the first one"""
+        first = self._size
+        if first + n > len(self._data):
+            capacity = max(2 * len(self._data), first + n)
+            data = np.zeros((capacity, self.width), dtype=self.dtype)
+            data[:first] = self._data[:first]
+            self._data = data
+        self._size += n
+        return first
+
+    def keep(self, rows: np.ndarray):
+        """Drops every row but `rows`, which become rows `0..len(rows) - 1`"""
+        self._data = self._data[rows]
+        self._size = len(rows)
+
+    def extend(self, values: np.ndarray) -> int:
+        """Appends `values` as rows and returns the index of the first one"""
+        first = self.append(len(values))
+        self._data[first : first + len(values)] = values
+        return first
+
+    def row(self, index: int) -> np.ndarray:
+        """Zero-copy view of a single row. Invalidated when the matrix grows."""
+        return self._data[index]
+
+    def get(self, rows: np.ndarray) -> np.ndarray:
+        return self._data[rows]
+
+    def set(self, rows: np.ndarray, values: np.ndarray):
+        self._data[rows] = values
+
+
+class EmbeddingStore:
+    """One `EmbeddingMatrix` per cell dimension"""
+
+    def __init__(self, width: int, dtype=np.float64):
+        self.width = width
+        self.dtype = np.dtype(dtype)
+        self._matrices: Dict[int, EmbeddingMatrix] = {}
+
+    @classmethod
+    def wrap(cls, width: int, dtype, arrays: Dict[int, np.ndarray]) -> EmbeddingStore:
+        """Store over existing matrices, see `EmbeddingMatrix.wrap`"""
+        store = cls(width, dtype)
+        for dimension, array in arrays.items():
+            store._matrices[dimension] = EmbeddingMatrix.wrap(array)
+        return store
+
+    def matrix(self, dimension: int) -> EmbeddingMatrix:
+        matrix = self._matrices.get(dimension)
+        if matrix is None:
+            matrix = self._matrices[dimension] = EmbeddingMatrix(
+                self.width, dtype=self.dtype
+            )
+        return matrix
+
+    def arrays(self) -> Dict[int, np.ndarray]:
+        """Allocated rows of every matrix by dimension"""
+        return {dimension: m.array for dimension, m in self._matrices.items()}
+
+    def get(self, dimensions: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        result = np.empty((len(rows), self.width), dtype=self.dtype)
+        for dimension in np.unique(dimensions):
+            mask = dimensions == dimension
+            result[mask] = self.matrix(int(dimension)).get(rows[mask])
+        return result
+
+    def set(self, dimensions: np.ndarray, rows: np.ndarray, values: np.ndarray):
+        values = np.asarray(values, dtype=self.dtype)
+        for dimension in np.unique(dimensions):
+            mask = dimensions == dimension
+            self.matrix(int(dimension)).set(rows[mask], values[mask])
+
+    def keep(self, dimensions: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """
+        Drops every row not listed in `rows`, returns the new row of each
+        listed one
+        """
+        new_rows = np.empty(len(rows), dtype=np.int64)
+        for dimension, matrix in self._matrices.items():
+            mask = dimensions == dimension
+            matrix.keep(rows[mask])
+            new_rows[mask] = np.arange(mask.sum())
+        return new_rows
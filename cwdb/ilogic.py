@@ -7,11 +7,9 @@ from .interfaces import ICWComplex
 def get_extension_dfs(cell: ICell, visited: Set[ICell], c: ICWComplex) -> List[ICell]:
     result = [cell]
     visited.add(cell)
-    for b in cell.coboundary(c):
-        if b.boundary[1] is cell:
-            if b.boundary[0] in visited:
-                continue
-            result.extend(get_extension_dfs(b.boundary[0], visited, c))
+    for x in c.neighbors(cell, direction="in"):
+        if x not in visited:
+            result.extend(get_extension_dfs(x, visited, c))
     return result
 
 
@@ -24,11 +22,9 @@ def get_extension(cell: ICell, c: ICWComplex) -> List[ICell]:
 def get_intention_dfs(cell: ICell, visited: Set[ICell], c) -> List[ICell]:
     result: List[ICell] = [cell]
     visited.add(cell)
-    for b in cell.coboundary(c):
-        if b.boundary[0] is cell:
-            if b.boundary[1] in visited:
-                continue
-            result.extend(get_intention_dfs(b.boundary[1], visited, c))
+    for x in c.neighbors(cell, direction="out"):
+        if x not in visited:
+            result.extend(get_intention_dfs(x, visited, c))
     return result
 
 
@@ -1,14 +1,18 @@
 from __future__ import annotations
 import abc
-from typing import Iterable, Set, Tuple, TypeVar
+from typing import Iterable, List, Optional, Sequence, Set, Tuple, TypeVar
 
 import numpy as np
 
+from .bulk import prepare_batch, resolve
+
 T = TypeVar("T")
 CellId = int
 
 
 class ICell(abc.ABC):
+    __slots__ = ()
+
     @property
     @abc.abstractmethod
     def dimension(self) -> int:
@@ -89,6 +93,34 @@ class ICell(abc.ABC):
         return hash(self.id)
 
 
+class IComplexListener:
+    """
+    Receives the changes of a complex it is subscribed to, see
+    `ICWComplex.subscribe`. Every method is a no-op by default.
+    """
+
+    def cell_created(self, cell: ICell):
+        ...
+
+    def cell_deleted(self, cell: ICell):
+        """Called for `cell` and for each of its cofaces deleted with it"""
+
+    def atom_link_created(self, expansion: ICell, atom: ICell):
+        ...
+
+    def atom_link_deleted(self, expansion: ICell, atom: ICell):
+        ...
+
+    def label_changed(self, cell: ICell, old_label: str):
+        ...
+
+    def embeddings_changed(self, cells: Sequence[ICell]):
+        """Called when embeddings are assigned, not on in-place edits of them"""
+
+    def compacted(self, new_positions: np.ndarray):
+        """Called after `ICWComplex.compact` renumbered the cells"""
+
+
 class ICWComplex(abc.ABC):
     @abc.abstractmethod
     def get_layer_cells(self, layer: int) -> Set[ICell]:
@@ -98,6 +130,12 @@ class ICWComplex(abc.ABC):
     def link(self, a: ICell, b: ICell, label="", oriented=False) -> ICell:
         ...
 
+    @abc.abstractmethod
+    def find_link(
+        self, a: ICell, b: ICell, label="", oriented=False
+    ) -> Optional[ICell]:
+        ...
+
     @abc.abstractmethod
     def create_atom_link(self, expansion: ICell, atom: ICell):
         ...
@@ -118,18 +156,148 @@ class ICWComplex(abc.ABC):
     def create_cell(self, label: str, boundary=None) -> ICell:
         ...
 
+    def bulk_load(
+        self,
+        labels: Sequence[str],
+        boundary_offsets=None,
+        boundary_indices=None,
+        existing: Sequence[ICell] = (),
+        dimensions=None,
+        atom_links=None,
+    ) -> List[ICell]:
+        """
+        Creates one cell per label and returns them in order.
+
+        The boundary of the i-th cell is
+        `boundary_indices[boundary_offsets[i]:boundary_offsets[i + 1]]`, where
+        `j >= 0` is the j-th cell of the batch and `j < 0` is `existing[-j - 1]`.
+        `atom_links` holds (expansion, atom) pairs indexed the same way.
+        """
+        batch = prepare_batch(
+            labels,
+            boundary_offsets,
+            boundary_indices,
+            [x.dimension for x in existing],
+            dimensions,
+            atom_links,
+        )
+        cells: List[ICell] = []
+        for i, label in enumerate(batch.labels):
+            boundary = [resolve(cells, existing, j) for j in batch.boundary(i).tolist()]
+            cells.append(self.create_cell(label, boundary or None))
+        for expansion, atom in batch.atom_links.tolist():
+            self.create_atom_link(
+                resolve(cells, existing, expansion), resolve(cells, existing, atom)
+            )
+        return cells
+
     @abc.abstractmethod
     def delete_cell(self, cell: ICell):
-        ...
+        """
+        Deletes `cell` together with every cell whose closure contains it.
+        Deleted cells are left as tombstones with `data.deleted` set.
+        """
+
+    def delete_cells(self, cells: Iterable[ICell]):
+        """Deletes every cell of `cells`, see `delete_cell`"""
+        for cell in cells:
+            self.delete_cell(cell)
+
+    def compact(self):
+        """Reclaims the storage held by deleted cells and rebuilds indexes"""
+
+    def subscribe(self, listener: IComplexListener):
+        """Makes `listener` receive every later change of the complex"""
+        raise NotImplementedError()
+
+    def unsubscribe(self, listener: IComplexListener):
+        raise NotImplementedError()
+
+    def cell(self, position: int) -> ICell:
+        """Cell by its position, see `position_of`"""
+        raise NotImplementedError()
+
+    def position_of(self, cell: ICell) -> int:
+        """Position of `cell`, stable until `compact` renumbers the cells"""
+        raise NotImplementedError()
 
     @abc.abstractmethod
     def get_cell_by_label(self, label: str) -> ICell:
         ...
 
+    @abc.abstractmethod
+    def get_cells_by_label(self, label: str, dimension=None) -> Set[ICell]:
+        ...
+
+    def has_label(self, label: str) -> bool:
+        return len(self.get_cells_by_label(label)) > 0
+
     @abc.abstractmethod
     def get_coboundary_of(self, cell: ICell) -> Set[ICell]:
         ...
 
+    def out_edges(self, cell: ICell, label=None) -> Set[ICell]:
+        """1-cells that go from `cell`, only those with `label` unless it is None"""
+        return {
+            x
+            for x in self.get_coboundary_of(cell)
+            if x.dimension == 1
+            and len(x.boundary) == 2
+            and x.boundary[0] == cell
+            and (label is None or x.label == label)
+        }
+
+    def in_edges(self, cell: ICell, label=None) -> Set[ICell]:
+        """1-cells that go to `cell`, only those with `label` unless it is None"""
+        return {
+            x
+            for x in self.get_coboundary_of(cell)
+            if x.dimension == 1
+            and len(x.boundary) == 2
+            and x.boundary[1] == cell
+            and (label is None or x.label == label)
+        }
+
+    def neighbors(self, cell: ICell, label=None, direction="out") -> Set[ICell]:
+        """Other ends of the `out_edges` or, with direction="in", `in_edges`"""
+        if direction == "out":
+            return {x.boundary[1] for x in self.out_edges(cell, label)}
+        if direction == "in":
+            return {x.boundary[0] for x in self.in_edges(cell, label)}
+        raise ValueError(f"direction must be 'out' or 'in', not {direction!r}")
+
+    def cofaces_containing(
+        self, cells: Iterable[ICell], dimension=None, label=None
+    ) -> Set[ICell]:
+        """
+        Cells whose boundary contains every cell of `cells`, optionally only
+        those of `dimension` and with `label`
+        """
+        coboundaries = sorted((self.get_coboundary_of(x) for x in cells), key=len)
+        if not coboundaries:
+            raise ValueError("cofaces_containing needs at least one cell")
+        result = set(coboundaries[0])
+        for coboundary in coboundaries[1:]:
+            result &= coboundary
+        return {
+            x
+            for x in result
+            if (dimension is None or x.dimension == dimension)
+            and (label is None or x.label == label)
+        }
+
+    def get_embeddings(self, cells: Iterable[ICell]) -> np.ndarray:
+        """Embeddings of `cells` stacked into a matrix, one row per cell"""
+        return np.stack([cell.embedding for cell in cells])
+
+    def set_embeddings(self, cells: Iterable[ICell], values: np.ndarray):
+        """Sets the embedding of each cell to the corresponding row of `values`"""
+        for cell, value in zip(cells, values):
+            cell.embedding = value
+
     @abc.abstractmethod
     def __contains__(self, item: ICell) -> bool:
         ...
+
+    def __getitem__(self, label: str) -> ICell:
+        return self.get_cell_by_label(label)
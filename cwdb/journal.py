@@ -0,0 +1,314 @@
+"""
+Append-only journal of the changes of a CW complex.
+
+A journal file is a header followed by records. Each record is framed by its
+length and CRC32, so a record torn by a crash is detected and, together with
+everything after it, dropped. Cells are referred to by their position, see
+`CWComplex.position_of`, which replay reproduces as long as it starts from
+the snapshot the journal continues.
+
+Records are buffered and written in groups: a change is durable once `commit`
+returns, or once `group_size` bytes of records were buffered after it, since
+then the whole group is written and fsynced at once.
+
+`recover` restores a complex from a snapshot and its journal, `checkpoint`
+folds the journal into a new snapshot and starts an empty one. The header of
+a journal holds the generation of the snapshot it continues, so a journal left
+over by an interrupted checkpoint is recognised and ignored.
+"""
+from __future__ import annotations
+
+import os
+import struct
+import zlib
+from typing import Iterator, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .bulk import BatchBuilder
+from .compact import CompactCWComplex
+from .core import CWComplex
+from .interfaces import ICell, IComplexListener, ICWComplex
+from .snapshot import read_snapshot, write_snapshot
+
+MAGIC = b"CWDBJRNL"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sIQ")  # magic, version, generation
+_FRAME = struct.Struct("<II")  # payload length, crc32 of the payload
+_OP = struct.Struct("<B")
+
+CREATE, DELETE, ATOM_LINK, ATOM_UNLINK, RELABEL, EMBEDDINGS, COMPACT = range(7)
+
+_CREATE = struct.Struct("<BI")  # op, number of boundary cells, then positions, label
+_POSITION = struct.Struct("<Bq")  # op, position
+_LINK = struct.Struct("<Bqq")  # op, expansion, atom
+_EMBEDDINGS = struct.Struct("<BII8s")  # op, number of cells, width, dtype
+
+
+class Journal(IComplexListener):
+    """
+    Records the changes of the complex it is attached to.
+
+    Opening an existing journal of the same `generation` appends to it, after
+    dropping a torn tail, one of an older generation is started anew.
+    """
+
+    def __init__(self, path, generation: int = 0, group_size: int = 1 << 16):
+        self.path = os.fspath(path)
+        self.generation = generation
+        self.group_size = group_size
+        self._buffer = bytearray()
+        self._complex: Optional[ICWComplex] = None
+
+        header = _read_header(self.path) if os.path.exists(self.path) else None
+        if header is not None and header > generation:
+            raise ValueError(
+                f"Journal '{self.path}' continues generation {header}, "
+                f"not {generation}"
+            )
+        if header == generation:
+            with open(self.path, "r+b") as f:
+                f.truncate(_valid_end(f.read()))
+            self._file = open(self.path, "ab")
+        else:
+            self._file = self._start(generation)
+
+    def _start(self, generation: int):
+        """Atomically replaces the file with an empty journal"""
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, generation))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        return open(self.path, "ab")
+
+    def attach(self, complex_: ICWComplex):
+        if self._complex is not None:
+            raise RuntimeError("Journal is already attached")
+        complex_.subscribe(self)
+        self._complex = complex_
+
+    def detach(self):
+        if self._complex is not None:
+            self._complex.unsubscribe(self)
+            self._complex = None
+
+    def commit(self):
+        """Writes and fsyncs the buffered records"""
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self.commit()
+        self.detach()
+        self._file.close()
+
+    def __enter__(self) -> Journal:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def restart(self, generation: int):
+        """Commits, then replaces the journal with an empty one of `generation`"""
+        self.commit()
+        self._file.close()
+        self._file = self._start(generation)
+        self.generation = generation
+
+    def _append(self, payload: bytes):
+        self._buffer += _FRAME.pack(len(payload), zlib.crc32(payload))
+        self._buffer += payload
+        if len(self._buffer) >= self.group_size:
+            self.commit()
+
+    def _position(self, cell: ICell) -> int:
+        assert self._complex is not None
+        return self._complex.position_of(cell)
+
+    # Listener
+
+    def cell_created(self, cell: ICell):
+        boundary = [self._position(b) for b in cell.boundary]
+        self._append(
+            _CREATE.pack(CREATE, len(boundary))
+            + struct.pack(f"<{len(boundary)}q", *boundary)
+            + cell.label.encode("utf-8")
+        )
+
+    def cell_deleted(self, cell: ICell):
+        self._append(_POSITION.pack(DELETE, self._position(cell)))
+
+    def atom_link_created(self, expansion: ICell, atom: ICell):
+        self._append(
+            _LINK.pack(ATOM_LINK, self._position(expansion), self._position(atom))
+        )
+
+    def atom_link_deleted(self, expansion: ICell, atom: ICell):
+        self._append(
+            _LINK.pack(ATOM_UNLINK, self._position(expansion), self._position(atom))
+        )
+
+    def label_changed(self, cell: ICell, old_label: str):
+        self._append(
+            _POSITION.pack(RELABEL, self._position(cell))
+            + cell.data.label.encode("utf-8")
+        )
+
+    def embeddings_changed(self, cells: Sequence[ICell]):
+        if not cells:
+            return
+        assert self._complex is not None
+        values = self._complex.get_embeddings(cells)
+        values = np.ascontiguousarray(values.reshape(len(cells), -1))
+        values = values.astype(values.dtype.newbyteorder("<"), copy=False)
+        positions = np.array([self._position(x) for x in cells], dtype="<i8")
+        self._append(
+            _EMBEDDINGS.pack(
+                EMBEDDINGS,
+                len(cells),
+                values.shape[1],
+                values.dtype.str.encode("ascii"),
+            )
+            + positions.tobytes()
+            + values.tobytes()
+        )
+
+    def compacted(self, new_positions: np.ndarray):
+        self._append(_OP.pack(COMPACT))
+
+
+def _read_header(path) -> int:
+    """Generation of the journal at `path`"""
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError(f"'{path}' is not a cwdb journal")
+    magic, version, generation = _HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f"'{path}' is not a cwdb journal")
+    if version != VERSION:
+        raise ValueError(f"Unsupported journal version {version}")
+    return generation
+
+
+def _records(data: bytes) -> Iterator[Tuple[memoryview, int]]:
+    """Payloads of the intact records of `data` and the offset past each"""
+    view = memoryview(data)
+    offset = _HEADER.size
+    while offset + _FRAME.size <= len(data):
+        length, crc = _FRAME.unpack_from(data, offset)
+        start = offset + _FRAME.size
+        payload = view[start : start + length]
+        # a zero-filled tail would otherwise pass as empty records
+        if not length or len(payload) < length or zlib.crc32(payload) != crc:
+            return
+        offset = start + length
+        yield payload, offset
+
+
+def _valid_end(data: bytes) -> int:
+    end = _HEADER.size
+    for _, end in _records(data):
+        pass
+    return end
+
+
+def replay(complex_: ICWComplex, path):
+    """
+    Applies the records of the journal at `path` to `complex_`, which must be
+    in the state the journal started from. Runs of created cells are
+    inserted with `bulk_load`, see `BatchBuilder`.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    batch = BatchBuilder(complex_)
+    for payload, _ in _records(data):
+        op = payload[0]
+        if op == CREATE:
+            _, n = _CREATE.unpack_from(payload)
+            end = _CREATE.size + 8 * n
+            batch.add(
+                bytes(payload[end:]).decode("utf-8"),
+                struct.unpack_from(f"<{n}q", payload, _CREATE.size),
+            )
+            continue
+        batch.flush()
+        if op == DELETE:
+            complex_.delete_cell(complex_.cell(_POSITION.unpack(payload)[1]))
+        elif op in (ATOM_LINK, ATOM_UNLINK):
+            _, expansion, atom = _LINK.unpack(payload)
+            link = (complex_.cell(expansion), complex_.cell(atom))
+            if op == ATOM_LINK:
+                complex_.create_atom_link(*link)
+            else:
+                complex_.delete_atom_link(*link)
+        elif op == RELABEL:
+            _, position = _POSITION.unpack_from(payload)
+            label = bytes(payload[_POSITION.size :]).decode("utf-8")
+            complex_.cell(position).label = label
+        elif op == EMBEDDINGS:
+            _, n, width, dtype = _EMBEDDINGS.unpack_from(payload)
+            start = _EMBEDDINGS.size
+            positions = np.frombuffer(payload, dtype="<i8", count=n, offset=start)
+            values = np.frombuffer(
+                payload,
+                dtype=np.dtype(dtype.rstrip(b"\0").decode("ascii")),
+                count=n * width,
+                offset=start + 8 * n,
+            )
+            cells = [complex_.cell(p) for p in positions.tolist()]
+            complex_.set_embeddings(cells, values.reshape(n, width).copy())
+        elif op == COMPACT:
+            complex_.compact()
+        else:
+            raise ValueError(f"Unknown journal record {op}")
+    batch.flush()
+
+
+def recover(
+    snapshot_path, journal_path, cls=CWComplex, group_size: int = 1 << 16, **kwargs
+) -> Tuple[ICWComplex, Journal]:
+    """
+    Restores the complex saved at `snapshot_path` and replays the journal that
+    continues it. Without a snapshot the journal is replayed on `cls(**kwargs)`.
+
+    Returns the complex together with the journal, attached to it and ready to
+    record further changes.
+    """
+    if os.path.exists(snapshot_path):
+        snapshot = read_snapshot(snapshot_path)
+        complex_ = cls._from_snapshot(snapshot)
+        generation = snapshot.generation
+    else:
+        complex_ = cls(**kwargs)
+        generation = 0
+    if os.path.exists(journal_path) and _read_header(journal_path) == generation:
+        replay(complex_, journal_path)
+    journal = Journal(journal_path, generation, group_size)
+    journal.attach(complex_)
+    return complex_, journal
+
+
+def checkpoint(
+    complex_: Union[CWComplex, CompactCWComplex], snapshot_path, journal: Journal
+):
+    """
+    Saves `complex_` as the next generation of the snapshot at `snapshot_path`
+    and empties `journal`. Either file is replaced atomically, and a crash in
+    between leaves a journal that `recover` recognises as already folded.
+    """
+    journal.commit()
+    snapshot = complex_._to_snapshot()
+    snapshot.generation = journal.generation + 1
+    tmp = os.fspath(snapshot_path) + ".tmp"
+    write_snapshot(tmp, snapshot)
+    with open(tmp, "rb+") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, snapshot_path)
+    journal.restart(snapshot.generation)
@@ -0,0 +1,140 @@
+"""
+Read-only complex served from a memory-mapped snapshot.
+
+Opening a snapshot only parses its section table: boundaries, labels, the
+lookup indexes and embeddings are NumPy views of the mapping, so the open
+time does not depend on the size of the complex, and every process that
+opens the same file shares one copy of it in the page cache.
+"""
+from __future__ import annotations
+
+import bisect
+import mmap
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+
+from .compact import CompactCWComplex
+from .embeddings import EmbeddingStore
+from .interfaces import CellId, ICell
+from .snapshot import Snapshot, parse_snapshot
+
+
+class _LabelTable:
+    """Sorted label table of a snapshot, decoded on access"""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, label_id: int) -> str:
+        start, end = self._offsets[label_id : label_id + 2]
+        return self._data[start:end].tobytes().decode("utf-8")
+
+    def find(self, label: str) -> Optional[int]:
+        label_id = bisect.bisect_left(self, label)
+        if label_id < len(self) and self[label_id] == label:
+            return label_id
+        return None
+
+
+class MappedCWComplex(CompactCWComplex):
+    """
+    `CompactCWComplex` whose arrays are views of a snapshot written by `save`.
+
+    Every query works as on the complex that was saved, cell ids included.
+    Any attempt to change the complex raises `NotImplementedError`.
+    """
+
+    def __init__(self, path):
+        super().__init__(capacity=0)
+        # the views keep the mapping alive, it is unmapped with the last of them
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        snapshot = parse_snapshot(mapping)
+        if snapshot.coboundary_offsets is None or snapshot.label_index_offsets is None:
+            raise ValueError("Snapshot has no lookup indexes")
+        self._snapshot = snapshot
+
+        n = len(snapshot)
+        self._size = n
+        self._n_boundary = len(snapshot.boundary_indices)
+        self._dimensions = snapshot.dimensions
+        self._label_ids = snapshot.label_ids
+        self._deleted = snapshot.deleted
+        self._boundary_offsets = snapshot.boundary_offsets
+        self._boundary_indices = snapshot.boundary_indices
+        self._label_table_view = _LabelTable(
+            snapshot.label_offsets, snapshot.label_bytes
+        )
+        self._coboundary_index._offsets = snapshot.coboundary_offsets
+        self._coboundary_index._values = snapshot.coboundary_indices
+        self._label_index._offsets = snapshot.label_index_offsets
+        self._label_index._values = snapshot.label_index_cells
+        if snapshot.embedding_width is not None:
+            assert snapshot.embedding_matrices is not None
+            assert snapshot.embedding_rows is not None
+            self._embedding_store = EmbeddingStore.wrap(
+                snapshot.embedding_width,
+                snapshot.embedding_dtype,
+                snapshot.embedding_matrices,
+            )
+            self._embedding_rows = snapshot.embedding_rows
+        self._atom_orders: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    # Reads
+
+    def _label_of(self, id_: CellId) -> str:
+        return self._label_table_view[self._label_ids[id_]]
+
+    def _find_label_id(self, label: str) -> Optional[int]:
+        return self._label_table_view.find(label)
+
+    def _get_embedding(self, id_: CellId) -> np.ndarray:
+        if self._embedding_store is not None:
+            return super()._get_embedding(id_)
+        offsets = self._snapshot.embedding_offsets
+        values = self._snapshot.embedding_values
+        if offsets is None or values is None:
+            return np.empty(shape=(0,))
+        return values[offsets[id_] : offsets[id_ + 1]]
+
+    def _linked(self, id_: CellId, column: int) -> Set[ICell]:
+        """Other ends of the atom links whose `column` end is `id_`"""
+        links = self._snapshot.atom_links
+        if column not in self._atom_orders:
+            order = np.argsort(links[:, column], kind="stable")
+            self._atom_orders[column] = order, links[order, column]
+        order, keys = self._atom_orders[column]
+        start, end = np.searchsorted(keys, [id_, id_ + 1])
+        return set(self._cells(links[order[start:end], 1 - column]))
+
+    def get_atoms_of(self, expansion: ICell) -> Set[ICell]:
+        return self._linked(self._id_of(expansion), 0)
+
+    def get_expansions_of(self, atom: ICell) -> Set[ICell]:
+        return self._linked(self._id_of(atom), 1)
+
+    def _to_snapshot(self) -> Snapshot:
+        return self._snapshot
+
+    # Writes
+
+    def _read_only(self, *args, **kwargs):
+        raise NotImplementedError("MappedCWComplex is read-only")
+
+    create_cell = _read_only
+    bulk_load = _read_only
+    create_atom_link = _read_only
+    delete_atom_link = _read_only
+    delete_cell = _read_only
+    delete_cells = _read_only
+    compact = _read_only
+    set_embeddings = _read_only
+    _set_label = _read_only
+    _set_deleted = _read_only
+    _set_embedding = _read_only
+    _set_task_implementation = _read_only
@@ -1,4 +1,4 @@
-from typing import Set
+from typing import Optional, Set
 
 from .interfaces import ICell, ICWComplex
 
@@ -16,15 +16,19 @@ class PatchedContext(ICWComplex):
     def get_layer_cells(self, layer: int) -> Set[ICell]:
         return self.patch.get_layer_cells(layer) | self.base.get_layer_cells(layer)
 
+    def find_link(
+        self, a: ICell, b: ICell, label="", oriented=False
+    ) -> Optional[ICell]:
+        existing = self.base.find_link(a, b, label, oriented)
+        if existing is None:
+            existing = self.patch.find_link(a, b, label, oriented)
+        return existing
+
     def link(self, a: ICell, b: ICell, label="", oriented=False) -> ICell:
         # check if link exists in base
-        for c in self.base.get_layer_cells(1):
-            if c.label == label and (
-                a == c.boundary[0]
-                and b == c.boundary[1]
-                or (not oriented and a == c.boundary[1] and b == c.boundary[0])
-            ):
-                return c
+        existing = self.base.find_link(a, b, label, oriented)
+        if existing is not None:
+            return existing
         # if not link found in base context, create in patch
         return self.patch.link(a, b, label, oriented)
 
@@ -55,12 +59,22 @@ class PatchedContext(ICWComplex):
             )
         self.patch.delete_atom_link(expansion=expansion, atom=atom)
 
+    def compact(self):
+        self.patch.compact()
+
     def get_cell_by_label(self, label: str) -> ICell:
         try:
             return self.patch.get_cell_by_label(label)
         except KeyError:
             return self.base.get_cell_by_label(label)
 
+    def get_cells_by_label(self, label: str, dimension=None) -> Set[ICell]:
+        patch_cells = self.patch.get_cells_by_label(label, dimension)
+        return patch_cells | self.base.get_cells_by_label(label, dimension)
+
+    def has_label(self, label: str) -> bool:
+        return self.patch.has_label(label) or self.base.has_label(label)
+
     def get_coboundary_of(self, cell: ICell) -> Set[ICell]:
         return self.patch.get_coboundary_of(cell) | self.base.get_coboundary_of(cell)
 
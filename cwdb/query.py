@@ -1,6 +1,14 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
 import numpy as np
 
 from .core import CWComplex
+from .interfaces import ICell, ICWComplex
+from .rules import _fold, _truths, choice, choice_rule, revision, revision_rule
 
 
 class QueryError(RuntimeError):
@@ -27,8 +35,396 @@ def query_boundary(label: str, boundary):
 def query_boundary_and_resolve_ambiguity(
     c: CWComplex, label: str, boundary, ambiguity_resolution_rule
 ):
+    x, y = boundary[:2]
+    edges = sorted(
+        (e for e in c.out_edges(x, label) if e.boundary[1] == y), key=c.position_of
+    )
+    if not edges:
+        return np.array([0.5, 0])
+    if len(edges) == 1:
+        return edges[0].embedding
+    (result,) = _resolve(c, ambiguity_resolution_rule, [edges])
+    return result.embedding
+
+
+AmbiguityResolutionRule = Callable[[ICWComplex, ICell, ICell], ICell]
+
+# Rules that are folded over truth values rather than cell by cell
+_KERNELS: Dict[AmbiguityResolutionRule, Callable[..., np.ndarray]] = {
+    revision_rule: revision,
+    choice_rule: choice,
+}
+
+
+def _cells_above_points(c: ICWComplex) -> Iterator[ICell]:
+    layer = 1
+    while True:
+        cells = c.get_layer_cells(layer)
+        if not cells:
+            return
+        yield from cells
+        layer += 1
+
+
+def find_ambiguities(
+    c: ICWComplex, labels: Optional[Iterable[str]] = None
+) -> List[List[ICell]]:
+    """
+    Groups of cells of dimension 1 and up with the same label and boundary.
+
+    Only groups of two cells or more are returned, each in creation order.
+    `labels` restricts the search to cells with one of them.
+    """
+    if labels is None:
+        cells: Iterable[ICell] = _cells_above_points(c)
+    else:
+        cells = (
+            x
+            for label in dict.fromkeys(labels)
+            for x in c.get_cells_by_label(label)
+            if x.dimension > 0
+        )
+    groups: Dict[Tuple[str, Tuple[ICell, ...]], List[ICell]] = {}
+    for x in cells:
+        groups.setdefault((x.label, tuple(x.boundary)), []).append(x)
+    position = c.position_of
+    result = [sorted(g, key=position) for g in groups.values() if len(g) > 1]
+    result.sort(key=lambda g: position(g[0]))
+    return result
+
+
+def resolve_all(
+    c: ICWComplex,
+    rule: AmbiguityResolutionRule,
+    labels: Optional[Iterable[str]] = None,
+) -> List[ICell]:
+    """
+    Resolves every group of `find_ambiguities` to a single cell with `rule`.
+
+    `revision_rule` and `choice_rule` are applied to the truth values of all
+    groups at once: the result is written into the oldest cell of each group
+    and the others are deleted, so unlike `revision_rule` no cell is created.
+    Any other rule is folded over each group, oldest cell first. Returns the
+    cell each group was resolved to.
+    """
+    return _resolve(c, rule, find_ambiguities(c, labels))
+
+
+def _resolve(
+    c: ICWComplex, rule: AmbiguityResolutionRule, groups: List[List[ICell]]
+) -> List[ICell]:
+    kernel = _KERNELS.get(rule)
+    if kernel is None:
+        resolved = []
+        for group in groups:
+            result = group[0]
+            for x in group[1:]:
+                result = rule(c, result, x)
+            resolved.append(result)
+        return resolved
+
+    cells = [x for group in groups for x in group]
+    ids = np.repeat(np.arange(len(groups)), [len(g) for g in groups])
+    _, firsts, folded = _fold(kernel, ids, _truths(c, cells))
+    resolved = [cells[i] for i in firsts.tolist()]
+    c.set_embeddings(resolved, folded)
+    c.delete_cells([x for group in groups for x in group[1:]])
+    return resolved
+
+
+# Pattern queries
+#
+#     (x)-[is]->(y)-[is]->(:animal), (x)-[e:has]-(z:'long tail')
+#
+# A node `(var)`, `(var:label)` or `(:label)` stands for a 0-cell, an edge
+# `-[label]->`, `<-[label]-`, `-[label]-` (either direction), `-[e:label]->`
+# or `-[]->` (any label) for a 1-cell between two nodes. Labels that are not
+# identifiers are quoted with `'`. A variable that occurs more than once
+# stands for the same cell, distinct variables may match the same cell.
+
+_LABEL = r"\w+|'(?:[^'\\]|\\.)*'"
+_NODE = re.compile(
+    rf"\s*\(\s*(?P<var>\w+)?\s*(?::\s*(?P<label>{_LABEL}))?\s*\)", re.ASCII
+)
+_EDGE = re.compile(
+    rf"\s*(?P<left><)?-\[\s*(?:(?P<var>\w+)\s*:\s*)?(?P<label>{_LABEL})?\s*\]"
+    rf"-(?P<right>>)?",
+    re.ASCII,
+)
+_SEPARATOR = re.compile(r"\s*,")
+_END = re.compile(r"\s*\Z")
+
+
+def _unquote(label: Optional[str]) -> Optional[str]:
+    if label is None or not label.startswith("'"):
+        return label
+    return re.sub(r"\\(.)", r"\1", label[1:-1])
+
+
+@dataclass(frozen=True)
+class PatternEdge:
+    tail: str
+    head: str
+    label: Optional[str] = None
+    var: Optional[str] = None
+    directed: bool = True
+
+
+@dataclass
+class Pattern:
+    """Node variables with their label, if any, and the edges between them"""
+
+    nodes: Dict[str, Optional[str]] = field(default_factory=dict)
+    edges: List[PatternEdge] = field(default_factory=list)
+
+    @property
+    def variables(self) -> List[str]:
+        """Named variables, anonymous nodes are left out of the matches"""
+        edge_vars = [e.var for e in self.edges if e.var is not None]
+        return [x for x in [*self.nodes, *edge_vars] if not x.startswith("#")]
+
+    @classmethod
+    def parse(cls, text: str) -> Pattern:
+        pattern = cls()
+        position = 0
+
+        def expect(regex):
+            nonlocal position
+            match = regex.match(text, position)
+            if match is not None:
+                position = match.end()
+            return match
+
+        while True:
+            node = expect(_NODE)
+            if node is None:
+                raise ValueError(f"Expected a node at {position}: {text!r}")
+            tail = pattern._add_node(node["var"], _unquote(node["label"]))
+            while True:
+                edge = expect(_EDGE)
+                if edge is None:
+                    break
+                node = expect(_NODE)
+                if node is None:
+                    raise ValueError(f"Expected a node at {position}: {text!r}")
+                head = pattern._add_node(node["var"], _unquote(node["label"]))
+                if edge["left"] and edge["right"]:
+                    raise ValueError(f"Edge with two arrows before {position}")
+                ends = (head, tail) if edge["left"] else (tail, head)
+                pattern.edges.append(
+                    PatternEdge(
+                        *ends,
+                        label=_unquote(edge["label"]),
+                        var=edge["var"],
+                        directed=bool(edge["left"] or edge["right"]),
+                    )
+                )
+                tail = head
+            if expect(_END) is not None:
+                return pattern
+            if expect(_SEPARATOR) is None:
+                raise ValueError(f"Unexpected input at {position}: {text!r}")
+
+    def _add_node(self, var: Optional[str], label: Optional[str]) -> str:
+        if var is None:
+            var = f"#{len(self.nodes)}"
+        known = self.nodes.get(var)
+        if known is not None and label is not None and known != label:
+            raise ValueError(f"Node '{var}' has labels '{known}' and '{label}'")
+        self.nodes[var] = known if label is None else label
+        return var
+
+
+Bindings = Dict[str, ICell]
+Predicate = Callable[[ICell], bool]
+
+
+class _Matcher:
+    """Binds variables, checking their labels and predicates"""
+
+    def __init__(self, pattern: Pattern, where: Dict[str, Predicate]):
+        self.labels = dict(pattern.nodes)
+        self.labels.update({e.var: e.label for e in pattern.edges if e.var})
+        self.where = where
+
+    def bind(self, bindings: Bindings, var: str, cell: ICell) -> Optional[Bindings]:
+        known = bindings.get(var)
+        if known is not None:
+            return bindings if known == cell else None
+        label = self.labels.get(var)
+        if label is not None and cell.label != label:
+            return None
+        predicate = self.where.get(var)
+        if predicate is not None and not predicate(cell):
+            return None
+        return {**bindings, var: cell}
+
+    def bind_edge(
+        self, bindings: Bindings, edge: PatternEdge, cell: ICell, tail, head
+    ) -> Optional[Bindings]:
+        result: Optional[Bindings] = bindings
+        if edge.var is not None:
+            result = self.bind(bindings, edge.var, cell)
+        if result is not None:
+            result = self.bind(result, edge.tail, tail)
+        if result is not None:
+            result = self.bind(result, edge.head, head)
+        return result
+
+
+@dataclass
+class ScanNodes:
+    var: str
+    label: Optional[str]
+
+    def run(self, c: ICWComplex, matcher: _Matcher, bindings: Bindings):
+        if self.label is None:
+            cells: Iterable[ICell] = c.get_layer_cells(0)
+        else:
+            cells = c.get_cells_by_label(self.label, dimension=0)
+        for cell in cells:
+            result = matcher.bind(bindings, self.var, cell)
+            if result is not None:
+                yield result
+
+
+@dataclass
+class ScanEdges:
+    edge: PatternEdge
+
+    def run(self, c: ICWComplex, matcher: _Matcher, bindings: Bindings):
+        if self.edge.label is None:
+            cells: Iterable[ICell] = c.get_layer_cells(1)
+        else:
+            cells = c.get_cells_by_label(self.edge.label, dimension=1)
+        for cell in cells:
+            if len(cell.boundary) != 2:
+                continue
+            a, b = cell.boundary
+            ends = [(a, b)] if self.edge.directed or a == b else [(a, b), (b, a)]
+            for tail, head in ends:
+                result = matcher.bind_edge(bindings, self.edge, cell, tail, head)
+                if result is not None:
+                    yield result
+
+
+@dataclass
+class ExpandEdge:
+    """Follows `edge` from the bound variable `start`, one of its ends"""
+
+    edge: PatternEdge
+    start: str
+
+    def run(self, c: ICWComplex, matcher: _Matcher, bindings: Bindings):
+        cell = bindings[self.start]
+        forward = self.start == self.edge.tail
+        directions = [forward, not forward] if not self.edge.directed else [forward]
+        for outgoing in directions:
+            if outgoing:
+                edges = c.out_edges(cell, self.edge.label)
+            else:
+                edges = c.in_edges(cell, self.edge.label)
+            for x in edges:
+                if outgoing != forward and x.boundary[0] == x.boundary[1]:
+                    continue  # a loop was already followed the other way
+                other = x.boundary[1] if outgoing else x.boundary[0]
+                ends = (cell, other) if forward else (other, cell)
+                result = matcher.bind_edge(bindings, self.edge, x, *ends)
+                if result is not None:
+                    yield result
+
+
+Step = Union[ScanNodes, ScanEdges, ExpandEdge]
+
+
+def plan_pattern(
+    c: ICWComplex, pattern: Pattern, bound: Iterable[str] = ()
+) -> List[Step]:
+    """
+    Orders the pattern greedily: starts from the most selective label, or a
+    bound variable, and then follows edges out of what is already bound,
+    checking edges between two bound variables first and preferring labelled
+    ones. A new start is chosen the same way for every disconnected part.
+    """
+    bound = set(bound)
+    edges = list(pattern.edges)
+    steps: List[Step] = []
+    counts: Dict[Tuple[Optional[str], int], int] = {}
+
+    def count(label: Optional[str], dimension: int) -> int:
+        if (label, dimension) not in counts:
+            if label is None:
+                cells = c.get_layer_cells(dimension)
+            else:
+                cells = c.get_cells_by_label(label, dimension=dimension)
+            counts[label, dimension] = len(cells)
+        return counts[label, dimension]
+
     while True:
-        try:
-            return query_boundary(label, boundary)
-        except QueryError as e:
-            ambiguity_resolution_rule(c, *e.offending)
+        connected = [e for e in edges if e.tail in bound or e.head in bound]
+        if connected:
+            edge = min(
+                connected,
+                key=lambda e: (
+                    not (e.tail in bound and e.head in bound),
+                    e.label is None,
+                    count(e.label, 1),
+                ),
+            )
+            start = edge.tail if edge.tail in bound else edge.head
+            steps.append(ExpandEdge(edge, start))
+        else:
+            starts: List[Tuple[int, Step]] = [
+                (count(label, 0), ScanNodes(var, label))
+                for var, label in pattern.nodes.items()
+                if var not in bound
+            ]
+            starts += [(count(e.label, 1), ScanEdges(e)) for e in edges]
+            if not starts:
+                return steps
+            _, step = min(starts, key=lambda x: x[0])
+            steps.append(step)
+            if isinstance(step, ScanNodes):
+                bound.add(step.var)
+                continue
+            edge = step.edge
+        edges.remove(edge)
+        bound.update((edge.tail, edge.head))
+        if edge.var is not None:
+            bound.add(edge.var)
+
+
+def match_pattern(
+    c: ICWComplex,
+    pattern: Union[str, Pattern],
+    where: Optional[Dict[str, Predicate]] = None,
+    **bindings: ICell,
+) -> Iterator[Bindings]:
+    """
+    Streams the matches of `pattern` in `c`, each a dict from the named
+    variables to cells. `where` holds a predicate per variable, for example
+    on its embedding, and keyword arguments pin variables to given cells.
+    """
+    if isinstance(pattern, str):
+        pattern = Pattern.parse(pattern)
+    where = where or {}
+    unknown = (set(where) | set(bindings)) - set(pattern.variables)
+    if unknown:
+        raise ValueError(f"Unknown variables {sorted(unknown)}")
+    matcher = _Matcher(pattern, where)
+    start: Optional[Bindings] = {}
+    for var, cell in bindings.items():
+        start = matcher.bind(start, var, cell) if start is not None else None
+    if start is None:
+        return
+    steps = plan_pattern(c, pattern, bindings)
+    names = pattern.variables
+
+    def run(i: int, partial: Bindings) -> Iterator[Bindings]:
+        if i == len(steps):
+            yield {var: partial[var] for var in names}
+            return
+        for extended in steps[i].run(c, matcher, partial):
+            yield from run(i + 1, extended)
+
+    yield from run(0, start)
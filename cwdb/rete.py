@@ -0,0 +1,302 @@
+"""
+Incremental matching of rule cells, Rete style.
+
+A `ReteNetwork` compiles the patterns of a set of rules, see `compile_rule`,
+and listens to a complex. Each pattern is matched in the steps `plan_rule`
+orders it in. A step has an alpha memory of the cells that match its pattern
+cell on their own, together with their faces, and a beta memory of the
+partial matches of all steps up to it. Memories are hashed by the cells a
+step shares with the steps before it, so a new cell is joined only with the
+partial matches it agrees with, and a deleted cell only drops the entries
+that contain it.
+
+Complete matches are queued as activations on an `Agenda`, whose ordering
+can be chosen, and `ReteNetwork.fire` applies them. Rules are compiled once,
+when the network is built.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .interfaces import ICell, IComplexListener, ICWComplex
+from .rules import (
+    CompiledRule,
+    _bind,
+    _closure,
+    _rewrite,
+    _rule_cells,
+    compile_rule,
+    plan_rule,
+)
+
+Token = Tuple[Optional[ICell], ...]
+
+
+@dataclass(frozen=True)
+class Activation:
+    """A complete match of `rule`, listed as `apply_rule` expects it"""
+
+    rule: ICell
+    match: Tuple[ICell, ...]
+
+
+class Agenda:
+    """
+    Activations waiting to fire.
+
+    `key` orders activations, smallest first, activations with equal keys
+    fire in the order they were queued. Without `key` the agenda is first in,
+    first out.
+    """
+
+    def __init__(self, key: Optional[Callable[[Activation], Any]] = None):
+        self.key = key
+        self._heap: List[list] = []
+        self._entries: Dict[Activation, list] = {}
+        self._counter = itertools.count()
+
+    def push(self, activation: Activation):
+        if activation in self._entries:
+            return
+        key = self.key(activation) if self.key is not None else 0
+        entry = [key, next(self._counter), activation]
+        self._entries[activation] = entry
+        heapq.heappush(self._heap, entry)
+
+    def discard(self, activation: Activation):
+        entry = self._entries.pop(activation, None)
+        if entry is not None:
+            entry[-1] = None
+
+    def pop(self) -> Activation:
+        while self._heap:
+            activation = heapq.heappop(self._heap)[-1]
+            if activation is not None:
+                del self._entries[activation]
+                return activation
+        raise KeyError("pop from an empty agenda")
+
+    def clear(self):
+        self._heap.clear()
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Activation]:
+        return iter(list(self._entries))
+
+    def __contains__(self, activation: Activation) -> bool:
+        return activation in self._entries
+
+
+class _RuleNet:
+    """The steps of one rule with the memory ids of their alpha and beta memories"""
+
+    def __init__(self, compiled: CompiledRule, steps: Sequence[ICell], first: int):
+        self.compiled = compiled
+        self.steps = list(steps)
+        self.cells = list(dict.fromkeys([*compiled.pattern, *_closure(steps)]))
+        self.index = {p: i for i, p in enumerate(self.cells)}
+        self.match = [self.index[p] for p in compiled.pattern]
+
+        covered: Set[ICell] = set()
+        self.join_keys: List[Tuple[int, ...]] = []
+        for p in self.steps:
+            closure = _closure([p])
+            self.join_keys.append(tuple(self.index[q] for q in closure & covered))
+            covered |= closure
+        self.alpha = list(range(first, first + len(self.steps)))
+        self.beta = list(range(first + len(self.steps), first + 2 * len(self.steps)))
+
+    def token(self, mapping: Dict[ICell, ICell]) -> Token:
+        token: List[Optional[ICell]] = [None] * len(self.cells)
+        for p, cell in mapping.items():
+            token[self.index[p]] = cell
+        return tuple(token)
+
+    def key(self, step: int, token: Token) -> Tuple[Optional[ICell], ...]:
+        return tuple(token[i] for i in self.join_keys[step])
+
+    def activation(self, token: Token) -> Activation:
+        match = tuple(token[i] for i in self.match)
+        return Activation(self.compiled.rule, match)  # type: ignore[arg-type]
+
+
+def _merge(a: Token, b: Token) -> Optional[Token]:
+    """Joins two partial matches, unless they map a cell differently"""
+    used = {x for x in a if x is not None}
+    merged = list(a)
+    for i, x in enumerate(b):
+        if x is None:
+            continue
+        if merged[i] is None:
+            if x in used:
+                return None
+            merged[i] = x
+            used.add(x)
+        elif merged[i] != x:
+            return None
+    return tuple(merged)
+
+
+class ReteNetwork(IComplexListener):
+    """
+    Keeps the matches of `rules` in `c` up to date as cells change.
+
+    Matches of cells that exist already are queued when the network is built.
+    Call `detach` to stop listening.
+    """
+
+    def __init__(
+        self, c: ICWComplex, rules: Sequence[ICell], agenda: Optional[Agenda] = None
+    ):
+        self.complex = c
+        self.agenda = agenda if agenda is not None else Agenda()
+        self._build(rules)
+        c.subscribe(self)
+
+    def detach(self):
+        self.complex.unsubscribe(self)
+
+    def _build(self, rules: Sequence[ICell]):
+        """Compiles `rules` and queues the matches of the cells there are"""
+        c = self.complex
+        self._nets: List[_RuleNet] = []
+        for rule in rules:
+            compiled = compile_rule(c, rule)
+            steps = [p for p, _ in plan_rule(c, compiled.pattern)]
+            first = 2 * sum(len(net.steps) for net in self._nets)
+            self._nets.append(_RuleNet(compiled, steps, first))
+        n_memories = 2 * sum(len(net.steps) for net in self._nets)
+        self._memories: List[Dict[tuple, Set[Token]]] = [{} for _ in range(n_memories)]
+        self._final = {net.beta[-1]: net for net in self._nets}
+        self._refs: Dict[ICell, Set[Tuple[int, tuple, Token]]] = {}
+        self._excluded = _rule_cells(c)
+        self._positions = [c.position_of(net.compiled.rule) for net in self._nets]
+        layer = 0
+        while True:
+            cells = c.get_layer_cells(layer)
+            if not cells:
+                break
+            for cell in cells:
+                self._insert(cell)
+            layer += 1
+
+    def _store(self, memory: int, key: tuple, token: Token):
+        bucket = self._memories[memory].setdefault(key, set())
+        if token in bucket:
+            return False
+        bucket.add(token)
+        for x in token:
+            if x is not None:
+                self._refs.setdefault(x, set()).add((memory, key, token))
+        return True
+
+    def _insert(self, cell: ICell):
+        for net in self._nets:
+            for k, p in enumerate(net.steps):
+                if p.dimension != cell.dimension or p.label not in ("Any", cell.label):
+                    continue
+                mapping: Dict[ICell, ICell] = {}
+                if not _bind(p, cell, mapping, set(), self._excluded):
+                    continue
+                token = net.token(mapping)
+                key = net.key(k, token)
+                if not self._store(net.alpha[k], key, token):
+                    continue
+                if k == 0:
+                    self._extend(net, 0, token)
+                    continue
+                for partial in list(self._memories[net.beta[k - 1]].get(key, ())):
+                    merged = _merge(partial, token)
+                    if merged is not None:
+                        self._extend(net, k, merged)
+
+    def _extend(self, net: _RuleNet, k: int, token: Token):
+        """Stores a match of the steps up to `k` and joins it with the next step"""
+        if k == len(net.steps) - 1:
+            if self._store(net.beta[k], (), token):
+                self.agenda.push(net.activation(token))
+            return
+        key = net.key(k + 1, token)
+        if not self._store(net.beta[k], key, token):
+            return
+        for partial in list(self._memories[net.alpha[k + 1]].get(key, ())):
+            merged = _merge(token, partial)
+            if merged is not None:
+                self._extend(net, k + 1, merged)
+
+    def _retract(self, cell: ICell):
+        for memory, key, token in self._refs.pop(cell, ()):
+            bucket = self._memories[memory].get(key)
+            if bucket is None or token not in bucket:
+                continue
+            bucket.discard(token)
+            if not bucket:
+                del self._memories[memory][key]
+            for x in token:
+                if x is not None and x != cell:
+                    self._refs[x].discard((memory, key, token))
+            net = self._final.get(memory)
+            if net is not None:
+                self.agenda.discard(net.activation(token))
+
+    def fire(
+        self, limit: Optional[int] = None
+    ) -> List[Tuple[List[ICell], List[ICell]]]:
+        """
+        Applies queued activations until the agenda is empty, or `limit` of them.
+
+        Product cells that already exist are not created again. Returns the
+        created and the deleted cells of each fired activation.
+        """
+        nets = {net.compiled.rule: net for net in self._nets}
+        known: Dict[Tuple[str, Tuple[ICell, ...]], ICell] = {}
+        fired: List[Tuple[List[ICell], List[ICell]]] = []
+        while self.agenda and (limit is None or len(fired) < limit):
+            activation = self.agenda.pop()
+            compiled = nets[activation.rule].compiled
+            fired.append(_rewrite(self.complex, compiled, activation.match, known))
+        return fired
+
+    def cell_created(self, cell: ICell):
+        if cell.label in ("pattern", "product"):
+            # a rule added later is not data
+            for x in _closure([cell]):
+                self._excluded.add(x)
+                self._retract(x)
+            return
+        self._insert(cell)
+
+    def cell_deleted(self, cell: ICell):
+        self._retract(cell)
+
+    def label_changed(self, cell: ICell, old_label: str):
+        cells = {cell}
+        stack = [cell]
+        while stack:
+            for x in self.complex.get_coboundary_of(stack.pop()):
+                if x not in cells:
+                    cells.add(x)
+                    stack.append(x)
+        for x in cells:
+            self._retract(x)
+        for x in sorted(cells, key=lambda x: x.dimension):
+            self._insert(x)
+
+    def compacted(self, new_positions: np.ndarray):
+        # cells may have moved, rules are found again by their new positions
+        c = self.complex
+        rules = [
+            c.cell(int(new_positions[p]))
+            for p in self._positions
+            if new_positions[p] >= 0
+        ]
+        self.agenda.clear()
+        self._build(rules)
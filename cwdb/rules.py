@@ -1,64 +1,101 @@
-from typing import Dict, List
+import weakref
+from dataclasses import dataclass, field
+from typing import (
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 import numpy as np
 
-from .interfaces import CellId, ICell, ICWComplex
+from .interfaces import CellId, ICell, IComplexListener, ICWComplex
 
 
-def apply_rule(c: ICWComplex, rule: ICell, subcomplex: List[ICell]):
-    # pattern matching
+def _scaffolded(cell: ICell, scaffolds: int) -> List[ICell]:
+    """
+    Lists the cells of a `pattern` or `product` cell after its `scaffolds`.
+
+    Cells reached through a scaffold come first, in scaffold order, unless the
+    cell lists them itself: a minimal boundary cannot repeat them.
+    """
+    listed = cell.boundary[scaffolds:]
+    implied = [s.boundary[1] for s in cell.boundary[:scaffolds]]
+    return [x for x in implied if x not in listed] + list(listed)
+
+
+def _closure(cells: Iterable[ICell]) -> Set[ICell]:
+    result: Set[ICell] = set()
+    stack = list(cells)
+    while stack:
+        x = stack.pop()
+        if x not in result:
+            result.add(x)
+            stack.extend(x.boundary)
+    return result
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """
+    The structure of a rule cell, read once from the complex.
+
+    `pattern` lists the cells a match binds, in `subcomplex` order, and
+    `bindings` the product cell each of them is bound to, if any. Matched
+    cells without a binding are deleted, `deletions` lists their slots.
+    `product` lists the cells to create as a label and boundary references:
+    a reference below `len(pattern)` is a matched cell, any other one an
+    earlier created cell. `cells` holds every cell the rule is built from.
+    """
 
+    rule: ICell
+    pattern: Tuple[ICell, ...]
+    bindings: Tuple[Optional[ICell], ...]
+    product: Tuple[Tuple[str, Tuple[int, ...]], ...]
+    deletions: Tuple[int, ...]
+    cells: FrozenSet[ICell]
+
+
+def _compile(c: ICWComplex, rule: ICell) -> CompiledRule:
     cb = rule.coboundary(c)
     pattern_links = [x for x in cb if x.label == "pattern_scaffold"]
     # sanity check
 
     assert len(pattern_links) > 0
-    assert len(pattern_links) == len([x for x in subcomplex if x.dimension == 0])
-
     assert len(pattern_links[0].coboundary(c)) == 1
 
     pattern = list(pattern_links[0].coboundary(c))[0]
     assert pattern.label == "pattern"
-    assert len(pattern.boundary) > len(pattern_links)
-    pattern_list = pattern.boundary[len(pattern_links) :]
-
-    if len(pattern_list) != len(subcomplex):
-        raise RuntimeError("Pattern matching failed")
-
-    for pattern_cell, cell in zip(pattern_list, subcomplex):
-        if pattern_cell.dimension != cell.dimension:
-            raise RuntimeError(
-                f"Pattern matching failed: dimensions mismatch "
-                f"{pattern_cell.label}({pattern_cell.dimension}) "
-                f"!= {cell.label}({cell.dimension})"
-            )
-        if pattern_cell.label != "Any" and pattern_cell.label != cell.label:
-            raise RuntimeError(
-                f"Pattern matching failed: label mismatch {pattern_cell.label} "
-                f"!= {cell.label}"
-            )
-
-    # pattern matched
+    assert len(pattern.boundary) >= len(pattern_links)
+    pattern_list = _scaffolded(pattern, len(pattern_links))
+    assert len(pattern_links) == len([x for x in pattern_list if x.dimension == 0])
+    parts = [rule, pattern]
 
-    deletion_list = []
-    target_to_destination: Dict[CellId, ICell] = {}
-    for destination_cell, p in zip(subcomplex, pattern_list):
-        bindings = [b for b in p.coboundary(c) if b.label == "bind"]
-        assert len(bindings) <= 1
-        if len(bindings) == 1:
-            bind = bindings[0]
+    bindings: List[Optional[ICell]] = []
+    for p in pattern_list:
+        binds = list(c.cofaces_containing([p], label="bind"))
+        assert len(binds) <= 1
+        if len(binds) == 1:
+            bind = binds[0]
             assert bind.dimension == p.dimension + 1
             # find target
             target = [
-                b
-                for b in bind.boundary
-                if b.label not in ["bind", "nobind"] and b is not p
+                b for b in bind.boundary if b.label not in ["bind", "nobind"] and b != p
             ]
             assert len(target) == 1
-            target_to_destination[target[0].id] = destination_cell
+            bindings.append(target[0])
+            parts.append(bind)
         else:
-            deletion_list.append(destination_cell)
+            bindings.append(None)
 
+    references = {t: i for i, t in enumerate(bindings) if t is not None}
+    product_cells: List[Tuple[str, Tuple[int, ...]]] = []
     product_links = [x for x in cb if x.label == "product_scaffold"]
 
     if product_links:
@@ -66,39 +103,463 @@ def apply_rule(c: ICWComplex, rule: ICell, subcomplex: List[ICell]):
         product = list(product_links[0].coboundary(c))[0]
         assert product.label == "product"
         for pl in product_links[1:]:
-            assert pl.coboundary == [product]
-        product_list = product.boundary[len(product_links) :]
-        create_list = [x for x in product_list if x.id not in target_to_destination]
+            assert pl.coboundary(c) == {product}
+        parts.append(product)
+        create_list = [
+            x for x in _scaffolded(product, len(product_links)) if x not in references
+        ]
 
         for x in sorted(
             create_list, key=lambda x: x.dimension
         ):  # sort is redundant if rules are well-written
-            if x.dimension == 0:
-                target_to_destination[x.id] = c.create_cell(x.label)
-            else:
-                target_to_destination[x.id] = c.create_cell(
-                    x.label, [target_to_destination[b.id] for b in x.boundary]
+            product_cells.append((x.label, tuple(references[b] for b in x.boundary)))
+            references[x] = len(pattern_list) + len(product_cells) - 1
+
+    return CompiledRule(
+        rule,
+        tuple(pattern_list),
+        tuple(bindings),
+        tuple(product_cells),
+        tuple(i for i, t in enumerate(bindings) if t is None),
+        frozenset(_closure(parts)),
+    )
+
+
+_STRUCTURE_LABELS = frozenset(
+    ["pattern_scaffold", "product_scaffold", "pattern", "product", "bind", "nobind"]
+)
+
+
+class _RuleCache(IComplexListener):
+    """Keeps compiled rules of a complex until a cell they are built from changes"""
+
+    def __init__(self):
+        self.rules: Dict[CellId, CompiledRule] = {}
+        self._users: Dict[ICell, Set[CellId]] = {}
+
+    def add(self, compiled: CompiledRule):
+        self.rules[compiled.rule.id] = compiled
+        for x in compiled.cells:
+            self._users.setdefault(x, set()).add(compiled.rule.id)
+
+    def _invalidate(self, cell: ICell):
+        for rule_id in self._users.pop(cell, ()):
+            compiled = self.rules.pop(rule_id, None)
+            if compiled is None:
+                continue
+            for x in compiled.cells:
+                users = self._users.get(x)
+                if users is not None:
+                    users.discard(rule_id)
+                    if not users:
+                        del self._users[x]
+
+    def cell_created(self, cell: ICell):
+        # only a new scaffold, pattern, product or bind cell changes a rule, and
+        # it reaches the rule through its boundary
+        if cell.label not in _STRUCTURE_LABELS:
+            return
+        for b in cell.boundary:
+            if b in self._users:
+                self._invalidate(b)
+
+    def cell_deleted(self, cell: ICell):
+        if cell in self._users:
+            self._invalidate(cell)
+
+    def label_changed(self, cell: ICell, old_label: str):
+        if cell in self._users:
+            self._invalidate(cell)
+
+    def compacted(self, new_positions: np.ndarray):
+        self.rules.clear()
+        self._users.clear()
+
+
+# Compiled cells keep their complex alive, so the complex holds its cache as a
+# listener and this table only refers to both weakly
+_caches: "weakref.WeakKeyDictionary[ICWComplex, weakref.ref[_RuleCache]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def compile_rule(c: ICWComplex, rule: ICell) -> CompiledRule:
+    """
+    Returns the structure of `rule` in `c`.
+
+    Results are cached per complex by rule id until a cell of the rule is
+    created, deleted or relabelled, or the complex is compacted. Complexes
+    that do not take listeners compile on every call.
+    """
+    ref = _caches.get(c)
+    cache = ref() if ref is not None else None
+    if cache is None:
+        cache = _RuleCache()
+        try:
+            c.subscribe(cache)
+        except NotImplementedError:
+            return _compile(c, rule)
+        _caches[c] = weakref.ref(cache)
+    compiled = cache.rules.get(rule.id)
+    if compiled is None:
+        compiled = _compile(c, rule)
+        cache.add(compiled)
+    return compiled
+
+
+def _rule_cells(c: ICWComplex) -> Set[ICell]:
+    """Collects the cells every `pattern` and `product` cell is built from."""
+    return _closure(
+        [*c.get_cells_by_label("pattern"), *c.get_cells_by_label("product")]
+    )
+
+
+def _candidates(
+    c: ICWComplex,
+    p: ICell,
+    anchors: Sequence[ICell] = (),
+    mapping: Optional[Dict[ICell, ICell]] = None,
+) -> Set[ICell]:
+    """Cells that may match `p`, given the matches of its faces `anchors`"""
+    label = None if p.label == "Any" else p.label
+    if anchors:
+        assert mapping is not None
+        if p.dimension == 1 and len(p.boundary) == 2:
+            # edges use the direction-partitioned adjacency
+            tail, head = p.boundary
+            if tail in anchors:
+                return c.out_edges(mapping[tail], label)
+            return c.in_edges(mapping[head], label)
+        return c.cofaces_containing(
+            [mapping[a] for a in anchors], dimension=p.dimension, label=label
+        )
+    if label is None:
+        return c.get_layer_cells(p.dimension)
+    return c.get_cells_by_label(label, dimension=p.dimension)
+
+
+def plan_rule(
+    c: ICWComplex, pattern_list: Sequence[ICell], bound: Iterable[ICell] = ()
+) -> List[Tuple[ICell, Tuple[ICell, ...]]]:
+    """
+    Orders the search for `pattern_list` in `c`, given the `bound` cells.
+
+    Each step is a pattern cell with the faces matched before it. A step with
+    faces looks its candidates up among their common cofaces, any other one in
+    the label index, or in its layer for `"Any"`. Matching a cell matches its
+    whole closure, so steps with faces come first, then the fewest candidates,
+    then the highest dimension.
+    """
+    matched = _closure(bound)
+    steps: List[Tuple[ICell, Tuple[ICell, ...]]] = []
+    sizes: Dict[ICell, int] = {}
+
+    def cost(p: ICell):
+        if any(b in matched for b in p.boundary):
+            return 0, -p.dimension
+        if p not in sizes:
+            sizes[p] = len(_candidates(c, p))
+        return 1, sizes[p], -p.dimension
+
+    while True:
+        todo = [p for p in pattern_list if p not in matched]
+        if not todo:
+            return steps
+        p = min(todo, key=cost)
+        anchors = tuple(dict.fromkeys(b for b in p.boundary if b in matched))
+        steps.append((p, anchors))
+        matched |= _closure([p])
+
+
+def _bind(
+    p: ICell,
+    cell: ICell,
+    mapping: Dict[ICell, ICell],
+    used: Set[ICell],
+    excluded: Set[ICell],
+) -> bool:
+    if p in mapping:
+        return mapping[p] == cell
+    if cell in used or cell in excluded:
+        return False
+    if cell.dimension != p.dimension or len(cell.boundary) != len(p.boundary):
+        return False
+    if p.label != "Any" and p.label != cell.label:
+        return False
+    mapping[p] = cell
+    used.add(cell)
+    return all(
+        _bind(q, b, mapping, used, excluded) for q, b in zip(p.boundary, cell.boundary)
+    )
+
+
+def _search(
+    c: ICWComplex,
+    steps: List[Tuple[ICell, Tuple[ICell, ...]]],
+    mapping: Dict[ICell, ICell],
+    used: Set[ICell],
+    excluded: Set[ICell],
+) -> Iterator[Dict[ICell, ICell]]:
+    def search(i: int, mapping: Dict[ICell, ICell], used: Set[ICell]):
+        if i == len(steps):
+            yield mapping
+            return
+        p, anchors = steps[i]
+        for cell in _candidates(c, p, anchors, mapping):
+            m, u = dict(mapping), set(used)
+            if _bind(p, cell, m, u, excluded):
+                yield from search(i + 1, m, u)
+
+    return search(0, mapping, used)
+
+
+def match_rule(c: ICWComplex, rule: ICell) -> Iterator[List[ICell]]:
+    """
+    Yields every embedding of the pattern of `rule` in `c`.
+
+    A match lists cells in the order `apply_rule` expects for `subcomplex`.
+    Matched cells are distinct, have the dimension and label of their pattern
+    cell (any label for `"Any"`), and their boundaries match in order. Cells
+    of `pattern` and `product` cells are never matched.
+
+    Matches are found lazily, so collect them before applying rules to them.
+    """
+    pattern_list = compile_rule(c, rule).pattern
+    excluded = _rule_cells(c)
+    for mapping in _search(c, plan_rule(c, pattern_list), {}, set(), excluded):
+        yield [mapping[p] for p in pattern_list]
+
+
+def _delta_matches(
+    c: ICWComplex,
+    pattern_list: Sequence[ICell],
+    delta: Set[ICell],
+    excluded: Set[ICell],
+) -> Iterator[List[ICell]]:
+    """
+    Yields the matches of `pattern_list` that contain a cell of `delta`.
+
+    A match is seeded at its first pattern cell mapped into `delta`, so each
+    match is found once.
+    """
+    pattern_cells = list(dict.fromkeys([*pattern_list, *_closure(pattern_list)]))
+    for k, p in enumerate(pattern_cells):
+        seeds = [
+            x
+            for x in delta
+            if x.dimension == p.dimension and p.label in ("Any", x.label)
+        ]
+        if not seeds:
+            continue
+        earlier = pattern_cells[:k]
+        steps = plan_rule(c, pattern_list, bound=[p])
+        for x in seeds:
+            mapping: Dict[ICell, ICell] = {}
+            used: Set[ICell] = set()
+            if not _bind(p, x, mapping, used, excluded):
+                continue
+            for m in _search(c, steps, mapping, used, excluded):
+                if not any(m[q] in delta for q in earlier):
+                    yield [m[q] for q in pattern_list]
+
+
+def apply_rule(
+    c: ICWComplex, rule: ICell, subcomplex: Optional[List[ICell]] = None
+) -> List[ICell]:
+    # pattern matching
+
+    compiled = compile_rule(c, rule)
+    pattern_list = compiled.pattern
+    if subcomplex is None:
+        subcomplex = next(match_rule(c, rule), None)
+        if subcomplex is None:
+            raise RuntimeError("Pattern matching failed: no match")
+
+    _check(pattern_list, [subcomplex])
+
+    # pattern matched
+
+    created, _ = _rewrite(c, compiled, subcomplex)
+    return created
+
+
+def apply_rule_many(
+    c: ICWComplex, rule: ICell, matches: Iterable[Sequence[ICell]]
+) -> List[List[ICell]]:
+    """
+    Applies `rule` to each of `matches`, see `apply_rule`.
+
+    All matches are checked before the complex changes. The products of all
+    matches are created with one `bulk_load`, then the unbound cells of all
+    matches are deleted with one `delete_cells`, so products that contain a
+    cell deleted by another match are deleted along with it. Returns the
+    cells created for each match.
+    """
+    compiled = compile_rule(c, rule)
+    matches = [list(m) for m in matches]
+    _check(compiled.pattern, matches)
+
+    n, per_match = len(compiled.pattern), len(compiled.product)
+    existing: Dict[ICell, int] = {}
+    labels: List[str] = []
+    offsets = [0]
+    indices: List[int] = []
+    for k, m in enumerate(matches):
+        for label, references in compiled.product:
+            for i in references:
+                if i < n:
+                    indices.append(-existing.setdefault(m[i], len(existing)) - 1)
+                else:
+                    indices.append(k * per_match + i - n)
+            labels.append(label)
+            offsets.append(len(indices))
+    created: List[ICell] = []
+    if labels:
+        created = c.bulk_load(
+            labels,
+            np.array(offsets, dtype=np.int64),
+            np.array(indices, dtype=np.int64),
+            existing=list(existing),
+        )
+    c.delete_cells([m[i] for m in matches for i in compiled.deletions])
+    return [created[k * per_match : (k + 1) * per_match] for k in range(len(matches))]
+
+
+def _check(pattern_list: Sequence[ICell], matches: Sequence[Sequence[ICell]]):
+    dimensions = [p.dimension for p in pattern_list]
+    labels = [(i, p.label) for i, p in enumerate(pattern_list) if p.label != "Any"]
+    for subcomplex in matches:
+        if len(pattern_list) != len(subcomplex):
+            raise RuntimeError("Pattern matching failed")
+
+        for pattern_cell, dimension, cell in zip(pattern_list, dimensions, subcomplex):
+            if dimension != cell.dimension:
+                raise RuntimeError(
+                    f"Pattern matching failed: dimensions mismatch "
+                    f"{pattern_cell.label}({dimension}) "
+                    f"!= {cell.label}({cell.dimension})"
                 )
+        for i, label in labels:
+            if label != subcomplex[i].label:
+                raise RuntimeError(
+                    f"Pattern matching failed: label mismatch {label} "
+                    f"!= {subcomplex[i].label}"
+                )
+
+
+def _find_cell(c: ICWComplex, label: str, boundary: List[ICell]) -> Optional[ICell]:
+    for x in c.cofaces_containing(boundary, label=label):
+        if list(x.boundary) == boundary:
+            return x
+    return None
+
+
+def _rewrite(
+    c: ICWComplex,
+    compiled: CompiledRule,
+    subcomplex: Sequence[ICell],
+    known: Optional[Dict[Tuple[str, Tuple[ICell, ...]], ICell]] = None,
+) -> Tuple[List[ICell], List[ICell]]:
+    """
+    Creates the product of a match and deletes its unbound cells.
+
+    With `known`, product cells that already exist with the same label and
+    boundary are used instead of created, and `known` remembers them by label
+    and boundary. Returns the created and the deleted cells.
+    """
+    cells = list(subcomplex)
+    created = []
+    for label, references in compiled.product:
+        boundary = [cells[i] for i in references]
+        key = (label, tuple(boundary))
+        cell = None
+        if known is not None and boundary:
+            cell = known.get(key)
+            if cell is None or cell not in c:
+                cell = _find_cell(c, label, boundary)
+        if cell is None:
+            cell = c.create_cell(label, boundary)
+            created.append(cell)
+        if known is not None and boundary:
+            known[key] = cell
+        cells.append(cell)
 
     # deletion
-    for x in deletion_list:
-        x.data.deleted = True
+    deleted = [subcomplex[i] for i in compiled.deletions]
+    for x in deleted:
+        c.delete_cell(x)
+    return created, deleted
+
+
+@dataclass
+class Saturation:
+    """
+    The outcome of `saturate`.
+
+    `rounds` counts the rounds that applied a rule, `created` and `deleted`
+    list the cells the rules created and deleted in every round, and
+    `fixpoint` tells whether the last round found nothing to derive.
+    """
+
+    rounds: int = 0
+    created: List[List[ICell]] = field(default_factory=list)
+    deleted: List[List[ICell]] = field(default_factory=list)
+    fixpoint: bool = False
+
+
+def saturate(
+    c: ICWComplex, rules: Iterable[ICell], max_rounds: Optional[int] = None
+) -> Saturation:
+    """
+    Applies `rules` until they derive nothing new, or for `max_rounds` rounds.
+
+    Evaluation is semi-naive: the first round matches every rule against the
+    whole complex, and each later round only takes the matches that contain a
+    cell created in the round before. All matches of a round are found before
+    any is applied. A match is skipped when an earlier one deleted its cells,
+    and product cells that already exist are not created again.
+    """
+    compiled = [compile_rule(c, rule) for rule in rules]
+    known: Dict[Tuple[str, Tuple[ICell, ...]], ICell] = {}
+    result = Saturation()
+    delta: Optional[Set[ICell]] = None
+    while max_rounds is None or result.rounds < max_rounds:
+        excluded = _rule_cells(c)
+        matches = [
+            (r, m)
+            for r in compiled
+            for m in (
+                match_rule(c, r.rule)
+                if delta is None
+                else _delta_matches(c, r.pattern, delta, excluded)
+            )
+        ]
+        created: List[ICell] = []
+        deleted: List[ICell] = []
+        for r, m in matches:
+            if not deleted or all(x in c for x in m):
+                new, gone = _rewrite(c, r, m, known)
+                created.extend(new)
+                deleted.extend(gone)
+        if not created and not deleted:
+            result.fixpoint = True
+            break
+        result.rounds += 1
+        result.created.append(created)
+        result.deleted.append(deleted)
+        delta = {x for x in created if x in c}
+    return result
 
 
 def revision_rule(c: ICWComplex, e1: ICell, e2: ICell) -> ICell:
     assert e1.label == e2.label
     assert e1.boundary == e2.boundary
-    f1, c1 = e1.embedding
-    f2, c2 = e2.embedding
-    f3 = (f1 * c1 * (1 - c2) + f2 * c2 * (1 - c1)) / (c1 * (1 - c2) + c2 * (1 - c1))
-    c3 = (c1 * (1 - c2) + c2 * (1 - c1)) / (
-        (c1 * (1 - c2) + c2 * (1 - c1)) + (1 - c1) * (1 - c2)
-    )
+    (truth,) = revision(e1.embedding[None], e2.embedding[None])
 
     result = c.create_cell(e1.label, e1.boundary)
-    result.data.embedding = np.array([f3, c3])
-    e1.data.deleted = True
-    e2.data.deleted = True
+    result.embedding = truth
+    c.delete_cell(e1)
+    c.delete_cell(e2)
     return result
 
 
@@ -109,7 +570,7 @@ def choice_rule(c: ICWComplex, e1: ICell, e2: ICell) -> ICell:
     f2, c2 = e2.embedding
     if c1 > c2:
         e1, e2 = e2, e1
-    e1.data.deleted = True
+    c.delete_cell(e1)
     return e2
 
 
@@ -121,3 +582,172 @@ def random_rule(c: ICWComplex, e1: ICell, e2: ICell) -> ICell:
     else:
         rule = revision_rule
     return rule(c, e1, e2)
+
+
+# Truth-value functions take (N, 2) arrays of (frequency, confidence) rows
+# and combine them row by row
+
+
+def revision(t1: np.ndarray, t2: np.ndarray) -> np.ndarray:
+    """Pools the evidence of two judgements of the same statement"""
+    f1, c1, f2, c2 = t1[:, 0], t1[:, 1], t2[:, 0], t2[:, 1]
+    w1, w2 = c1 * (1 - c2), c2 * (1 - c1)
+    w = w1 + w2
+    total = w + (1 - c1) * (1 - c2)
+    # no evidence on either side, or certainty on both, weighs them equally
+    f = np.divide(f1 * w1 + f2 * w2, w, out=(f1 + f2) / 2, where=w > 0)
+    c = np.divide(w, total, out=np.ones_like(w), where=total > 0)
+    return np.stack([f, c], axis=1)
+
+
+def choice(t1: np.ndarray, t2: np.ndarray) -> np.ndarray:
+    """Keeps the more confident judgement, the second one on ties"""
+    return np.where((t1[:, 1] > t2[:, 1])[:, None], t1, t2)
+
+
+def deduction(t1: np.ndarray, t2: np.ndarray) -> np.ndarray:
+    """`M -> P` and `S -> M` give `S -> P`"""
+    f = t1[:, 0] * t2[:, 0]
+    return np.stack([f, f * t1[:, 1] * t2[:, 1]], axis=1)
+
+
+def induction(t1: np.ndarray, t2: np.ndarray) -> np.ndarray:
+    """`M -> P` and `M -> S` give `S -> P`"""
+    w = t2[:, 0] * t1[:, 1] * t2[:, 1]
+    return np.stack([t1[:, 0], w / (w + 1)], axis=1)
+
+
+def abduction(t1: np.ndarray, t2: np.ndarray) -> np.ndarray:
+    """`P -> M` and `S -> M` give `S -> P`"""
+    w = t1[:, 0] * t1[:, 1] * t2[:, 1]
+    return np.stack([t2[:, 0], w / (w + 1)], axis=1)
+
+
+_IGNORANCE = np.array([0.5, 0])
+
+
+def _truths(c: ICWComplex, cells: List[ICell]) -> np.ndarray:
+    """Truth values of `cells`, total ignorance for cells without one"""
+    try:
+        values = c.get_embeddings(cells)
+    except ValueError:
+        values = None
+    if values is None or values.ndim != 2 or values.shape[1] != 2:
+        rows = [x.embedding if len(x.embedding) == 2 else _IGNORANCE for x in cells]
+        values = np.array(rows, dtype=np.float64).reshape(-1, 2)
+    return values
+
+
+def _fold(
+    function: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    groups: np.ndarray,
+    truths: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Folds the truth values of each group with `function`, in order.
+
+    Returns the groups, the index of the first row of each and the results.
+    """
+    order = np.argsort(groups, kind="stable")
+    groups, truths = groups[order], truths[order]
+    starts = np.flatnonzero(np.r_[len(groups) > 0, groups[1:] != groups[:-1]])
+    sizes = np.diff(np.r_[starts, len(groups)])
+    result = truths[starts]
+    for rank in range(1, int(sizes.max(initial=1))):
+        more = sizes > rank
+        result[more] = function(result[more], truths[starts[more] + rank])
+    return groups[starts], order[starts], result
+
+
+def _join(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """All index pairs `(i, j)` with `a[i] == b[j]`"""
+    order = np.argsort(b, kind="stable")
+    lo = np.searchsorted(b[order], a, "left")
+    counts = np.searchsorted(b[order], a, "right") - lo
+    i = np.repeat(np.arange(len(a)), counts)
+    ends = np.cumsum(counts)
+    positions = np.arange(ends[-1] if len(ends) else 0) + np.repeat(
+        lo - ends + counts, counts
+    )
+    return i, order[positions]
+
+
+# The premises `(i, j)` of a syllogism share an end of `i` and an end of `j`,
+# the conclusion goes from an end of `j` to an end of `i`
+_SYLLOGISMS = {
+    deduction: ("tail", "head", "tail", "head"),
+    induction: ("tail", "tail", "head", "head"),
+    abduction: ("head", "head", "tail", "tail"),
+}
+
+
+def apply_truth_function(
+    c: ICWComplex,
+    function: Callable[[np.ndarray, np.ndarray], np.ndarray] = revision,
+    label: str = "is",
+) -> List[ICell]:
+    """
+    Applies a truth-value function to all `label` edges of `c` at once.
+
+    `revision`, `choice` and any other function fold the truth values of
+    parallel edges, those with the same tail and head, into the oldest of
+    them and delete the others.
+
+    `deduction`, `induction` and `abduction` derive an edge from each pair
+    of edges chained through, or sharing the tail of, or sharing the head
+    of, a concept. Conclusions with the same ends are revised together and
+    with the existing edge, if any, otherwise the edge is created. Premises
+    are not recorded, so applying a function again counts them again.
+
+    Truth values are read and written in one batch. Returns the edges that
+    got a new truth value.
+    """
+    edges = [
+        x for x in c.get_cells_by_label(label, dimension=1) if len(x.boundary) == 2
+    ]
+    edges.sort(key=c.position_of)
+    nodes: Dict[ICell, int] = {}
+    tails = np.fromiter(
+        (nodes.setdefault(x.boundary[0], len(nodes)) for x in edges), np.int64
+    )
+    heads = np.fromiter(
+        (nodes.setdefault(x.boundary[1], len(nodes)) for x in edges), np.int64
+    )
+    truths = _truths(c, edges)
+    keys = tails * len(nodes) + heads
+
+    if function not in _SYLLOGISMS:
+        groups, firsts, folded = _fold(function, keys, truths)
+        c.set_embeddings([edges[i] for i in firsts.tolist()], folded)
+        survivors = set(firsts.tolist())
+        c.delete_cells([x for i, x in enumerate(edges) if i not in survivors])
+        return [edges[i] for i in firsts.tolist()]
+
+    ends = {"tail": tails, "head": heads}
+    shared_i, shared_j, tail_of_j, head_of_i = _SYLLOGISMS[function]
+    i, j = _join(ends[shared_i], ends[shared_j])
+    conclusion_tails, conclusion_heads = ends[tail_of_j][j], ends[head_of_i][i]
+    valid = (i != j) & (conclusion_tails != conclusion_heads)
+    groups, _, folded = _fold(
+        revision,
+        conclusion_tails[valid] * len(nodes) + conclusion_heads[valid],
+        function(truths[i[valid]], truths[j[valid]]),
+    )
+
+    existing = {k: n for n, k in reversed(list(enumerate(keys.tolist())))}
+    updated = [existing.get(k, -1) for k in groups.tolist()]
+    known = np.array(updated, dtype=np.int64) >= 0
+    cells = [edges[n] for n in updated if n >= 0]
+    values = revision(truths[[n for n in updated if n >= 0]], folded[known])
+
+    new_ends = np.stack(divmod(groups[~known], max(len(nodes), 1)), axis=1)
+    if len(new_ends):
+        cells += c.bulk_load(
+            [label] * len(new_ends),
+            np.arange(0, 2 * len(new_ends) + 1, 2),
+            -new_ends.ravel() - 1,
+            existing=list(nodes),
+        )
+        values = np.concatenate([values, folded[~known]])
+    c.set_embeddings(cells, values)
+    return cells
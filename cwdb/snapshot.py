@@ -0,0 +1,260 @@
+"""
+Binary snapshot format of a CW complex.
+
+A snapshot file is a header, a table of sections and the raw little-endian
+bytes of one NumPy array per section, each aligned to `ALIGNMENT` bytes so
+that it can be read, or memory mapped, without parsing.
+
+Cells are numbered `0..n-1` in creation order, which is also the order they
+are restored in, so positions survive a round trip. Boundaries are stored in
+CSR form and only point to earlier cells. Labels are interned: a cell stores
+the index of its label in a sorted table of utf-8 strings. The coboundary and
+label lookup indexes are stored as well, so that a complex can be served
+straight from the file.
+"""
+from __future__ import annotations
+
+import os
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"CWDBSNAP"
+VERSION = 1
+ALIGNMENT = 64
+
+_HEADER = struct.Struct("<8sII")  # magic, version, number of sections
+_SECTION = struct.Struct("<24s8sIQQQ")  # name, dtype, ndim, shape[0], shape[1], offset
+
+
+@dataclass
+class Snapshot:
+    dimensions: np.ndarray  # int8 [n]
+    label_ids: np.ndarray  # int32 [n]
+    label_offsets: np.ndarray  # int64 [n_labels + 1]
+    label_bytes: np.ndarray  # uint8, utf-8 labels one after another
+    deleted: np.ndarray  # bool [n]
+    boundary_offsets: np.ndarray  # int64 [n + 1]
+    boundary_indices: np.ndarray  # int64
+    atom_links: np.ndarray  # int64 [k, 2], (expansion, atom) pairs
+    # a complex with an embedding store has one matrix per dimension
+    # and the row of each cell in the matrix of its dimension...
+    embedding_width: Optional[int] = None
+    embedding_dtype: Optional[np.dtype] = None
+    embedding_matrices: Optional[Dict[int, np.ndarray]] = None
+    embedding_rows: Optional[np.ndarray] = None
+    # ...any other complex has one embedding of any size per cell, in CSR form
+    embedding_offsets: Optional[np.ndarray] = None
+    embedding_values: Optional[np.ndarray] = None
+    # cells grouped by boundary element and by label id, see `build_indexes`
+    coboundary_offsets: Optional[np.ndarray] = None
+    coboundary_indices: Optional[np.ndarray] = None
+    label_index_offsets: Optional[np.ndarray] = None
+    label_index_cells: Optional[np.ndarray] = None
+    # number of the journal that continues this snapshot, see `cwdb.journal`
+    generation: int = 0
+
+    def __len__(self) -> int:
+        return len(self.dimensions)
+
+    @property
+    def labels(self) -> List[str]:
+        data = self.label_bytes.tobytes()
+        offsets = self.label_offsets.tolist()
+        return [
+            data[start:end].decode("utf-8")
+            for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+
+    def build_indexes(self):
+        n = len(self)
+        owners = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.boundary_offsets))
+        self.coboundary_offsets, self.coboundary_indices = group(
+            self.boundary_indices, owners, n_keys=n
+        )
+        self.label_index_offsets, self.label_index_cells = group(
+            self.label_ids,
+            np.arange(n, dtype=np.int64),
+            n_keys=len(self.label_offsets) - 1,
+        )
+
+    def _sections(self) -> Dict[str, np.ndarray]:
+        sections = {
+            "dimensions": self.dimensions,
+            "label_ids": self.label_ids,
+            "label_offsets": self.label_offsets,
+            "label_bytes": self.label_bytes,
+            "deleted": self.deleted,
+            "boundary_offsets": self.boundary_offsets,
+            "boundary_indices": self.boundary_indices,
+            "atom_links": self.atom_links,
+        }
+        if self.embedding_width is not None:
+            assert self.embedding_matrices is not None
+            assert self.embedding_rows is not None
+            # an empty matrix that only records the width and dtype
+            sections["embedding_spec"] = np.empty(
+                (0, self.embedding_width), dtype=self.embedding_dtype
+            )
+            sections["embedding_rows"] = self.embedding_rows
+            for dimension, matrix in self.embedding_matrices.items():
+                sections[f"embeddings.{dimension}"] = matrix
+        if self.embedding_offsets is not None:
+            assert self.embedding_values is not None
+            sections["embedding_offsets"] = self.embedding_offsets
+            sections["embedding_values"] = self.embedding_values
+        for name in _INDEXES:
+            if getattr(self, name) is not None:
+                sections[name] = getattr(self, name)
+        if self.generation:
+            sections["generation"] = np.array([self.generation], dtype=np.uint64)
+        return sections
+
+    @classmethod
+    def _from_sections(cls, sections: Dict[str, np.ndarray]) -> Snapshot:
+        matrices = {
+            int(name.split(".")[1]): array
+            for name, array in sections.items()
+            if name.startswith("embeddings.")
+        }
+        spec = sections.get("embedding_spec")
+        generation = sections.get("generation")
+        return cls(
+            dimensions=sections["dimensions"],
+            label_ids=sections["label_ids"],
+            label_offsets=sections["label_offsets"],
+            label_bytes=sections["label_bytes"],
+            deleted=sections["deleted"],
+            boundary_offsets=sections["boundary_offsets"],
+            boundary_indices=sections["boundary_indices"],
+            atom_links=sections["atom_links"],
+            embedding_width=None if spec is None else spec.shape[1],
+            embedding_dtype=None if spec is None else spec.dtype,
+            embedding_matrices=None if spec is None else matrices,
+            embedding_rows=sections.get("embedding_rows"),
+            embedding_offsets=sections.get("embedding_offsets"),
+            embedding_values=sections.get("embedding_values"),
+            **{name: sections.get(name) for name in _INDEXES},
+            generation=0 if generation is None else int(generation[0]),
+        )
+
+
+_INDEXES = (
+    "coboundary_offsets",
+    "coboundary_indices",
+    "label_index_offsets",
+    "label_index_cells",
+)
+
+
+def encode_labels(
+    labels: List[str], label_ids: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    `label_offsets` and `label_bytes` of the sorted label table, and
+    `label_ids` renumbered to match it
+    """
+    order = sorted(range(len(labels)), key=labels.__getitem__)
+    encoded = [labels[i].encode("utf-8") for i in order]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(x) for x in encoded], out=offsets[1:])
+    new_ids = np.empty(len(labels), dtype=np.int32)
+    new_ids[order] = np.arange(len(labels), dtype=np.int32)
+    label_bytes = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return offsets, label_bytes, new_ids[label_ids]
+
+
+def check_embedding(embedding) -> np.ndarray:
+    """
+    `embedding` as an array, if a snapshot without an embedding store can
+    restore it unchanged: such snapshots keep 1-D float64 embeddings only
+    """
+    result = np.asarray(embedding)
+    if result.ndim != 1 or result.dtype != np.float64:
+        raise ValueError(
+            f"Cannot save a {result.dtype} embedding of shape {result.shape}: "
+            "without an embedding store only 1-D float64 embeddings are saved"
+        )
+    return result
+
+
+def group(
+    keys: np.ndarray, values: np.ndarray, n_keys: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """CSR of `values` grouped by `keys`, each group in its original order"""
+    order = np.argsort(keys, kind="stable")
+    offsets = np.zeros(n_keys + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n_keys), out=offsets[1:])
+    return offsets, values[order].astype(np.int64)
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_snapshot(path, snapshot: Snapshot):
+    if snapshot.coboundary_offsets is None or snapshot.label_index_offsets is None:
+        snapshot.build_indexes()
+    sections = {
+        name: np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+        for name, array in snapshot._sections().items()
+    }
+    offset = _aligned(_HEADER.size + _SECTION.size * len(sections))
+    table = []
+    for name, array in sections.items():
+        if array.ndim > 2:
+            raise ValueError(f"Section '{name}' has more than 2 dimensions")
+        shape = tuple(array.shape) + (0,) * (2 - array.ndim)
+        table.append(
+            _SECTION.pack(
+                name.encode("ascii"),
+                array.dtype.str.encode("ascii"),
+                array.ndim,
+                *shape,
+                offset,
+            )
+        )
+        offset = _aligned(offset + array.nbytes)
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(sections)))
+        f.write(b"".join(table))
+        for array in sections.values():
+            _pad(f)
+            f.write(array.reshape(-1).view(np.uint8).data)
+        _pad(f)
+
+
+def _pad(f: BinaryIO):
+    position = f.tell()
+    f.write(b"\0" * (_aligned(position) - position))
+
+
+def read_snapshot(path) -> Snapshot:
+    """Reads the whole file at once, sections are views into that buffer"""
+    with open(path, "rb") as f:
+        buffer = bytearray(os.fstat(f.fileno()).st_size)
+        f.readinto(buffer)
+    return parse_snapshot(buffer)
+
+
+def parse_snapshot(buffer) -> Snapshot:
+    """Snapshot whose arrays are zero-copy views of `buffer`"""
+    magic, version, n_sections = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a cwdb snapshot")
+    if version != VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}")
+    sections = {}
+    for i in range(n_sections):
+        name, dtype, ndim, rows, cols, offset = _SECTION.unpack_from(
+            buffer, _HEADER.size + i * _SECTION.size
+        )
+        shape = (rows, cols)[:ndim]
+        dtype = np.dtype(dtype.rstrip(b"\0").decode("ascii"))
+        count = int(np.prod(shape, dtype=np.int64))
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+        sections[name.rstrip(b"\0").decode("ascii")] = array.reshape(shape)
+    return Snapshot._from_sections(sections)
@@ -57,14 +57,7 @@ class Instance(Generic[T]):
         self.cell: ICell = cell
 
     def is_instance_of(self, type_: Type, *, context: ICWComplex) -> bool:
-        for link in self.cell.coboundary(context):
-            if (
-                link.dimension == 1
-                and link.label == "io"
-                and link.boundary[1] == type_.cell
-            ):
-                return True
-        return False
+        return type_.cell in context.neighbors(self.cell, "io")
 
     def __eq__(self, other: object):
         if not isinstance(other, Instance):
@@ -38,10 +38,9 @@ class EntityInstance(Instance[EntityType]):
 
     def aspects(self, *, context: ICWComplex) -> List[AspectInstance]:
         cwc_aspects = []
-        for link in self.cell.coboundary(context):
-            if link.label == "possess":
-                assert link.boundary[0] == self.cell
-                cwc_aspects.append(AspectInstance(link.boundary[1], self.task_type))
+        assert not context.in_edges(self.cell, "possess")
+        for link in context.out_edges(self.cell, "possess"):
+            cwc_aspects.append(AspectInstance(link.boundary[1], self.task_type))
         return cwc_aspects
 
     def declare_aspect(self, aspect: AspectInstance, *, context: ICWComplex) -> ICell:
@@ -94,12 +93,9 @@ class AspectInstance(Instance[AspectType]):
 
     def getters(self, *, context: ICWComplex) -> List[GetterInstance]:
         cwc_getters: List[GetterInstance] = []
-        for link in self.cell.coboundary(context):
-            if link.label == "getter":
-                assert link.boundary[0] == self.cell
-                cwc_getters.append(
-                    GetterInstance(link.boundary[1], self, self.task_type)
-                )
+        assert not context.in_edges(self.cell, "getter")
+        for link in context.out_edges(self.cell, "getter"):
+            cwc_getters.append(GetterInstance(link.boundary[1], self, self.task_type))
         return cwc_getters
 
 
@@ -142,9 +138,12 @@ class GetterInstance(Generic[T], Instance[GetterType]):
     def find_memo(
         self, entity: EntityInstance, *, context: ICWComplex
     ) -> Optional[Instance]:
-        for link in entity.cell.coboundary(context):
-            if (link.label == "getter") and (link.boundary[1] == self.cell):
-                for cell in link.coboundary(context):
+        links = context.cofaces_containing(
+            [entity.cell, self.cell], dimension=1, label="getter"
+        )
+        for link in links:
+            if link.boundary[1] == self.cell:
+                for cell in context.cofaces_containing([link], label="memo"):
                     for link_inner in cell.boundary:
                         if link_inner.label == "value":
                             assert link_inner.boundary[0] == entity.cell
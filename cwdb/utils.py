@@ -1,48 +1,110 @@
 from __future__ import annotations
 
-from typing import Dict, Generic, Iterable, TypeVar
+import gc
+from contextlib import contextmanager
+from typing import Dict, Generic, Hashable, Iterable, Iterator, List, TypeVar
 
-T = TypeVar("T")
+import numpy as np
 
+T = TypeVar("T", bound=Hashable)
 
-class DSUImpl(Generic[T]):
-    parent: DSUImpl
-    node: T
-    size: int
-    rank: int
 
-    def __init__(self, node: T):
-        self.node = node
-        self.parent = self
-        self.size = 1
-        self.rank = 1
+class DSU(Generic[T]):
+    """
+    Disjoint set union over hashable elements.
 
-    def find(self) -> DSUImpl[T]:
-        data = self
-        while data is not data.parent:
-            data.parent = data.parent.parent
-            data = data.parent
-        return data
+    Elements are mapped to dense indices, parents and set sizes are kept in
+    NumPy int arrays. `find` compresses paths, `merge` unites by size.
+    """
 
-    @staticmethod
-    def merge(a: DSUImpl[T], b: DSUImpl[T]) -> None:
-        parent_a = a.find()
-        parent_b = b.find()
+    def __init__(self, elements: Iterable[T] = ()):
+        self._index: Dict[T, int] = {}
+        self._elements: List[T] = []
+        self._parent = np.zeros(16, dtype=np.int64)
+        self._size = np.zeros(16, dtype=np.int64)
+        for el in elements:
+            self.add(el)
 
-        if parent_a.size > parent_b.size:
-            parent_a, parent_b = parent_b, parent_a
+    def __len__(self) -> int:
+        return len(self._elements)
 
-        parent_a.parent = parent_b
-        parent_b.size += parent_a.size
-        parent_a.rank = max(parent_a.rank, parent_b.rank) + 1
+    def __contains__(self, el: T) -> bool:
+        return el in self._index
 
+    def add(self, el: T) -> int:
+        """Adds `el` as a singleton set unless it is already known"""
+        i = self._index.get(el)
+        if i is not None:
+            return i
+        i = len(self._elements)
+        if i == len(self._parent):
+            self._parent = np.concatenate([self._parent, np.zeros_like(self._parent)])
+            self._size = np.concatenate([self._size, np.zeros_like(self._size)])
+        self._parent[i] = i
+        self._size[i] = 1
+        self._index[el] = i
+        self._elements.append(el)
+        return i
 
-class DSU(Generic[T]):
-    def __init__(self, elements: Iterable[T] = ()):
-        self.dsu_impl: Dict[T, DSUImpl] = {el: DSUImpl(el) for el in elements}
+    def _find(self, i: int) -> int:
+        parent = self._parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while i != root:
+            next_ = parent[i]
+            parent[i] = root
+            i = next_
+        return int(root)
+
+    def find(self, a: T) -> T:
+        """Representative element of the set containing `a`"""
+        return self._elements[self._find(self._index[a])]
+
+    def merge(self, a: T, b: T) -> bool:
+        """Unites sets of `a` and `b`, returns False if they were already one"""
+        root_a = self._find(self._index[a])
+        root_b = self._find(self._index[b])
+        if root_a == root_b:
+            return False
+        if self._size[root_a] > self._size[root_b]:
+            root_a, root_b = root_b, root_a
+        self._parent[root_a] = root_b
+        self._size[root_b] += self._size[root_a]
+        return True
+
+    def same(self, a: T, b: T) -> bool:
+        return self._find(self._index[a]) == self._find(self._index[b])
+
+    def roots(self) -> np.ndarray:
+        """Root index of every element, with all paths compressed at once"""
+        n = len(self._elements)
+        parent = self._parent[:n]
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                return parent.copy()
+            parent[:] = grandparent
+
+    def groups(self) -> List[List[T]]:
+        if not self._elements:
+            return []
+        roots = self.roots()
+        order = np.argsort(roots, kind="stable")
+        bounds = np.flatnonzero(np.diff(roots[order])) + 1
+        return [[self._elements[i] for i in group] for group in np.split(order, bounds)]
 
-    def find(self, a: T) -> DSUImpl[T]:
-        return self.dsu_impl[a].find()
 
-    def merge(self, a: T, b: T):
-        DSUImpl.merge(self.dsu_impl[a], self.dsu_impl[b])
+@contextmanager
+def gc_paused() -> Iterator[None]:
+    """
+    Suspends the cyclic garbage collector, which otherwise rescans the
+    growing heap again and again while millions of cells are allocated
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
@@ -7,7 +7,7 @@ from cwdb.rules import *
 
 
 def main():
-    c = CWComplex()
+    c = CWComplex(embedding_size=2)
 
     robin = c.create_cell("robin")
     bird = c.create_cell("bird")
@@ -27,15 +27,13 @@ def main():
     c.create_cell("is", [vertebrate, animal])
     c.create_cell("is", [water, liquid])
 
-    c.build_coboundary()
-    for e in c.layers[1]:
-        x, y = e.boundary[:2]
-        e.data.embedding = np.array(get_truth_value(x, y))
+    edges = list(c.get_layer_cells(1))
+    c.set_embeddings(
+        edges, np.array([get_truth_value(*e.boundary[:2], c) for e in edges])
+    )
 
     is_2_dup = c.create_cell("is", [bird, vertebrate])
-    is_2_dup.data.embedding = np.array([0.5, 0.8])
-
-    c.build_coboundary()
+    is_2_dup.embedding = np.array([0.5, 0.8])
 
     query_boundary("is", [robin, bird])
 
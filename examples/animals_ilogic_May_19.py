@@ -23,8 +23,6 @@ def main():
     c.create_cell("is", [vertebrate, animal])
     c.create_cell("is", [water, liquid])
 
-    c.build_coboundary()
-
     print(get_truth_value(robin, animal, 10))
 
     print(get_truth_value(water, robin, 10))
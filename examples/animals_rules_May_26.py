@@ -1,5 +1,5 @@
 from cwdb import Cell, CWComplex, to_lang_representation
-from cwdb.rules import apply_rule
+from cwdb.rules import apply_rule, match_rule
 
 
 def define_rule(c: CWComplex) -> Cell:
@@ -28,7 +28,7 @@ def define_rule(c: CWComplex) -> Cell:
     _2 = c.create_cell("pattern_scaffold", [Rule, P2])
     _3 = c.create_cell("pattern_scaffold", [Rule, C])
 
-    Pattern = c.create_cell("pattern", [_1, _2, _3, P1, P2, C, is_1, is_2])
+    Pattern = c.create_cell("pattern", [_1, _2, _3, is_1, is_2])
 
     _4 = c.create_cell("product_scaffold", [Rule, r_P1])
     _5 = c.create_cell("product_scaffold", [Rule, r_P2])
@@ -58,12 +58,12 @@ def define_rule_2(c: CWComplex) -> Cell:
 
     _1 = c.create_cell("pattern_scaffold", [Rule, P1])
 
-    Pattern = c.create_cell("pattern", [_1, P1])
+    Pattern = c.create_cell("pattern", [_1])
 
     _4 = c.create_cell("product_scaffold", [Rule, r_P1])
     _5 = c.create_cell("product_scaffold", [Rule, r_P2])
 
-    Product = c.create_cell("product", [_4, _5, r_P2, r_produced])
+    Product = c.create_cell("product", [_4, _5, r_produced])
 
     return Rule
 
@@ -81,7 +81,7 @@ def define_rule_3(c: CWComplex) -> Cell:
     _1 = c.create_cell("pattern_scaffold", [Rule, P1])
     _2 = c.create_cell("pattern_scaffold", [Rule, P2])
 
-    Pattern = c.create_cell("pattern", [_1, _2, P1, P2, produced])
+    Pattern = c.create_cell("pattern", [_1, _2, produced])
 
     _5 = c.create_cell("product_scaffold", [Rule, r_P1])
 
@@ -126,10 +126,9 @@ def main():
 
     Rule = define_rule(c)
 
-    c.build_coboundary()
-
     lang_repr_1_before = to_lang_representation(c)
-    apply_rule(c, Rule, [robin, bird, vertebrate, is_1, is_2])
+    for match in list(match_rule(c, Rule)):
+        apply_rule(c, Rule, match)
     lang_repr_1_after = to_lang_representation(c)
 
     print("Rule 1 application:")
@@ -138,7 +137,6 @@ def main():
     print()
 
     Rule2 = define_rule_2(c)
-    c.build_coboundary()
 
     lang_repr_2_before = to_lang_representation(c)
     apply_rule(c, Rule2, [robin])
@@ -150,11 +148,10 @@ def main():
     print()
 
     Rule2_inv = define_rule_3(c)
-    c.build_coboundary()
 
     Foo, produced = [
         (prod.boundary[1], prod)
-        for prod in robin.coboundary
+        for prod in robin.coboundary(c)
         if prod.label == "produced"
     ][0]
 
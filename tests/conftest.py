@@ -0,0 +1,8 @@
+import pytest
+
+from cwdb import CompactCWComplex, CWComplex
+
+
+@pytest.fixture(params=[CWComplex, CompactCWComplex])
+def complex_cls(request):
+    return request.param
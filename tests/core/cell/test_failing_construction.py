@@ -35,3 +35,20 @@ def test_redundant_boundary_raises():
 
     with pytest.raises(RuntimeError, match="'a' is contained in 'ab'"):
         Cell.from_boundary("x", [a, ab])
+
+
+def test_redundant_boundary_raises_with_memoized_closures():
+    a = Cell.from_label("a")
+    b = Cell.from_label("b")
+    c = Cell.from_label("c")
+    ab = Cell.from_boundary("ab", [a, b])
+    bc = Cell.from_boundary("bc", [b, c])
+    abc = Cell.from_boundary("abc", [ab, bc])
+
+    closures = {}
+    Cell.check_boundary_is_minimal([ab, bc], closures)
+    with pytest.raises(RuntimeError, match="'bc' is contained in 'abc'"):
+        Cell.check_boundary_is_minimal([bc, abc], closures)
+    with pytest.raises(RuntimeError, match="'c' is contained in 'abc'"):
+        Cell.check_boundary_is_minimal([abc, c], closures)
+    assert closures[abc.id] == {ab.id, bc.id, a.id, b.id, c.id}
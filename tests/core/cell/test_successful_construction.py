@@ -60,3 +60,42 @@ def test_wrappers_are_allowed():
         assert len(wrapper.boundary) == 1
         assert wrapper.dimension == i
         cell = wrapper
+
+
+def test_zero_cell_skeleton_is_computed_lazily():
+    a = Cell.from_label("a")
+    b = Cell.from_label("b")
+    c = Cell.from_label("c")
+    ab = Cell.from_boundary("ab", [a, b])
+    bc = Cell.from_boundary("bc", [b, c])
+    abc = Cell.from_boundary("abc", [ab, bc])
+
+    assert ab.data.zero_cells is None
+    assert abc.data.zero_cells is None
+    assert abc.zero_cells == {a, b, c}
+    assert ab.data.zero_cells is None
+
+    abc.boundary = [ab]
+    assert abc.zero_cells == {a, b}
+
+
+def test_shared_faces_are_checked_once():
+    # every level has two cells over both cells of the previous level, so
+    # the number of paths down from the top grows as 2 ** depth
+    left = Cell.from_label("a")
+    right = Cell.from_boundary("ab", [left, Cell.from_label("b")])
+    left = Cell.from_boundary("ab_2", [left, right.boundary[1]])
+    for i in range(100):
+        left, right = (
+            Cell.from_boundary(f"l{i}", [left, right]),
+            Cell.from_boundary(f"r{i}", [left, right]),
+        )
+    assert left.dimension == 101
+
+
+def test_deep_wrappers_do_not_hit_recursion_limit():
+    cell = Cell.from_label("cell")
+    for i in range(5000):
+        cell = Cell.from_boundary(f"wrapper_{i}", [cell])
+    assert cell.dimension == 5000
+    assert len(cell.zero_cells) == 1
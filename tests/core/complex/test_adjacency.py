@@ -0,0 +1,68 @@
+import pytest
+
+from cwdb import MappedCWComplex
+
+
+def test_edges_by_label_and_direction(complex_cls):
+    cw = complex_cls()
+    tom, cat, animal, pet = (cw.create_cell(x) for x in ("Tom", "cat", "animal", "pet"))
+    tom_cat = cw.link(tom, cat, "io", oriented=True)
+    cat_animal = cw.link(cat, animal, "is", oriented=True)
+    cat_pet = cw.link(cat, pet, "is", oriented=True)
+    cw.create_cell("both", [cat_animal, cat_pet])
+
+    assert cw.out_edges(cat, "is") == {cat_animal, cat_pet}
+    assert cw.out_edges(cat, "io") == set()
+    assert cw.out_edges(cat) == {cat_animal, cat_pet}
+    assert cw.in_edges(cat, "io") == {tom_cat}
+    assert cw.in_edges(cat) == {tom_cat}
+    assert cw.out_edges(cat, "missing") == set()
+    assert cw.neighbors(cat, "is") == {animal, pet}
+    assert cw.neighbors(cat, direction="in") == {tom}
+    with pytest.raises(ValueError):
+        cw.neighbors(cat, direction="up")
+
+    # the index follows new edges, relabelling and deletion
+    tom_pet = cw.link(tom, pet, "io", oriented=True)
+    assert cw.in_edges(pet, "io") == {tom_pet}
+    cat_pet.label = "was"
+    assert cw.out_edges(cat, "is") == {cat_animal}
+    assert cw.out_edges(cat, "was") == {cat_pet}
+    cw.delete_cell(animal)
+    assert cw.out_edges(cat) == {cat_pet}
+    assert cw.neighbors(cat, "is") == set()
+
+
+def test_edges_after_bulk_load_and_compact(complex_cls):
+    cw = complex_cls()
+    hub = cw.create_cell("hub")
+    assert cw.out_edges(hub) == set()
+    n = 5000
+    cells = cw.bulk_load(
+        [str(i) for i in range(n)] + ["spoke"] * n,
+        [0] * (n + 1) + list(range(2, 2 * n + 1, 2)),
+        [x for i in range(n) for x in (-1, i)],
+        existing=[hub],
+    )
+    spokes = set(cells[n:])
+    assert cw.out_edges(hub, "spoke") == spokes
+    assert cw.neighbors(cells[0], "spoke", direction="in") == {hub}
+
+    cw.delete_cell(cells[0])
+    position = cw.position_of(hub)
+    hub = cw.cell(int(cw.compact()[position]))
+    assert len(cw.out_edges(hub, "spoke")) == n - 1
+
+
+def test_edges_of_mapped_complex(complex_cls, tmp_path):
+    cw = complex_cls()
+    a, b, c = (cw.create_cell(x) for x in "abc")
+    cw.link(a, b, "x", oriented=True)
+    cw.link(a, c, "y", oriented=True)
+    cw.save(tmp_path / "kb.cwdb")
+
+    mapped = MappedCWComplex(tmp_path / "kb.cwdb")
+    a, b, c = (mapped.cell(i) for i in range(3))
+    assert mapped.neighbors(a, "y") == {c}
+    assert mapped.neighbors(a) == {b, c}
+    assert mapped.neighbors(b, direction="in") == {a}
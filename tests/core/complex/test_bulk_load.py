@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+
+def test_bulk_load_facts(complex_cls):
+    cw = complex_cls()
+    a, b = cw.create_cell("a"), cw.create_cell("b")
+
+    # c, a-is-c, c-is-b, (a-is-c, c-is-b)
+    cells = cw.bulk_load(
+        ["c", "is", "is", "ab"],
+        boundary_offsets=[0, 0, 2, 4, 6],
+        boundary_indices=[-1, 0, 0, -2, 1, 2],
+        existing=[a, b],
+        atom_links=[[3, 0]],
+    )
+    c, ac, cb, abc = cells
+
+    assert [x.dimension for x in cells] == [0, 1, 1, 2]
+    assert ac.boundary == (a, c)
+    assert set(abc.boundary) == {ac, cb}
+    assert cw.find_link(a, c, "is", oriented=True) == ac
+    assert cw.get_coboundary_of(c) == {ac, cb}
+    assert cw.get_cells_by_label("is") == {ac, cb}
+    assert cw.get_atoms_of(abc) == {c}
+    assert abc.zero_cells == {a, b, c}
+    assert cw.link(c, b, "is", oriented=True) == cb
+
+
+def test_bulk_load_matches_create_cell(complex_cls):
+    n = 50
+    labels = [f"n{i}" for i in range(n)] + ["is"] * (n - 1)
+    indices = np.stack([np.arange(n - 1), np.arange(1, n)], axis=1).ravel()
+    offsets = np.concatenate([np.zeros(n + 1), 2 * np.arange(1, n)])
+
+    bulk = complex_cls().bulk_load(labels, offsets, indices)
+    cw = complex_cls()
+    nodes = [cw.create_cell(label) for label in labels[:n]]
+    links = [cw.link(x, y, "is") for x, y in zip(nodes, nodes[1:])]
+
+    assert [x.label for x in bulk] == [x.label for x in nodes + links]
+    assert [x.dimension for x in bulk] == [x.dimension for x in nodes + links]
+
+
+def test_bulk_load_validates(complex_cls):
+    cw = complex_cls()
+    a, b, c = (cw.create_cell(x) for x in "abc")
+
+    with pytest.raises(ValueError):
+        cw.bulk_load(["x", "y"], [0, 1, 1], [1])
+    with pytest.raises(ValueError):
+        cw.bulk_load(["x"], [0, 1], [-4], existing=[a, b, c])
+    with pytest.raises(ValueError):
+        cw.bulk_load(["x"], [0, 2], [-1, -2], existing=[a, b], dimensions=[2])
+    with pytest.raises(RuntimeError):
+        cw.bulk_load(["x"], [0, 3], [-1, -2, -3], existing=[a, b, c])
+    with pytest.raises(RuntimeError, match="not minimal"):
+        cw.bulk_load(
+            ["ab", "bc", "x", "y"],
+            [0, 2, 4, 6, 8],
+            [-1, -2, -2, -3, 0, 1, 2, 0],
+            existing=[a, b, c],
+        )
+    assert len(cw.get_cells_by_label("ab")) == 0
+    assert cw.get_coboundary_of(a) == set()
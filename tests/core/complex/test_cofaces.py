@@ -0,0 +1,48 @@
+import pytest
+
+from cwdb import CWComplex
+from cwdb.patched_context import PatchedContext
+
+
+def test_cofaces_containing(complex_cls):
+    cw = complex_cls()
+    a, b, c = (cw.create_cell(x) for x in "abc")
+    ab, ab2, ba = cw.link(a, b, "is"), cw.create_cell("has", [a, b]), cw.link(b, a)
+    ac = cw.link(a, c, "is")
+    abab = cw.create_cell("pair", [ab, ab2])
+
+    assert cw.cofaces_containing([a, b]) == {ab, ab2, ba}
+    assert cw.cofaces_containing([b, a], label="is") == {ab}
+    assert cw.cofaces_containing([a], dimension=1, label="is") == {ab, ac}
+    assert cw.cofaces_containing([a, b, c]) == set()
+    assert cw.cofaces_containing([a], dimension=2) == set()
+    assert cw.cofaces_containing([ab, ab2]) == {abab}
+    assert cw.cofaces_containing([a, b], label="missing") == set()
+
+    cw.delete_cell(ab2)
+    assert cw.cofaces_containing([a, b]) == {ab, ba}
+    with pytest.raises(ValueError):
+        cw.cofaces_containing([])
+
+
+def test_cofaces_containing_across_index_rebuilds(complex_cls):
+    cw = complex_cls()
+    hub, other = cw.create_cell("hub"), cw.create_cell("other")
+    shared = []
+    for i in range(6000):
+        x = cw.create_cell(str(i))
+        cw.link(hub, x)
+        if i % 7 == 0:
+            shared.append(cw.create_cell("parallel", [hub, other]))
+    assert cw.cofaces_containing([hub, other]) == set(shared)
+    assert cw.cofaces_containing([other, hub], label="parallel") == set(shared)
+
+
+def test_cofaces_containing_in_patched_context():
+    base = CWComplex()
+    a, b = base.create_cell("a"), base.create_cell("b")
+    ab = base.link(a, b)
+    patch = CWComplex()
+    context = PatchedContext(patch, base)
+    ab2 = context.create_cell("ab2", [a, b])
+    assert context.cofaces_containing([a, b]) == {ab, ab2}
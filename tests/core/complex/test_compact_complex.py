@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+
+from cwdb import CompactCWComplex, CWComplex
+from cwdb.tts import TaskTypeSystem
+
+
+def test_create_cells():
+    cw = CompactCWComplex(capacity=1)
+    a = cw.create_cell("a")
+    b = cw.create_cell("b")
+    ab = cw.create_cell("ab", [a, b])
+
+    assert (a.id, b.id, ab.id) == (0, 1, 2)
+    assert len(cw) == 3
+    assert cw.get_layer_cells(0) == {a, b}
+    assert cw.get_layer_cells(1) == {ab}
+    assert ab.dimension == 1
+    assert ab.boundary == (a, b)
+    assert ab.zero_cells == {a, b}
+    assert cw.cell(ab.id) == ab
+
+
+def test_construction_checks():
+    cw = CompactCWComplex()
+    a = cw.create_cell("a")
+    b = cw.create_cell("b")
+    ab = cw.create_cell("ab", [a, b])
+
+    with pytest.raises(RuntimeError, match="'a' is contained in 'ab'"):
+        cw.create_cell("x", [ab, a])
+
+    c = cw.create_cell("c")
+    d = cw.create_cell("d")
+    cd = cw.create_cell("cd", [c, d])
+    with pytest.raises(RuntimeError):
+        cw.create_cell("x", [ab, cd])
+
+    with pytest.raises(ValueError):
+        cw.create_cell("x", [a, CWComplex().create_cell("y")])
+
+
+def test_links_and_labels():
+    cw = CompactCWComplex()
+    a = cw.create_cell("a")
+    b = cw.create_cell("b")
+    ab = cw.link(a, b)
+    assert cw.link(b, a) == ab
+    assert cw.link(b, a, oriented=True) != ab
+    assert cw.find_link(a, b, label="x") is None
+
+    assert cw["a"] == a
+    assert cw.get_cells_by_label("") == {ab, cw.link(b, a, oriented=True)}
+    a.label = "c"
+    assert not cw.has_label("a")
+    assert cw["c"] == a
+
+
+def test_coboundary_and_deleted_flag():
+    cw = CompactCWComplex()
+    a = cw.create_cell("a")
+    b = cw.create_cell("b")
+    c = cw.create_cell("c")
+    ab = cw.link(a, b)
+    bc = cw.link(b, c)
+    abc = cw.create_cell("abc", [ab, bc])
+
+    assert b.coboundary(cw) == {ab, bc}
+    assert ab.coboundary(cw) == {abc}
+
+    ab.data.deleted = True
+    assert ab.label == "[DELETED] "
+    assert b.coboundary(cw) == {bc}
+
+
+def test_data_view():
+    cw = CompactCWComplex()
+    a = cw.create_cell("a")
+    assert len(a.embedding) == 0
+    a.data.embedding = np.array([0.5, 0.9])
+    assert list(a.embedding) == [0.5, 0.9]
+    a.data.task_implementation = print
+    assert a.data.task_implementation is print
+
+
+def test_type_system_on_compact_complex():
+    cw = CompactCWComplex()
+    tts = TaskTypeSystem.from_empty_context(cw)
+    human = tts.Entity.create_child("Human")
+    alice = human.create(name="Alice")
+
+    assert alice.is_instance_of(human, context=cw)
+    assert not alice.is_instance_of(tts.Int, context=cw)
+
+
+def test_indexes_survive_rebuilds():
+    cw = CompactCWComplex()
+    hub = cw.create_cell("hub")
+    spokes = []
+    for i in range(10000):
+        spoke = cw.link(hub, cw.create_cell(str(i)), "spoke", oriented=True)
+        spokes.append(spoke)
+        if i % 3000 == 0:
+            assert len(hub.coboundary(cw)) == i + 1
+
+    assert hub.coboundary(cw) == set(spokes)
+    assert cw["9999"].coboundary(cw) == {spokes[-1]}
+    assert len(cw.get_cells_by_label("spoke", dimension=1)) == 10000
+
+
+def test_relabel_keeps_indexes_in_place():
+    cw = CompactCWComplex()
+    hub = cw.create_cell("hub")
+    leaves = [cw.create_cell(str(i)) for i in range(6)]
+    edges = [cw.link(hub, leaf, "spoke", oriented=True) for leaf in leaves[:3]]
+    assert cw.out_edges(hub, "spoke") == set(edges)
+    label_index, edge_index = cw._label_index, cw._edge_index
+    edges += [cw.link(hub, leaf, "spoke", oriented=True) for leaf in leaves[3:]]
+
+    for edge in edges[::2]:
+        edge.label = "rim"
+    edges[0].label = "spoke"
+    edges[0].label = "rim"
+    edges[1].label = "spoke"
+
+    assert cw._label_index is label_index and cw._edge_index is edge_index
+    assert cw.get_cells_by_label("rim") == set(edges[::2])
+    assert cw.get_cells_by_label("spoke") == set(edges[1::2])
+    assert cw.out_edges(hub, "rim") == set(edges[::2])
+    assert cw.out_edges(hub) == set(edges)
+    assert cw.in_edges(leaves[4], "rim") == {edges[4]}
+    assert cw.find_link(hub, leaves[3], "spoke") == edges[3]
+    assert cw.find_link(hub, leaves[2], "spoke") is None
@@ -100,11 +100,141 @@ def test_coboundary():
     assert c.coboundary(cw) == set()
 
 
-@pytest.mark.skip(reason="Cell deletion is not implemented at complex level")
 def test_zero_cell_deletion():
-    pass
+    cw = CWComplex()
+    a = cw.create_cell("a")
+    b = cw.create_cell("b")
+    c = cw.create_cell("c")
+    ab = cw.link(a, b)
+    bc = cw.link(b, c)
+    abc = cw.create_cell("abc", [ab, bc])
+
+    cw.delete_cell(a)
+    assert cw.get_layer_cells(0) == {b, c}
+    assert cw.get_layer_cells(1) == {bc}
+    assert cw.get_layer_cells(2) == set()
+    assert all(x.data.deleted for x in (a, ab, abc))
+    assert b.coboundary(cw) == {bc}
+    assert cw.find_link(a, b) is None
+    assert not cw.has_label("abc")
 
 
-@pytest.mark.skip(reason="Cell deletion is not implemented at complex level")
 def test_use_of_deleted_cell_raises():
-    pass
+    cw = CWComplex()
+    a = cw.create_cell("a")
+    b = cw.create_cell("b")
+    cw.delete_cell(a)
+
+    with pytest.raises(RuntimeError, match="'a' is deleted"):
+        cw.link(a, b)
+    with pytest.raises(KeyError):
+        cw.delete_cell(CWComplex().create_cell("x"))
+
+
+def test_coboundary_is_updated_incrementally():
+    cw = CWComplex()
+    a = cw.create_cell("a")
+    b = cw.create_cell("b")
+    c = cw.create_cell("c")
+    ab = cw.link(a, b)
+    assert a.coboundary(cw) == {ab}
+
+    bc = cw.link(b, c)
+    abc = cw.create_cell("abc", [ab, bc])
+    assert b.coboundary(cw) == {ab, bc}
+    assert ab.coboundary(cw) == {abc}
+    assert bc.coboundary(cw) == {abc}
+
+
+def test_coboundary_skips_deleted_cells():
+    cw = CWComplex()
+    a = cw.create_cell("a")
+    b = cw.create_cell("b")
+    ab = cw.link(a, b)
+    ab_2 = cw.link(a, b, label="x")
+
+    ab.data.deleted = True
+    assert a.coboundary(cw) == {ab_2}
+    assert ab.coboundary(cw) == set()
+
+    ab.data.deleted = False
+    assert a.coboundary(cw) == {ab, ab_2}
+
+
+def test_find_link():
+    cw = CWComplex()
+    a = cw.create_cell("a")
+    b = cw.create_cell("b")
+    assert cw.find_link(a, b) is None
+
+    ab = cw.link(a, b, label="x", oriented=True)
+    assert cw.find_link(a, b, label="x") is ab
+    assert cw.find_link(b, a, label="x") is ab
+    assert cw.find_link(b, a, label="x", oriented=True) is None
+    assert cw.find_link(a, b) is None
+
+    # Links created directly as cells are found as well
+    ba = cw.create_cell("y", [b, a])
+    assert cw.find_link(b, a, label="y", oriented=True) is ba
+    assert cw.link(a, b, label="y") is ba
+
+
+def test_get_cells_by_label():
+    cw = CWComplex()
+    a1 = cw.create_cell("a")
+    a2 = cw.create_cell("a")
+    b = cw.create_cell("b")
+    a3 = cw.link(a1, b, label="a")
+
+    assert cw.get_cells_by_label("a") == {a1, a2, a3}
+    assert cw.get_cells_by_label("a", dimension=0) == {a1, a2}
+    assert cw.get_cells_by_label("a", dimension=1) == {a3}
+    assert cw.get_cells_by_label("a", dimension=2) == set()
+    assert cw.get_cells_by_label("c") == set()
+    assert cw["b"] is b
+
+    assert cw.has_label("a")
+    assert not cw.has_label("c")
+    with pytest.raises(KeyError):
+        _ = cw["c"]
+
+
+def test_relabel_updates_label_index():
+    cw = CWComplex()
+    a = cw.create_cell("a")
+    b = cw.create_cell("b")
+    ab = cw.link(a, b, label="x")
+
+    a.label = "c"
+    assert not cw.has_label("a")
+    assert cw["c"] is a
+
+    ab.label = "y"
+    assert cw.get_cells_by_label("x") == set()
+    assert cw.find_link(a, b, label="x") is None
+    assert cw.link(a, b, label="y") is ab
+
+
+def test_connected_components():
+    cw = CWComplex()
+    a = cw.create_cell("a")
+    b = cw.create_cell("b")
+    c = cw.create_cell("c")
+    d = cw.create_cell("d")
+    ab = cw.link(a, b)
+
+    assert cw.same_component(a, b)
+    assert cw.same_component(ab, b)
+    assert not cw.same_component(a, c)
+    assert sorted(map(len, cw.components())) == [1, 1, 3]
+
+    # the index is maintained after the first use
+    cd = cw.link(c, d, label="cd")
+    assert cw.same_component(c, d)
+    with pytest.raises(RuntimeError, match="Closure is not connected 'cd'"):
+        cw.create_cell("x", [ab, cd])
+
+    bc = cw.link(b, c)
+    cw.create_cell("x", [ab, bc, cd])
+    assert cw.same_component(a, d)
+    assert len(cw.components()) == 1
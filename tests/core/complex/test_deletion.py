@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from cwdb import CompactCWComplex, CWComplex
+
+
+def test_delete_cascades_to_cofaces(complex_cls):
+    cw = complex_cls()
+    a, b, c, d = (cw.create_cell(x) for x in "abcd")
+    ab, bc, cd = cw.link(a, b), cw.link(b, c), cw.link(c, d)
+    abc = cw.create_cell("abc", [ab, bc])
+    cw.create_atom_link(abc, d)
+
+    cw.delete_cell(bc)
+    assert cw.get_layer_cells(1) == {ab, cd}
+    assert cw.get_layer_cells(2) == set()
+    assert bc not in cw and abc not in cw
+    assert abc.label == "[DELETED] abc"
+    assert cw.get_expansions_of(d) == set()
+    assert cw.get_coboundary_of(b) == {ab}
+
+    # deleting a tombstone again is a no-op
+    cw.delete_cell(abc)
+    assert cw.get_layer_cells(0) == {a, b, c, d}
+
+
+def test_delete_cells(complex_cls):
+    cw = complex_cls()
+    a, b, c, d = (cw.create_cell(x) for x in "abcd")
+    ab, bc, cd = cw.link(a, b), cw.link(b, c), cw.link(c, d)
+    abc = cw.create_cell("abc", [ab, bc])
+
+    cw.delete_cells([ab, d, abc])
+    assert cw.get_layer_cells(0) == {a, b, c}
+    assert cw.get_layer_cells(1) == {bc}
+    assert abc not in cw and cd not in cw
+    cw.delete_cells([])
+    assert len(cw.get_layer_cells(0)) == 3
+
+
+def test_delete_atom_link(complex_cls):
+    cw = complex_cls()
+    a, b, ab_atom = (cw.create_cell(x) for x in ("a", "b", "ab_atom"))
+    ab = cw.link(a, b)
+    cw.create_atom_link(ab, ab_atom)
+
+    cw.delete_atom_link(ab, ab_atom)
+    assert cw.get_atoms_of(ab) == set()
+    assert cw.get_expansions_of(ab_atom) == set()
+    with pytest.raises(KeyError):
+        cw.delete_atom_link(ab, ab_atom)
+
+
+def test_compact(complex_cls):
+    cw = complex_cls(embedding_size=2)
+    a, b, c = (cw.create_cell(x) for x in "abc")
+    cw.link(a, b, "is")
+    bc = cw.link(b, c, "is")
+    a.embedding = [1, 1]
+    c.embedding = [3, 3]
+    bc.embedding = [4, 4]
+
+    cw.delete_cell(b)
+    # a cell that was only flagged, its cofaces go with it on compaction
+    a.data.deleted = True
+    result = cw.compact()
+
+    if isinstance(cw, CompactCWComplex):
+        assert list(result) == [-1, -1, 0, -1, -1]
+        # views made before compaction point at old ids
+        assert c not in cw
+        with pytest.raises(ValueError):
+            c.label
+        with pytest.raises(ValueError):
+            cw.get_coboundary_of(c)
+        c = cw.cell(0)
+    assert cw.get_layer_cells(0) == {c}
+    assert cw.get_layer_cells(1) == set()
+    assert cw["c"] == c
+    assert not cw.has_label("is")
+    assert list(c.embedding) == [3, 3]
+    assert np.allclose(cw.get_embeddings([c]), [[3, 3]])
+
+    d = cw.create_cell("d")
+    cd = cw.link(c, d, "is")
+    assert cw.get_coboundary_of(c) == {cd}
+    assert list(d.embedding) == [0, 0]
+
+
+def test_tombstones_keep_their_embedding():
+    cw = CWComplex(embedding_size=2)
+    a = cw.create_cell("a")
+    a.embedding = [0.5, 0.9]
+    cw.delete_cell(a)
+    cw.compact()
+    assert list(a.embedding) == [0.5, 0.9]
+
+
+def test_flagged_cells_are_hidden_until_unflagged(complex_cls):
+    cw = complex_cls()
+    a, b = cw.create_cell("a"), cw.create_cell("b")
+    ab, ba = cw.link(a, b, "is"), cw.link(b, a, "was")
+    cw.create_cell("pair", [ab, ba])
+
+    ab.data.deleted = True
+    assert ab not in cw and cw.get_layer_cells(1) == {ba}
+    assert not cw.has_label("is") and cw.get_coboundary_of(a) == {ba}
+    # the cofaces of a flagged cell live until compaction
+    assert len(cw.get_layer_cells(2)) == 1
+
+    ab.data.deleted = False
+    assert ab in cw and cw.get_layer_cells(1) == {ab, ba}
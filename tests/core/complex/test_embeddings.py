@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from cwdb import CWComplex
+from cwdb.patched_context import PatchedContext
+
+
+def test_embeddings_are_rows_of_a_shared_matrix(complex_cls):
+    cw = complex_cls(embedding_size=2, embedding_dtype=np.float32)
+    a = cw.create_cell("a")
+    b = cw.create_cell("b")
+    ab = cw.link(a, b)
+
+    assert a.embedding.dtype == np.float32
+    assert list(a.embedding) == [0, 0]
+
+    a.embedding = np.array([0.5, 0.9])
+    view = b.embedding
+    view[:] = [0.1, 0.2]
+    assert np.allclose(b.embedding, [0.1, 0.2])
+    assert np.allclose(a.embedding, [0.5, 0.9])
+    assert list(ab.embedding) == [0, 0]
+
+    with pytest.raises(ValueError):
+        a.embedding = np.zeros(3)
+
+
+def test_batch_get_and_set(complex_cls):
+    cw = complex_cls(embedding_size=2)
+    cells = [cw.create_cell(str(i)) for i in range(5000)]
+    edges = [cw.link(x, y) for x, y in zip(cells, cells[1:])]
+
+    values = np.random.random((len(cells), 2))
+    cw.set_embeddings(cells, values)
+    assert np.array_equal(cw.get_embeddings(cells), values)
+    assert np.array_equal(cells[1234].embedding, values[1234])
+
+    mixed = [edges[0], cells[0], edges[1]]
+    cw.set_embeddings(mixed, np.array([[1, 1], [2, 2], [3, 3]]))
+    assert np.array_equal(cw.get_embeddings(mixed), [[1, 1], [2, 2], [3, 3]])
+
+
+def test_batch_api_without_embedding_matrix(complex_cls):
+    cw = complex_cls()
+    cells = [cw.create_cell(str(i)) for i in range(3)]
+    cw.set_embeddings(cells, np.eye(3))
+    assert np.array_equal(cw.get_embeddings(cells), np.eye(3))
+
+
+def test_batch_api_in_patched_context():
+    base = CWComplex(embedding_size=2)
+    patch = CWComplex(embedding_size=2)
+    a = base.create_cell("a")
+    b = patch.create_cell("b")
+    combo = PatchedContext(patch=patch, base=base)
+
+    combo.set_embeddings([a, b], np.array([[1, 2], [3, 4]]))
+    assert np.array_equal(a.embedding, [1, 2])
+    assert np.array_equal(combo.get_embeddings([b, a]), [[3, 4], [1, 2]])
+
+
+def test_missing_embedding_is_read_only():
+    cw = CWComplex()
+    a, b = cw.create_cell("a"), cw.create_cell("b")
+    assert a.embedding is b.embedding and not a.embedding.flags.writeable
@@ -0,0 +1,171 @@
+import os
+
+import numpy as np
+
+from cwdb import CWComplex
+from cwdb.interfaces import IComplexListener
+from cwdb.journal import Journal, checkpoint, recover
+
+
+def build(cw):
+    a, b, c, d = (cw.create_cell(x) for x in ("a", "b", "c", "d"))
+    ab, bc = cw.link(a, b, "is"), cw.link(b, c, "is", oriented=True)
+    cd = cw.link(c, d, "is")
+    abc = cw.create_cell("abc", [ab, bc])
+    cw.create_atom_link(abc, d)
+    cw.delete_cell(cd)
+    # a relabelled tombstone is journalled without its display prefix
+    cd.label = "was"
+    d.label = "e"
+    cw.set_embeddings([a, abc], [[0.5, 0.9], [0.1, 0.2]])
+
+
+def describe(cw):
+    cells = [cw.cell(i) for i in range(len(cw))]
+    return [
+        (
+            x.label,
+            [cw.position_of(b) for b in x.boundary],
+            sorted(cw.position_of(y) for y in cw.get_atoms_of(x)),
+            list(x.embedding),
+        )
+        for x in cells
+    ]
+
+
+def test_recover(complex_cls, tmp_path):
+    cw, journal = recover(
+        tmp_path / "kb.cwdb", tmp_path / "kb.jrnl", complex_cls, embedding_size=2
+    )
+    build(cw)
+    journal.close()
+
+    restored, journal = recover(
+        tmp_path / "kb.cwdb", tmp_path / "kb.jrnl", complex_cls, embedding_size=2
+    )
+    assert describe(restored) == describe(cw)
+    assert restored.get_cells_by_label("is") == {restored.cell(4), restored.cell(5)}
+    assert restored["e"] == restored.cell(3)
+
+    # the journal keeps recording after a restart
+    restored.link(restored["a"], restored["e"], "is")
+    journal.close()
+    again, _ = recover(tmp_path / "kb.cwdb", tmp_path / "kb.jrnl", complex_cls)
+    assert again.find_link(again["a"], again["e"], "is") is not None
+
+
+def test_checkpoint(complex_cls, tmp_path):
+    cw = complex_cls()
+    journal = Journal(tmp_path / "kb.jrnl")
+    journal.attach(cw)
+    build(cw)
+    checkpoint(cw, tmp_path / "kb.cwdb", journal)
+    assert os.path.getsize(tmp_path / "kb.jrnl") < 64
+
+    cw.delete_cell(cw["abc"])
+    cw.compact()
+    cw.create_cell("f", [cw["a"], cw["b"]])
+    journal.close()
+
+    restored, _ = recover(tmp_path / "kb.cwdb", tmp_path / "kb.jrnl", complex_cls)
+    assert describe(restored) == describe(cw)
+
+
+def test_flagged_cells_are_journalled_on_compact(complex_cls, tmp_path):
+    cw, journal = recover(tmp_path / "kb.cwdb", tmp_path / "kb.jrnl", complex_cls)
+    a, b = cw.create_cell("a"), cw.create_cell("b")
+    x = cw.link(a, b, "x")
+    cw.link(a, b, "y")
+    x.data.deleted = True
+    cw.compact()
+    cw.create_cell("z", [cw["a"], cw["b"]])
+    journal.close()
+
+    restored, _ = recover(tmp_path / "kb.cwdb", tmp_path / "kb.jrnl", complex_cls)
+    assert describe(restored) == describe(cw)
+    assert not restored.has_label("x")
+
+
+def test_stale_journal_is_ignored(tmp_path):
+    cw = CWComplex()
+    journal = Journal(tmp_path / "kb.jrnl")
+    journal.attach(cw)
+    build(cw)
+    journal.commit()
+    stale = (tmp_path / "kb.jrnl").read_bytes()
+    checkpoint(cw, tmp_path / "kb.cwdb", journal)
+    journal.close()
+    # a crash between writing the snapshot and starting the new journal
+    (tmp_path / "kb.jrnl").write_bytes(stale)
+
+    restored, _ = recover(tmp_path / "kb.cwdb", tmp_path / "kb.jrnl")
+    assert describe(restored) == describe(cw)
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    cw = CWComplex()
+    with Journal(tmp_path / "kb.jrnl", group_size=0) as journal:
+        journal.attach(cw)
+        a = cw.create_cell("a")
+        size = os.path.getsize(tmp_path / "kb.jrnl")
+        cw.create_cell("b")
+    with open(tmp_path / "kb.jrnl", "r+b") as f:
+        f.truncate(size + 3)
+
+    restored, journal = recover(tmp_path / "kb.cwdb", tmp_path / "kb.jrnl")
+    assert [x.label for x in restored.get_layer_cells(0)] == [a.label]
+    restored.create_cell("c")
+    journal.close()
+    again, _ = recover(tmp_path / "kb.cwdb", tmp_path / "kb.jrnl")
+    assert sorted(x.label for x in again.get_layer_cells(0)) == ["a", "c"]
+
+
+def test_group_commit(tmp_path):
+    cw = CWComplex()
+    journal = Journal(tmp_path / "kb.jrnl", group_size=1024)
+    journal.attach(cw)
+    empty = os.path.getsize(tmp_path / "kb.jrnl")
+    cw.create_cell("a")
+    assert os.path.getsize(tmp_path / "kb.jrnl") == empty
+    for i in range(100):
+        cw.create_cell(str(i))
+    assert os.path.getsize(tmp_path / "kb.jrnl") > empty
+    journal.commit()
+    restored, _ = recover(tmp_path / "kb.cwdb", tmp_path / "kb.jrnl")
+    assert len(restored) == 101
+
+
+def test_listener_events(complex_cls):
+    events = []
+
+    class Recorder(IComplexListener):
+        def cell_created(self, cell):
+            events.append(("created", cell.label))
+
+        def cell_deleted(self, cell):
+            events.append(("deleted", cell.label))
+
+    cw = complex_cls()
+    recorder = Recorder()
+    cw.subscribe(recorder)
+    a, b = cw.create_cell("a"), cw.create_cell("b")
+    cw.link(a, b, "ab")
+    cw.delete_cell(a)
+    cw.unsubscribe(recorder)
+    cw.create_cell("c")
+    assert events == [
+        ("created", "a"),
+        ("created", "b"),
+        ("created", "ab"),
+        ("deleted", "[DELETED] a"),
+        ("deleted", "[DELETED] ab"),
+    ]
+
+
+def test_embeddings_of_cells_are_recorded(tmp_path):
+    cw, journal = recover(tmp_path / "kb.cwdb", tmp_path / "kb.jrnl")
+    a = cw.create_cell("a")
+    a.embedding = np.array([1.0, 2.0, 3.0])
+    journal.close()
+    restored, _ = recover(tmp_path / "kb.cwdb", tmp_path / "kb.jrnl")
+    assert list(restored["a"].embedding) == [1.0, 2.0, 3.0]
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from cwdb import CompactCWComplex, CWComplex, MappedCWComplex
+
+
+@pytest.fixture(params=[CWComplex, CompactCWComplex])
+def snapshot_path(request, tmp_path):
+    cw = request.param(embedding_size=2)
+    a, b, c, ab_atom = (cw.create_cell(x) for x in ("b", "a", "c", "ab_atom"))
+    ab, bc = cw.link(a, b, "is", oriented=True), cw.link(b, c, "is")
+    abc = cw.create_cell("abc", [ab, bc])
+    cw.create_atom_link(ab, ab_atom)
+    cw.set_embeddings([a, abc], [[0.5, 0.9], [0.1, 0.2]])
+    cw.delete_cell(c)
+    cw.save(tmp_path / "kb.cwdb")
+    return tmp_path / "kb.cwdb"
+
+
+def test_queries(snapshot_path):
+    cw = MappedCWComplex(snapshot_path)
+    a, b, c, ab_atom, ab, bc, abc = (cw.cell(i) for i in range(7))
+    assert (a.label, b.label, abc.label) == ("b", "a", "[DELETED] abc")
+    assert cw["a"] == b
+    assert cw.get_cells_by_label("is") == {ab}
+    assert not cw.has_label("c")
+    assert not cw.has_label("zzz")
+    assert cw.get_layer_cells(0) == {a, b, ab_atom}
+    assert cw.find_link(b, a, "is") == ab
+    assert cw.find_link(b, a, "is", oriented=True) is None
+    assert cw.get_coboundary_of(b) == {ab}
+    assert ab.boundary == (a, b)
+    assert cw.get_atoms_of(ab) == {ab_atom}
+    assert cw.get_expansions_of(ab_atom) == {ab}
+    assert cw.get_expansions_of(a) == set()
+    assert list(a.embedding) == [0.5, 0.9]
+    assert np.allclose(cw.get_embeddings([a, ab]), [[0.5, 0.9], [0, 0]])
+
+
+def test_is_read_only(snapshot_path):
+    cw = MappedCWComplex(snapshot_path)
+    a, b = cw.cell(0), cw.cell(1)
+    assert cw.link(b, a, "is") == cw.cell(4)
+    with pytest.raises(NotImplementedError):
+        cw.link(a, b, "x")
+    with pytest.raises(NotImplementedError):
+        cw.delete_cell(a)
+    with pytest.raises(NotImplementedError):
+        a.label = "x"
+    with pytest.raises(NotImplementedError):
+        a.embedding = np.zeros(2)
+    with pytest.raises(NotImplementedError):
+        cw.set_embeddings([a], np.zeros((1, 2)))
+    with pytest.raises(NotImplementedError):
+        a.data.deleted = True
+    with pytest.raises(NotImplementedError):
+        cw.delete_cells([a])
+    with pytest.raises(NotImplementedError):
+        a.data.task_implementation = print
+    assert not a.embedding.flags.writeable and a in cw
+
+
+def test_can_be_saved_again(snapshot_path, tmp_path):
+    cw = MappedCWComplex(snapshot_path)
+    cw.save(tmp_path / "copy.cwdb")
+    loaded = CWComplex.load(tmp_path / "copy.cwdb")
+    assert loaded.cell(6).boundary == (loaded.cell(4), loaded.cell(5))
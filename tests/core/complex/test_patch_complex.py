@@ -37,3 +37,33 @@ def test_context_layer():
     assert len(layer_0.get_layer_cells(1)) == 1
     assert len(layer_1.get_layer_cells(1)) == 2
     assert len(combo.get_layer_cells(1)) == 3
+
+
+def test_link_reuses_base_links():
+    base = CWComplex()
+    a = base.create_cell("a")
+    b = base.create_cell("b")
+    ab = base.link(a, b, "x", oriented=True)
+
+    combo = PatchedContext(patch=CWComplex(), base=base)
+    assert combo.link(a, b, "x", oriented=True) is ab
+    assert combo.find_link(b, a, "x") is ab
+
+    ba = combo.link(b, a, "x", oriented=True)
+    assert ba is not ab
+    assert ba in combo.patch
+    assert combo.find_link(b, a, "x", oriented=True) is ba
+
+
+def test_get_cells_by_label():
+    base = CWComplex()
+    a1 = base.create_cell("a")
+    patch = CWComplex()
+    a2 = patch.create_cell("a")
+    b = patch.create_cell("b")
+
+    combo = PatchedContext(patch=patch, base=base)
+    assert combo.get_cells_by_label("a") == {a1, a2}
+    assert combo["b"] is b
+    assert combo.has_label("a")
+    assert not combo.has_label("c")
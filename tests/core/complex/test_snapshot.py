@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+from cwdb import CompactCWComplex, CWComplex
+from cwdb.snapshot import ALIGNMENT, read_snapshot
+
+
+def build(cw):
+    a, b, c, d = (cw.create_cell(x) for x in ("a", "b", "ц", "d"))
+    ab, bc = cw.link(a, b, "is"), cw.link(b, c, "is", oriented=True)
+    cd = cw.link(c, d, "is")
+    abc = cw.create_cell("abc", [ab, bc])
+    cw.create_atom_link(abc, d)
+    cw.delete_cell(cd)
+    return a, b, c, d, ab, bc, cd, abc
+
+
+def test_round_trip(complex_cls, tmp_path):
+    cw = complex_cls(embedding_size=2, embedding_dtype=np.float32)
+    cells = build(cw)
+    cw.set_embeddings(cells, np.arange(16).reshape(8, 2))
+    cw.save(tmp_path / "kb.cwdb")
+
+    loaded = complex_cls.load(tmp_path / "kb.cwdb")
+    a, b, c, d, ab, bc, cd, abc = (loaded.cell(i) for i in range(8))
+    assert [x.label for x in (a, c, ab, cd, abc)] == [
+        "a",
+        "ц",
+        "is",
+        "[DELETED] is",
+        "abc",
+    ]
+    assert loaded.get_layer_cells(0) == {a, b, c, d}
+    assert loaded.get_layer_cells(1) == {ab, bc}
+    assert abc.boundary == (ab, bc)
+    assert loaded.find_link(c, b, "is") == bc
+    assert loaded.find_link(c, b, "is", oriented=True) is None
+    assert loaded.get_coboundary_of(c) == {bc}
+    assert loaded.get_atoms_of(abc) == {d}
+    assert loaded.get_expansions_of(d) == {abc}
+    assert loaded.get_embeddings([a, abc]).dtype == np.float32
+    assert np.array_equal(loaded.get_embeddings([a, abc]), [[0, 1], [14, 15]])
+
+    # positions survive a second round trip
+    loaded.save(tmp_path / "again.cwdb")
+    again = complex_cls.load(tmp_path / "again.cwdb")
+    assert [again.cell(i).label for i in range(8)] == [
+        loaded.cell(i).label for i in range(8)
+    ]
+
+    # the loaded complex keeps growing
+    e = loaded.create_cell("e")
+    assert loaded.link(d, e, "is").boundary == (d, e)
+
+
+def test_round_trip_of_per_cell_embeddings(complex_cls, tmp_path):
+    cw = complex_cls()
+    a = cw.create_cell("a")
+    cw.create_cell("b")
+    a.embedding = np.array([0.5, 0.9])
+    cw.save(tmp_path / "kb.cwdb")
+
+    loaded = complex_cls.load(tmp_path / "kb.cwdb")
+    assert list(loaded.cell(0).embedding) == [0.5, 0.9]
+    assert len(loaded.cell(1).embedding) == 0
+    assert loaded.cell(0).embedding.dtype == np.float64
+
+
+@pytest.mark.parametrize(
+    "embedding", [np.zeros((2, 2)), np.array([1, 2]), np.zeros(2, np.float32)]
+)
+def test_per_cell_embeddings_that_do_not_round_trip_are_refused(
+    complex_cls, tmp_path, embedding
+):
+    cw = complex_cls()
+    cw.create_cell("a").embedding = embedding
+    with pytest.raises(ValueError, match="embedding of shape"):
+        cw.save(tmp_path / "kb.cwdb")
+    assert not (tmp_path / "kb.cwdb").exists()
+
+
+def test_round_trip_of_flagged_cells(complex_cls, tmp_path):
+    cw = complex_cls()
+    a, b = cw.create_cell("a"), cw.create_cell("b")
+    ab, ba = cw.link(a, b, "is"), cw.link(b, a, "was")
+    cw.create_cell("pair", [ab, ba])
+    ab.data.deleted = True
+    cw.save(tmp_path / "kb.cwdb")
+
+    loaded = complex_cls.load(tmp_path / "kb.cwdb")
+    for complex_ in (cw, loaded):
+        layers = [
+            sorted(x.label for x in complex_.get_layer_cells(i)) for i in range(3)
+        ]
+        assert layers == [["a", "b"], ["was"], ["pair"]]
+        assert complex_.cell(2) not in complex_
+        # the cofaces of the flagged cell go on compaction
+        complex_.compact()
+        assert [len(complex_.get_layer_cells(i)) for i in range(3)] == [2, 1, 0]
+
+
+def test_snapshots_are_interchangeable(tmp_path):
+    cw = CWComplex()
+    build(cw)
+    cw.save(tmp_path / "kb.cwdb")
+    compact = CompactCWComplex.load(tmp_path / "kb.cwdb")
+    assert sorted(x.label for x in compact.get_layer_cells(1)) == ["is", "is"]
+    compact.save(tmp_path / "compact.cwdb")
+    restored = CWComplex.load(tmp_path / "compact.cwdb")
+    assert restored["abc"].boundary == (restored.cell(4), restored.cell(5))
+
+
+def test_sections_are_aligned(tmp_path):
+    cw = CWComplex(embedding_size=3)
+    build(cw)
+    cw.save(tmp_path / "kb.cwdb")
+    with open(tmp_path / "kb.cwdb", "rb") as f:
+        assert f.read(8) == b"CWDBSNAP"
+
+    snapshot = read_snapshot(tmp_path / "kb.cwdb")
+    assert len(snapshot) == 8
+    assert snapshot.embedding_width == 3
+    start = snapshot.dimensions.ctypes.data
+    for array in (snapshot.label_ids, snapshot.boundary_indices):
+        assert (array.ctypes.data - start) % ALIGNMENT == 0
+
+
+def test_boundary_outside_of_complex_cannot_be_saved(tmp_path):
+    base = CWComplex()
+    a, b = base.create_cell("a"), base.create_cell("b")
+    patch = CWComplex()
+    patch.create_cell("ab", [a, b])
+    with pytest.raises(ValueError):
+        patch.save(tmp_path / "patch.cwdb")
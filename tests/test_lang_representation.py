@@ -0,0 +1,92 @@
+import io
+
+import pytest
+
+from cwdb import (
+    CWComplex,
+    from_lang_representation,
+    to_lang_representation,
+    write_lang_representation,
+)
+
+DUMP = """\
+cat: 'cat'
+animal: 'animal'
+Tom: 'Tom'
+quote: 'it\\'s a \\\\ "cat"'
+one_cell: Tom-cat: ''
+is: cat->animal: 'is'
+cat_is: [one_cell, is]: 'transitive'
+multi: 'two
+lines'
+cat_is ~> ['Tom', 'animal']
+"""
+
+
+def test_parse(complex_cls):
+    c = from_lang_representation(io.StringIO(DUMP), complex_cls())
+    cat, animal, tom, quote, tom_cat, is_, cat_is, multi = (c.cell(i) for i in range(8))
+    assert quote.label == 'it\'s a \\ "cat"'
+    assert multi.label == "two\nlines"
+    assert tom_cat.boundary == (tom, cat) and tom_cat.label == ""
+    assert c.find_link(cat, animal, "is") == is_
+    assert cat_is.dimension == 2
+    assert cat_is.boundary == (tom_cat, is_)
+    assert c.get_atoms_of(cat_is) == {tom, animal}
+
+
+def test_batches_refer_to_earlier_batches():
+    lines = [f"c{i}: 'c{i}'\n" for i in range(10)]
+    lines += [f"l{i}: c{i}->c{i + 1}: 'next'\n" for i in range(9)]
+    lines += ["l0 ~> ['c5']\n"]
+    c = from_lang_representation(lines, batch_size=3)
+    assert len(c) == 19
+    assert c.find_link(c["c3"], c["c4"], "next", oriented=True) is not None
+    assert c.get_atoms_of(c.cell(10)) == {c["c5"]}
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "a: b->c: 'x'\n",
+        "a: 'x'\na: 'y'\n",
+        "a: 'x' junk\n",
+        "a: 'open\n",
+    ],
+)
+def test_invalid_input(text):
+    with pytest.raises(ValueError):
+        from_lang_representation(io.StringIO(text))
+
+
+def test_round_trip(complex_cls):
+    c = complex_cls()
+    a, a2, a_1 = c.create_cell("a"), c.create_cell("a"), c.create_cell("a 1")
+    quote = c.create_cell("it's \\")
+    gone = c.create_cell("gone")
+    ab, link = c.link(a, a2, "is"), c.link(a2, a_1)
+    abc = c.create_cell("a, b: [c]", [ab, link])
+    c.create_atom_link(abc, quote)
+    c.link(a, gone, "x")
+    c.delete_cell(gone)
+
+    out = io.StringIO()
+    write_lang_representation(c, out, chunk_size=2)
+    assert out.getvalue() == to_lang_representation(c)
+    assert "gone" not in out.getvalue()
+    assert "a_b_c ~> ['its_']" in out.getvalue()
+
+    restored = from_lang_representation(io.StringIO(out.getvalue()), complex_cls())
+    assert to_lang_representation(restored) == out.getvalue()
+    assert len(restored) == 7
+    assert restored.cell(3).label == "it's \\"
+    assert restored.cell(6).boundary == (restored.cell(4), restored.cell(5))
+
+
+def test_subset():
+    c = CWComplex()
+    a, b, d = c.create_cell("a"), c.create_cell("b"), c.create_cell("d")
+    ab = c.link(a, b, "is")
+    c.link(b, d, "is")
+    dump = to_lang_representation(c, [ab])
+    assert dump == "a: 'a'\nb: 'b'\nis: a->b: 'is'\n"
@@ -0,0 +1,177 @@
+import numpy as np
+import pytest
+
+from cwdb import CompactCWComplex, CWComplex
+from cwdb.query import (
+    ExpandEdge,
+    Pattern,
+    ScanNodes,
+    find_ambiguities,
+    match_pattern,
+    plan_pattern,
+    query_boundary_and_resolve_ambiguity,
+    resolve_all,
+)
+from cwdb.rules import choice_rule, revision, revision_rule
+
+
+@pytest.fixture(params=[CWComplex, CompactCWComplex])
+def animals(request):
+    c = request.param()
+    names = ("Tom", "Jerry", "cat", "mouse", "animal", "cheese", "big cat")
+    cells = {x: c.create_cell(x) for x in names}
+    for a, b in [
+        ("Tom", "cat"),
+        ("Jerry", "mouse"),
+        ("cat", "animal"),
+        ("mouse", "animal"),
+        ("big cat", "cat"),
+    ]:
+        c.link(cells[a], cells[b], "is", oriented=True)
+    c.link(cells["Jerry"], cells["cheese"], "likes", oriented=True)
+    c.link(cells["cheese"], cells["Tom"], "near")
+    return c
+
+
+def names(matches, *variables):
+    return sorted(tuple(m[v].label for v in variables) for m in matches)
+
+
+def test_parse():
+    pattern = Pattern.parse("(x)-[is]->(y:cat), (y)<-[e:]-(:'big cat'), (x)-[]-(z)")
+    assert pattern.nodes == {"x": None, "y": "cat", "#2": "big cat", "z": None}
+    assert [(e.tail, e.head, e.label, e.var, e.directed) for e in pattern.edges] == [
+        ("x", "y", "is", None, True),
+        ("#2", "y", None, "e", True),
+        ("x", "z", None, None, False),
+    ]
+    assert pattern.variables == ["x", "y", "z", "e"]
+    for text in ["(x", "(x)-[is]-", "(x)<-[is]->(y)", "(x:a)-[]->(x:b)", "(x) y"]:
+        with pytest.raises(ValueError):
+            Pattern.parse(text)
+
+
+def test_paths(animals):
+    matches = match_pattern(animals, "(x)-[is]->(y)-[is]->(:animal)")
+    assert names(matches, "x", "y") == [
+        ("Jerry", "mouse"),
+        ("Tom", "cat"),
+        ("big cat", "cat"),
+    ]
+
+    matches = match_pattern(animals, "(x)-[is]->(:cat), (x)-[near]-(y)")
+    assert names(matches, "x", "y") == [("Tom", "cheese")]
+
+    matches = match_pattern(animals, "(x)<-[likes]-(y)-[is]->(z)")
+    assert names(matches, "x", "y", "z") == [("cheese", "Jerry", "mouse")]
+
+    matches = match_pattern(animals, "(x)-[e:]->(:animal)")
+    assert names(matches, "x", "e") == [("cat", "is"), ("mouse", "is")]
+
+
+def test_bindings_and_predicates(animals):
+    cat = animals["cat"]
+    matches = match_pattern(animals, "(x)-[is]->(y)", y=cat)
+    assert names(matches, "x") == [("Tom",), ("big cat",)]
+
+    matches = match_pattern(
+        animals, "(x)-[is]->(y)", where={"x": lambda cell: " " not in cell.label}, y=cat
+    )
+    assert names(matches, "x") == [("Tom",)]
+
+    animals["Tom"].embedding = np.array([0.9, 0.1])
+    matches = match_pattern(
+        animals,
+        "(x)-[is]->(:cat)",
+        where={"x": lambda cell: len(cell.embedding) and cell.embedding[0] > 0.5},
+    )
+    assert names(matches, "x") == [("Tom",)]
+
+    assert list(match_pattern(animals, "(x:Tom)", x=cat)) == []
+    with pytest.raises(ValueError):
+        list(match_pattern(animals, "(x)", y=cat))
+
+
+def test_plan_starts_from_most_selective_label(animals):
+    pattern = Pattern.parse("(x)-[is]->(y)-[is]->(z:animal)")
+    steps = plan_pattern(animals, pattern)
+    assert steps[0] == ScanNodes("z", "animal")
+    assert [type(s) for s in steps[1:]] == [ExpandEdge, ExpandEdge]
+
+    steps = plan_pattern(animals, pattern, bound=["x"])
+    assert steps[0] == ExpandEdge(pattern.edges[0], "x")
+
+
+def test_matches_are_streamed():
+    c = CWComplex()
+    hub = c.create_cell("hub")
+    for i in range(1000):
+        c.link(hub, c.create_cell(str(i)), "spoke", oriented=True)
+    matches = match_pattern(c, "(:hub)-[spoke]->(x)")
+    assert next(matches)["x"].label.isdigit()
+
+
+@pytest.fixture(params=[CWComplex, CompactCWComplex])
+def duplicates(request):
+    c = request.param(embedding_size=2)
+    a, b, d = (c.create_cell(x) for x in "abd")
+    ab = [c.create_cell("is", [a, b]) for _ in range(3)]
+    ba = c.create_cell("is", [b, a])
+    bd = [c.create_cell("has", [b, d]) for _ in range(2)]
+    pair = [c.create_cell("pair", [ab[0], ba]) for _ in range(2)]
+    c.set_embeddings(
+        ab + [ba] + bd + pair,
+        np.array([[0.9, 0.5], [0.1, 0.5], [0.5, 0.9], [1, 0.9]] + [[1, 0.5]] * 4),
+    )
+    return c, ab, bd, pair
+
+
+def test_find_ambiguities(duplicates):
+    c, ab, bd, pair = duplicates
+    assert find_ambiguities(c) == [ab, bd, pair]
+    assert find_ambiguities(c, labels=["has", "missing"]) == [bd]
+    assert find_ambiguities(c, labels=[]) == []
+
+
+def test_resolve_all(duplicates):
+    c, ab, bd, pair = duplicates
+    assert resolve_all(c, choice_rule, labels=["is"]) == [ab[0]]
+    assert ab[1] not in c and ab[2] not in c
+    assert np.allclose(ab[0].embedding, [0.5, 0.9])
+
+    truth = revision(np.array([[1, 0.5]]), np.array([[1, 0.5]]))[0]
+    assert resolve_all(c, revision_rule) == [bd[0], pair[0]]
+    assert np.allclose(bd[0].embedding, truth) and bd[1] not in c
+    assert find_ambiguities(c) == []
+    assert resolve_all(c, revision_rule) == []
+
+
+def test_resolve_with_custom_rule(duplicates):
+    c, ab, bd, pair = duplicates
+    calls = []
+
+    def keep_older(c, e1, e2):
+        calls.append((e1, e2))
+        c.delete_cell(e2)
+        return e1
+
+    assert resolve_all(c, keep_older, labels=["is"]) == [ab[0]]
+    assert calls == [(ab[0], ab[1]), (ab[0], ab[2])]
+
+
+def test_query_resolves_all_duplicates_at_once():
+    c = CWComplex(embedding_size=2)
+    a, b = c.create_cell("a"), c.create_cell("b")
+    edges = [c.create_cell("is", [a, b]) for _ in range(4)]
+    c.set_embeddings(edges, np.array([[1, 0.5], [0, 0.5], [1, 0.5], [0, 0.5]]))
+    truth = query_boundary_and_resolve_ambiguity(c, "is", [a, b], revision_rule)
+    assert np.allclose(truth, [0.5, 0.8]) and len(c.get_layer_cells(1)) == 1
+
+
+def test_query_of_unambiguous_edge_does_not_write(complex_cls):
+    c = complex_cls()
+    a, b = c.create_cell("a"), c.create_cell("b")
+    edge = c.create_cell("is", [a, b])
+    for rule in (revision_rule, choice_rule):
+        truth = query_boundary_and_resolve_ambiguity(c, "is", [a, b], rule)
+        assert len(truth) == 0 and len(edge.embedding) == 0
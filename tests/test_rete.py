@@ -0,0 +1,117 @@
+import pytest
+
+from cwdb import CompactCWComplex
+from cwdb.rete import Activation, Agenda, ReteNetwork
+from cwdb.rules import match_rule
+
+from .test_rules import define_rename, define_transitivity
+
+
+def chains(network):
+    return sorted(tuple(x.label for x in a.match[:3]) for a in network.agenda)
+
+
+def test_matches_follow_changes(complex_cls):
+    c = complex_cls()
+    robin, bird, vertebrate = (
+        c.create_cell(x) for x in ("robin", "bird", "vertebrate")
+    )
+    robin_bird = c.create_cell("is", [robin, bird])
+    bird_vertebrate = c.create_cell("is", [bird, vertebrate])
+    rule = define_transitivity(c)
+    network = ReteNetwork(c, [rule])
+    assert chains(network) == [("robin", "bird", "vertebrate")]
+
+    c.create_cell("is", [vertebrate, c.create_cell("animal")])
+    assert chains(network) == [
+        ("bird", "vertebrate", "animal"),
+        ("robin", "bird", "vertebrate"),
+    ]
+    assert set(network.agenda) == {
+        Activation(rule, tuple(m)) for m in match_rule(c, rule)
+    }
+
+    bird_vertebrate.label = "was"
+    assert chains(network) == []
+    bird_vertebrate.label = "is"
+    assert len(chains(network)) == 2
+
+    c.delete_cell(robin_bird)
+    assert chains(network) == [("bird", "vertebrate", "animal")]
+
+    network.detach()
+    c.create_cell("is", [c.create_cell("sparrow"), bird])
+    assert len(chains(network)) == 1
+
+
+def test_rules_added_later_are_not_data(complex_cls):
+    c = complex_cls()
+    a, b, d = (c.create_cell(x) for x in "abd")
+    c.create_cell("is", [a, b])
+    c.create_cell("is", [b, d])
+    network = ReteNetwork(c, [define_transitivity(c)])
+    define_rename(c, "was", "is")
+    assert chains(network) == [("a", "b", "d")]
+
+
+def test_fire(complex_cls):
+    c = complex_cls()
+    chain = [c.create_cell(str(i)) for i in range(6)]
+    for a, b in zip(chain, chain[1:]):
+        c.create_cell("is", [a, b])
+    network = ReteNetwork(c, [define_transitivity(c), define_rename(c, "was", "is")])
+
+    fired = network.fire(limit=2)
+    assert len(fired) == 2 and len(network.agenda) > 0
+    network.fire()
+    assert len(network.agenda) == 0
+    for i, a in enumerate(chain):
+        for j, b in enumerate(chain):
+            facts = c.cofaces_containing([a, b], label="is")
+            assert len([x for x in facts if x.boundary == (a, b)]) == (i < j)
+
+    # new facts fire as soon as their matches complete
+    first = c.create_cell("first")
+    was = c.create_cell("was", [first, chain[0]])
+    assert len(network.agenda) == 1
+    ((created, deleted),) = network.fire(limit=1)
+    assert deleted == [was]
+    assert [x.boundary for x in created] == [(first, chain[0])]
+    assert len(network.agenda) == 5
+    network.fire()
+    assert len(c.cofaces_containing([first, chain[5]], label="is")) == 1
+
+
+def test_compaction_rebuilds_the_network():
+    c = CompactCWComplex()
+    a, b, d = (c.create_cell(x) for x in "abd")
+    ab = c.create_cell("is", [a, b])
+    c.create_cell("is", [b, d])
+    c.create_cell("is", [a, d])
+    c.create_cell("is", [d, c.create_cell("e")])
+    network = ReteNetwork(c, [define_transitivity(c)])
+    c.delete_cell(ab)
+    c.compact()
+    assert chains(network) == [("a", "d", "e"), ("b", "d", "e")]
+    rule = c["ImplySusbtitutionRule"]
+    assert set(network.agenda) == {
+        Activation(rule, tuple(m)) for m in match_rule(c, rule)
+    }
+
+
+def test_agenda():
+    one, two, three = (Activation(None, (x,)) for x in (1, 2, 3))
+    agenda = Agenda()
+    for x in (two, one, three):
+        agenda.push(x)
+    agenda.push(two)
+    agenda.discard(one)
+    assert len(agenda) == 2 and one not in agenda
+    assert [agenda.pop(), agenda.pop()] == [two, three]
+    with pytest.raises(KeyError):
+        agenda.pop()
+
+    agenda = Agenda(key=lambda a: -a.match[0])
+    for x in (two, one, three):
+        agenda.push(x)
+    assert [agenda.pop() for _ in range(3)] == [three, two, one]
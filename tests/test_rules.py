@@ -0,0 +1,312 @@
+import numpy as np
+import pytest
+
+from cwdb import CWComplex
+from cwdb.rules import (
+    abduction,
+    apply_rule,
+    apply_rule_many,
+    apply_truth_function,
+    choice,
+    compile_rule,
+    deduction,
+    induction,
+    match_rule,
+    plan_rule,
+    revision,
+    revision_rule,
+    saturate,
+)
+
+
+def define_transitivity(c):
+    rule = c.create_cell("ImplySusbtitutionRule")
+
+    p1, p2, p3 = (c.create_cell("Any") for _ in range(3))
+    is_1, is_2 = c.create_cell("is", [p1, p2]), c.create_cell("is", [p2, p3])
+
+    r_p1, r_p2, r_p3 = (c.create_cell("Any") for _ in range(3))
+    r_is_1, r_is_2 = c.create_cell("is", [r_p1, r_p2]), c.create_cell(
+        "is", [r_p2, r_p3]
+    )
+    r_is_3 = c.create_cell("is", [r_p1, r_p3])
+
+    b_1 = c.create_cell("bind", [p1, r_p1])
+    b_2 = c.create_cell("bind", [p2, r_p2])
+    b_3 = c.create_cell("bind", [p3, r_p3])
+    c.create_cell("bind", [is_1, b_2, r_is_1, b_1])
+    c.create_cell("bind", [is_2, b_3, r_is_2, b_2])
+
+    scaffolds = [c.create_cell("pattern_scaffold", [rule, p]) for p in (p1, p2, p3)]
+    c.create_cell("pattern", scaffolds + [is_1, is_2])
+    scaffolds = [
+        c.create_cell("product_scaffold", [rule, p]) for p in (r_p1, r_p2, r_p3)
+    ]
+    c.create_cell("product", scaffolds + [r_is_3])
+    return rule
+
+
+@pytest.fixture
+def animals(complex_cls):
+    c = complex_cls()
+    names = ("robin", "bird", "vertebrate", "animal", "water", "liquid")
+    cells = {x: c.create_cell(x) for x in names}
+    for a, b in [
+        ("robin", "bird"),
+        ("bird", "vertebrate"),
+        ("vertebrate", "animal"),
+        ("water", "liquid"),
+    ]:
+        c.create_cell("is", [cells[a], cells[b]])
+    return c
+
+
+def chains(c, rule):
+    return sorted(tuple(x.label for x in match[:3]) for match in match_rule(c, rule))
+
+
+def test_match_transitivity(animals):
+    rule = define_transitivity(animals)
+    assert chains(animals, rule) == [
+        ("bird", "vertebrate", "animal"),
+        ("robin", "bird", "vertebrate"),
+    ]
+    match = next(match_rule(animals, rule))
+    assert [x.dimension for x in match] == [0, 0, 0, 1, 1]
+    assert match[3].boundary == (match[0], match[1])
+    assert match[4].boundary == (match[1], match[2])
+
+
+def test_apply_matches(animals):
+    rule = define_transitivity(animals)
+    for match in list(match_rule(animals, rule)):
+        apply_rule(animals, rule, match)
+    robin = animals["robin"]
+    assert animals.find_link(robin, animals["vertebrate"], "is", oriented=True)
+    assert chains(animals, rule).count(("robin", "vertebrate", "animal")) == 1
+
+    facts = len(animals.get_cells_by_label("is", dimension=1))
+    apply_rule(animals, rule)
+    assert len(animals.get_cells_by_label("is", dimension=1)) == facts + 1
+
+
+def test_apply_many(animals):
+    rule = define_transitivity(animals)
+    matches = list(match_rule(animals, rule))
+    results = apply_rule_many(animals, rule, matches)
+    assert [[x.boundary for x in r] for r in results] == [
+        [(m[0], m[2])] for m in matches
+    ]
+    assert all(x.label == "is" and x in animals for r in results for x in r)
+
+    rename = define_rename(animals, "is", "was")
+    matches = list(match_rule(animals, rename))
+    with pytest.raises(RuntimeError):
+        apply_rule_many(animals, rename, matches + [matches[0][:2]])
+    assert all(x in animals for m in matches for x in m)
+
+    results = apply_rule_many(animals, rename, matches)
+    assert len(results) == len(matches) == 6
+    assert all(m[2] not in animals for m in matches)
+    robin, bird = animals["robin"], animals["bird"]
+    assert animals.find_link(robin, bird, "was", oriented=True)
+    assert animals.find_link(robin, bird, "is", oriented=True) is None
+    assert apply_rule_many(animals, rule, []) == []
+
+
+def test_compile(animals):
+    rule = define_transitivity(animals)
+    compiled = compile_rule(animals, rule)
+    assert [x.label for x in compiled.pattern] == ["Any"] * 3 + ["is"] * 2
+    assert all(t is not None for t in compiled.bindings)
+    assert compiled.product == (("is", (0, 2)),)
+    assert compiled.deletions == ()
+    assert rule in compiled.cells and compiled.pattern[0] in compiled.cells
+    assert compile_rule(animals, rule) is compiled
+
+    # unrelated changes keep the plan, changes to the rule drop it
+    animals.create_cell("is", [animals["water"], animals["animal"]])
+    assert compile_rule(animals, rule) is compiled
+    (bind,) = animals.cofaces_containing([compiled.pattern[0]], label="bind")
+    animals.delete_cell(bind)
+    recompiled = compile_rule(animals, rule)
+    assert recompiled is not compiled
+    assert recompiled.deletions == (0, 3)
+    compiled.pattern[3].label = "was"
+    assert compile_rule(animals, rule).pattern[3].label == "was"
+    position = animals.position_of(rule)
+    rule = animals.cell(int(animals.compact()[position]))
+    assert compile_rule(animals, rule).deletions == (0, 3)
+
+
+def test_labels_and_structure(complex_cls):
+    c = complex_cls()
+    rule = c.create_cell("Rule")
+    p1, p2 = c.create_cell("Any"), c.create_cell("Foo")
+    produced = c.create_cell("produced", [p1, p2])
+    scaffolds = [c.create_cell("pattern_scaffold", [rule, p]) for p in (p1, p2)]
+    c.create_cell("pattern", scaffolds + [produced])
+
+    a, b, foo = c.create_cell("a"), c.create_cell("b"), c.create_cell("Foo")
+    c.create_cell("produced", [a, b])
+    c.create_cell("produced", [foo, a])
+    ok = c.create_cell("produced", [a, foo])
+    assert [m for m in match_rule(c, rule)] == [[a, foo, ok]]
+
+    steps = plan_rule(c, [p1, p2, produced])
+    assert steps[0] == (p2, ())
+    assert steps[1] == (produced, (p2,))
+
+    c.delete_cell(ok)
+    assert list(match_rule(c, rule)) == []
+    with pytest.raises(RuntimeError):
+        apply_rule(c, rule)
+
+
+def test_matches_are_lazy():
+    c = CWComplex()
+    rule = c.create_cell("Rule")
+    p = c.create_cell("Any")
+    c.create_cell("pattern", [c.create_cell("pattern_scaffold", [rule, p])])
+    for i in range(1000):
+        c.create_cell(str(i))
+    (cell,) = next(match_rule(c, rule))
+    assert cell.label.isdigit()
+
+
+def define_rename(c, old, new):
+    """Rewrites `old` 1-cells into `new` ones"""
+    rule = c.create_cell(f"{old} to {new}")
+    p1, p2 = c.create_cell("Any"), c.create_cell("Any")
+    edge = c.create_cell(old, [p1, p2])
+    r_p1, r_p2 = c.create_cell("Any"), c.create_cell("Any")
+    r_edge = c.create_cell(new, [r_p1, r_p2])
+    c.create_cell("bind", [p1, r_p1])
+    c.create_cell("bind", [p2, r_p2])
+    scaffolds = [c.create_cell("pattern_scaffold", [rule, p]) for p in (p1, p2)]
+    c.create_cell("pattern", scaffolds + [edge])
+    scaffolds = [c.create_cell("product_scaffold", [rule, p]) for p in (r_p1, r_p2)]
+    c.create_cell("product", scaffolds + [r_edge])
+    return rule
+
+
+def test_saturate(complex_cls):
+    c = complex_cls()
+    chain = [c.create_cell(str(i)) for i in range(6)]
+    for a, b in zip(chain, chain[1:]):
+        c.create_cell("is", [a, b])
+    rule = define_transitivity(c)
+
+    result = saturate(c, [rule])
+    assert result.fixpoint and result.rounds == 3
+    assert [len(x) for x in result.created] == [4, 3 + 2, 1]
+    assert result.deleted == [[], [], []]
+    for i, a in enumerate(chain):
+        for j, b in enumerate(chain):
+            facts = c.cofaces_containing([a, b], label="is")
+            assert len([x for x in facts if x.boundary == (a, b)]) == (i < j)
+
+    assert saturate(c, [rule]).rounds == 0
+
+
+def test_saturate_with_deletions_and_round_limit(complex_cls):
+    c = complex_cls()
+    a, b, d = c.create_cell("a"), c.create_cell("b"), c.create_cell("d")
+    was = c.create_cell("was", [a, b])
+    c.create_cell("is", [b, d])
+    rules = [define_transitivity(c), define_rename(c, "was", "is")]
+
+    result = saturate(c, rules, max_rounds=1)
+    assert result.rounds == 1 and not result.fixpoint
+    assert result.deleted == [[was]] and was not in c
+    assert c.find_link(a, b, "is", oriented=True)
+
+    result = saturate(c, rules)
+    assert result.fixpoint and result.rounds == 1
+    assert [x.boundary for x in result.created[0]] == [(a, d)]
+
+
+def test_truth_functions(complex_cls):
+    t1 = np.array([[0.9, 0.8], [0.2, 0.5], [1.0, 0.0]])
+    t2 = np.array([[0.5, 0.8], [0.6, 0.9], [0.0, 0.5]])
+    w1, w2 = t1[:, 1] / (1 - t1[:, 1]), t2[:, 1] / (1 - t2[:, 1])
+    w = w1 + w2
+    expected = np.stack([(w1 * t1[:, 0] + w2 * t2[:, 0]) / w, w / (w + 1)], axis=1)
+    assert np.allclose(revision(t1, t2), expected)
+    assert np.allclose(choice(t1, t2), [t2[0], t2[1], t2[2]])
+    assert np.allclose(deduction(t1, t2)[0], [0.45, 0.45 * 0.64])
+    assert np.allclose(induction(t1, t2)[0], [0.9, 0.32 / 1.32])
+    assert np.allclose(abduction(t1, t2)[0], [0.5, 0.72 * 0.8 / (0.72 * 0.8 + 1)])
+
+    c = complex_cls(embedding_size=2)
+    a, b = c.create_cell("a"), c.create_cell("b")
+    e1, e2 = c.create_cell("is", [a, b]), c.create_cell("is", [a, b])
+    c.set_embeddings([e1, e2], np.stack([t1[0], t2[0]]))
+    assert np.allclose(revision_rule(c, e1, e2).embedding, revision(t1, t2)[0])
+
+
+def test_revision_without_evidence_or_with_certainty(complex_cls):
+    t1 = np.array([[0.2, 0.0], [0.2, 1.0], [0.2, 1.0]])
+    t2 = np.array([[0.6, 0.0], [0.6, 1.0], [0.6, 0.5]])
+    with np.errstate(all="raise"):
+        assert np.allclose(revision(t1, t2), [[0.4, 0], [0.4, 1], [0.2, 1]])
+
+    c = complex_cls()
+    a, b, d = c.create_cell("a"), c.create_cell("b"), c.create_cell("d")
+    unset = [c.create_cell("is", [a, b]) for _ in range(2)]
+    certain = [c.create_cell("is", [b, d]) for _ in range(2)]
+    c.set_embeddings(certain, np.array([[1, 1], [0, 1]]))
+    apply_truth_function(c, revision)
+    assert np.allclose(unset[0].embedding, [0.5, 0])
+    assert np.allclose(certain[0].embedding, [0.5, 1])
+
+
+def test_truth_function_of_parallel_edges(complex_cls):
+    c = complex_cls(embedding_size=2)
+    a, b, d = c.create_cell("a"), c.create_cell("b"), c.create_cell("d")
+    edges = [c.create_cell("is", [a, b]) for _ in range(3)]
+    single = c.create_cell("is", [b, d])
+    c.set_embeddings(
+        edges + [single], np.array([[0.9, 0.5], [0.1, 0.5], [0.5, 0.9], [1, 0.9]])
+    )
+
+    (first,) = [x for x in apply_truth_function(c, choice) if x.boundary == (a, b)]
+    assert first == edges[0] and edges[1] not in c and edges[2] not in c
+    assert np.allclose(first.embedding, [0.5, 0.9])
+    assert np.allclose(single.embedding, [1, 0.9])
+
+    c.create_cell("is", [a, b]).embedding = np.array([0.5, 0.9])
+    apply_truth_function(c, revision)
+    assert len(c.out_edges(a, "is")) == 1
+    assert np.allclose(first.embedding, [0.5, 18 / 19])
+
+
+def test_truth_function_of_chains(complex_cls):
+    c = complex_cls(embedding_size=2)
+    a, b, d, e = (c.create_cell(x) for x in "abde")
+    ab, bd, de = (
+        c.link(x, y, "is", oriented=True) for x, y in [(a, b), (b, d), (d, e)]
+    )
+    c.set_embeddings([ab, bd, de], np.array([[1, 0.9], [0.8, 0.9], [0.5, 0.5]]))
+
+    cells = apply_truth_function(c, deduction)
+    assert {x.boundary for x in cells} == {(a, d), (b, e)}
+    ad = c.find_link(a, d, "is", oriented=True)
+    assert np.allclose(ad.embedding, deduction(bd.embedding[None], ab.embedding[None]))
+
+    # both derivations of a -> e are revised together
+    be = c.find_link(b, e, "is", oriented=True)
+    t = {x: x.embedding[None].copy() for x in (ab, ad, be, de)}
+    (ae,) = [x for x in apply_truth_function(c, deduction) if x.boundary == (a, e)]
+    truth = revision(deduction(t[de], t[ad]), deduction(t[be], t[ab]))
+    assert np.allclose(ae.embedding, truth[0])
+
+    c = complex_cls(embedding_size=2)
+    m, p, s = (c.create_cell(x) for x in "mps")
+    mp, ms = c.link(m, p, "is", oriented=True), c.link(m, s, "is", oriented=True)
+    c.set_embeddings([mp, ms], np.array([[1, 0.9], [0.8, 0.9]]))
+    cells = apply_truth_function(c, induction)
+    assert {x.boundary for x in cells} == {(s, p), (p, s)}
+    sp = c.find_link(s, p, "is", oriented=True)
+    assert np.allclose(sp.embedding, induction(mp.embedding[None], ms.embedding[None]))
+    assert apply_truth_function(c, abduction) and c.find_link(m, m, "is") is None
@@ -0,0 +1,32 @@
+from cwdb.utils import DSU
+
+
+def test_dsu():
+    dsu = DSU("abcde")
+    assert len(dsu) == 5
+    assert not dsu.same("a", "b")
+
+    assert dsu.merge("a", "b")
+    assert dsu.merge("c", "b")
+    assert not dsu.merge("a", "c")
+    assert dsu.same("a", "c")
+    assert dsu.find("a") == dsu.find("c")
+    assert dsu.find("d") == "d"
+
+    dsu.add("f")
+    dsu.merge("f", "d")
+    assert sorted(sorted(group) for group in dsu.groups()) == [
+        ["a", "b", "c"],
+        ["d", "f"],
+        ["e"],
+    ]
+
+
+def test_dsu_long_chain():
+    n = 10000
+    dsu = DSU(range(n))
+    for i in range(n - 1):
+        dsu.merge(i, i + 1)
+    assert dsu.same(0, n - 1)
+    assert len(dsu.groups()) == 1
+    assert DSU().groups() == []